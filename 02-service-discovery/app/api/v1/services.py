@@ -58,12 +58,15 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Any, Dict, List
 import logging
 import asyncio
 import json
 
+from app.config import settings
+from app.core.config_watch import ConfigWatchCapacityError, ConfigWatchSession
 from app.core.database import get_db
+from app.core.subscriptions import SubscriptionError, SubscriptionSession
 from app.services.registry_service import ServiceRegistryService
 from app.schemas.service import (
     ServiceRegister,
@@ -73,15 +76,30 @@ from app.schemas.service import (
     ServiceListResponse,
     ServiceDeregister,
     HealthCheckUpdate,
+    ServiceBatchRegister,
+    ServiceBatchDeregister,
+    HealthCheckBatchUpdate,
+    BatchOperationResponse,
     ServiceEventResponse,
     AllServicesResponse,
+    ServiceFeedback,
 )
+from app.core.load_balancer import LoadBalancerFactory
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _check_batch_size(size: int) -> None:
+    """Reject batches larger than REGISTRY_BATCH_MAX_SIZE."""
+    if size > settings.REGISTRY_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch of {size} items exceeds the limit of {settings.REGISTRY_BATCH_MAX_SIZE}"
+        )
+
+
 @router.post(
     "/services/register",
     response_model=ServiceResponse,
@@ -99,7 +117,7 @@ async def register_service(
     Args:
         service_data: Service registration data
         db: Database session
-        
+    
     Returns:
         Registered service information
     """
@@ -110,7 +128,7 @@ async def register_service(
         service = await registry.register_service(service_data)
         
         return ServiceResponse.model_validate(service)
-        
+    
     except Exception as e:
         logger.exception(f"Error registering service: {e}")
         raise HTTPException(
@@ -119,6 +137,46 @@ async def register_service(
         )
 
 
+@router.post(
+    "/services/register/batch",
+    response_model=BatchOperationResponse,
+    summary="Register services in batch",
+    description="Register many service instances in one request (e.g. a rolling deploy)"
+)
+async def register_services_batch(
+    batch: ServiceBatchRegister,
+    db: AsyncSession = Depends(get_db)
+) -> BatchOperationResponse:
+    """
+    Register many service instances.
+    
+    Instances are stored in one database transaction; failures are
+    reported per instance instead of failing the whole request.
+    
+    Args:
+        batch: Service registrations
+        db: Database session
+    
+    Returns:
+        Per-instance results
+    """
+    logger.info(f"API: Batch register request for {len(batch.services)} services")
+    _check_batch_size(len(batch.services))
+    
+    try:
+        registry = ServiceRegistryService(db)
+        results = await registry.register_services(batch.services)
+        
+        return BatchOperationResponse.from_results(results)
+    
+    except Exception as e:
+        logger.exception(f"Error registering services: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to register services: {str(e)}"
+        )
+
+
 @router.post(
     "/services/deregister",
     status_code=status.HTTP_200_OK,
@@ -135,7 +193,7 @@ async def deregister_service(
     Args:
         deregister_data: Service deregistration data
         db: Database session
-        
+    
     Returns:
         Success message
     """
@@ -155,7 +213,7 @@ async def deregister_service(
             "success": True,
             "message": f"Service {deregister_data.service_id} deregistered successfully"
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -166,6 +224,43 @@ async def deregister_service(
         )
 
 
+@router.post(
+    "/services/deregister/batch",
+    response_model=BatchOperationResponse,
+    summary="Deregister services in batch",
+    description="Remove many service instances from the registry in one request"
+)
+async def deregister_services_batch(
+    batch: ServiceBatchDeregister,
+    db: AsyncSession = Depends(get_db)
+) -> BatchOperationResponse:
+    """
+    Deregister many service instances.
+    
+    Args:
+        batch: Service instance IDs
+        db: Database session
+    
+    Returns:
+        Per-instance results (unknown IDs are reported as failures)
+    """
+    logger.info(f"API: Batch deregister request for {len(batch.service_ids)} services")
+    _check_batch_size(len(batch.service_ids))
+    
+    try:
+        registry = ServiceRegistryService(db)
+        results = await registry.deregister_services(batch.service_ids)
+        
+        return BatchOperationResponse.from_results(results)
+    
+    except Exception as e:
+        logger.exception(f"Error deregistering services: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to deregister services: {str(e)}"
+        )
+
+
 @router.post(
     "/services/discover",
     response_model=ServiceInstanceResponse,
@@ -184,7 +279,7 @@ async def discover_service(
     Args:
         discovery_request: Service discovery parameters
         db: Database session
-        
+    
     Returns:
         Selected service instance
     """
@@ -209,7 +304,7 @@ async def discover_service(
             meta=instance.meta,
             health_status=instance.health_status
         )
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -236,7 +331,7 @@ async def discover_all_instances(
     Args:
         discovery_request: Service discovery parameters
         db: Database session
-        
+    
     Returns:
         List of all service instances
     """
@@ -264,7 +359,7 @@ async def discover_all_instances(
             total=len(service_instances),
             strategy_used=discovery_request.lb_strategy.value if discovery_request.lb_strategy is not None else ""
         )
-        
+    
     except Exception as e:
         logger.exception(f"Error discovering all instances: {e}")
         raise HTTPException(
@@ -273,6 +368,39 @@ async def discover_all_instances(
         )
 
 
+@router.post(
+    "/services/feedback",
+    status_code=status.HTTP_200_OK,
+    summary="Report request completion",
+    description="Report latency and outcome of a request sent to a discovered instance"
+)
+async def report_feedback(feedback: ServiceFeedback) -> dict:
+    """
+    Report the completion of a request to a discovered instance.
+    
+    Releases the in-flight slot taken by ``least_connections`` and
+    ``peak_ewma`` selections and feeds the observed latency into
+    ``peak_ewma``. Other strategies ignore the report.
+    
+    Args:
+        feedback: Completion report
+    
+    Returns:
+        Success message
+    """
+    lb = LoadBalancerFactory.get_load_balancer(feedback.strategy.value)
+    await lb.record_completion(
+        feedback.service_id,
+        latency_ms=feedback.latency_ms,
+        success=feedback.success
+    )
+    
+    return {
+        "success": True,
+        "message": f"Feedback recorded for {feedback.service_id}"
+    }
+
+
 @router.get(
     "/services",
     response_model=AllServicesResponse,
@@ -287,7 +415,7 @@ async def get_all_services(
     
     Args:
         db: Database session
-        
+    
     Returns:
         Summary of all services
     """
@@ -304,7 +432,7 @@ async def get_all_services(
             total_services=len(services),
             total_instances=total_instances
         )
-        
+    
     except Exception as e:
         logger.exception(f"Error getting all services: {e}")
         raise HTTPException(
@@ -328,7 +456,7 @@ async def update_health_check(
     Args:
         health_update: Health check update data
         db: Database session
-        
+    
     Returns:
         Success message
     """
@@ -352,7 +480,7 @@ async def update_health_check(
             "success": True,
             "message": f"Health check updated: {health_update.check_id}"
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -363,6 +491,43 @@ async def update_health_check(
         )
 
 
+@router.post(
+    "/health/update/batch",
+    response_model=BatchOperationResponse,
+    summary="Update health checks in batch",
+    description="Send many TTL health check heartbeats in one request"
+)
+async def update_health_checks_batch(
+    batch: HealthCheckBatchUpdate,
+    db: AsyncSession = Depends(get_db)
+) -> BatchOperationResponse:
+    """
+    Update many TTL health checks.
+    
+    Args:
+        batch: Health check updates
+        db: Database session
+    
+    Returns:
+        Per-check results
+    """
+    logger.info(f"API: Batch health check update for {len(batch.updates)} checks")
+    _check_batch_size(len(batch.updates))
+    
+    try:
+        registry = ServiceRegistryService(db)
+        results = await registry.update_health_checks(batch.updates)
+        
+        return BatchOperationResponse.from_results(results)
+    
+    except Exception as e:
+        logger.exception(f"Error updating health checks: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update health checks: {str(e)}"
+        )
+
+
 @router.get(
     "/events/{service_id}",
     response_model=List[ServiceEventResponse],
@@ -381,7 +546,7 @@ async def get_service_events(
         service_id: Service instance ID
         limit: Maximum number of events
         db: Database session
-        
+    
     Returns:
         List of service events
     """
@@ -392,7 +557,7 @@ async def get_service_events(
         events = await registry.get_service_events(service_id, limit)
         
         return [ServiceEventResponse.model_validate(event) for event in events]
-        
+    
     except Exception as e:
         logger.exception(f"Error getting service events: {e}")
         raise HTTPException(
@@ -417,7 +582,7 @@ async def get_all_events(
     Args:
         limit: Maximum number of events
         db: Database session
-        
+    
     Returns:
         List of service events
     """
@@ -428,7 +593,7 @@ async def get_all_events(
         events = await registry.get_service_events(None, limit)
         
         return [ServiceEventResponse.model_validate(event) for event in events]
-        
+    
     except Exception as e:
         logger.exception(f"Error getting all events: {e}")
         raise HTTPException(
@@ -453,7 +618,7 @@ async def deregister_service_by_id(
     Args:
         service_id: Service instance ID
         db: Database session
-        
+    
     Returns:
         Success message
     """
@@ -473,7 +638,7 @@ async def deregister_service_by_id(
             "success": True,
             "message": f"Service {service_id} deregistered successfully"
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -503,12 +668,13 @@ async def get_service_instance(
     
     Args:
         service_name: Name of the service to discover
-        strategy: Load balancing strategy (round_robin, weighted, least_connections, geographic, random)
+        strategy: Load balancing strategy (round_robin, weighted, least_connections, geographic,
+            random, peak_ewma)
         region: Region for geographic routing
         zone: Zone for geographic routing  
         datacenter: Datacenter for geographic routing
         db: Database session
-        
+    
     Returns:
         Selected service instance
     """
@@ -544,7 +710,7 @@ async def get_service_instance(
             meta=instance.meta,
             health_status=instance.health_status
         )
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -555,6 +721,111 @@ async def get_service_instance(
         )
 
 
+async def _receive_command(websocket: WebSocket) -> Dict[str, Any]:
+    """Receive one client command; malformed messages become an empty command."""
+    try:
+        message = await websocket.receive_json()
+    except (ValueError, KeyError):
+        return {}
+    return message if isinstance(message, dict) else {}
+
+
+async def _handle_subscription_command(
+    session: SubscriptionSession,
+    message: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Apply a subscription command and build its reply."""
+    command = message.get("command")
+    service_name = message.get("service")
+    
+    if command == "ping":
+        return {"action": "pong"}
+    
+    if command in ("subscribe", "unsubscribe") and isinstance(service_name, str) and service_name:
+        if command == "unsubscribe":
+            return session.unsubscribe(service_name)
+        try:
+            index = int(message.get("index") or 0)
+        except (TypeError, ValueError):
+            index = 0
+        try:
+            return await session.subscribe(service_name, index=index)
+        except SubscriptionError as e:
+            return {"action": "error", "service": service_name, "error": str(e)}
+    
+    return {"action": "error", "error": "Expected subscribe, unsubscribe or ping command"}
+
+
+@router.websocket("/services/subscribe")
+async def subscribe_services(websocket: WebSocket):
+    """
+    Stream instance changes of services via WebSocket.
+    
+    Clients subscribe to service names and receive a snapshot of each
+    service followed by deltas whenever its instances change (registration,
+    deregistration, health status). Changes are pushed from the catalog's
+    Consul watchers, so failover reaches subscribers without polling.
+    
+    Args:
+        websocket: WebSocket connection
+    
+    WebSocket Messages:
+        - Receive: {"command": "subscribe", "service": str, "index": int}
+          (index is optional; pass the last seen index to resume)
+        - Receive: {"command": "unsubscribe", "service": str}
+        - Receive: {"command": "ping"}
+        - Send: {"action": "snapshot", "service": str, "index": int, "instances": [...]}
+        - Send: {"action": "subscribed", "service": str, "index": int}
+          (resumed index is current, keep the local state)
+        - Send: {"action": "delta", "service": str, "index": int,
+          "previous_index": int, "upserted": [...], "removed": [service_id, ...]}
+        - Send: {"action": "heartbeat"} after WS_HEARTBEAT_INTERVAL seconds of silence
+    """
+    if SubscriptionSession.active >= settings.WS_MAX_CONNECTIONS:
+        await websocket.close(code=1013, reason="Too many subscription connections")
+        return
+    
+    await websocket.accept()
+    session = SubscriptionSession()
+    logger.info("WebSocket: Discovery subscription opened")
+    
+    receive = asyncio.ensure_future(_receive_command(websocket))
+    changes = asyncio.ensure_future(session.changes())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                {receive, changes},
+                timeout=settings.WS_HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                await websocket.send_json({"action": "heartbeat"})
+                continue
+            
+            if receive in done:
+                reply = await _handle_subscription_command(session, receive.result())
+                await websocket.send_json(reply)
+                receive = asyncio.ensure_future(_receive_command(websocket))
+            
+            if changes in done:
+                for message in changes.result():
+                    await websocket.send_json(message)
+                changes = asyncio.ensure_future(session.changes())
+    
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket: Discovery subscription closed ({len(session.services)} services)")
+    except Exception as e:
+        logger.exception(f"WebSocket: Discovery subscription failed: {e}")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        receive.cancel()
+        changes.cancel()
+        session.close()
+
+
 @router.get(
     "/config/{key}",
     summary="Get configuration value",
@@ -570,7 +841,7 @@ async def get_config(
     Args:
         key: Configuration key
         db: Database session
-        
+    
     Returns:
         Configuration value
     """
@@ -591,7 +862,7 @@ async def get_config(
             "key": key,
             "value": value
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -620,7 +891,7 @@ async def set_config(
         key: Configuration key
         value: Configuration value (must contain 'value' field)
         db: Database session
-        
+    
     Returns:
         Success message
     """
@@ -646,7 +917,7 @@ async def set_config(
             "key": key,
             "message": "Configuration stored successfully"
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -657,88 +928,76 @@ async def set_config(
         )
 
 
-@router.websocket("/config/watch/{key}")
+@router.websocket("/config/watch/{key:path}")
 async def watch_config(
     websocket: WebSocket,
-    key: str
+    key: str,
+    prefix: bool = False,
+    index: int = 0
 ):
     """
     Watch configuration changes in real-time via WebSocket.
     
-    Watches a specific configuration key in Consul KV store and sends
-    updates to the client when the value changes.
+    Watches a configuration key (or every key under a prefix) in Consul KV
+    store and sends updates to the client when values change. All clients
+    watching the same key share one Consul blocking query, so changes are
+    pushed as soon as Consul reports them.
     
     Args:
         websocket: WebSocket connection
-        key: Configuration key to watch
-        
+        key: Configuration key (or prefix) to watch
+        prefix: Watch every key under ``key``
+        index: Modify index the client already has; only newer changes are
+            sent (resumption after a reconnect)
+    
     WebSocket Messages:
-        - Send: {"key": str, "value": str, "index": int}
+        - Send: {"key": str, "value": str, "index": int, "action": "initial" | "update"}
+          (index is the key's Consul modify index)
+        - Send: {"key": str, "index": int, "action": "delete"}
+        - Send: {"key": str, "index": int, "keys": [str], "action": "synced"}
+          (prefix watches, after the initial values)
+        - Send: {"key": str, "index": 0, "action": "pending"} when Consul has
+          not answered yet; the initial messages follow once it does
         - Receive: {"command": "ping"} for keepalive
     """
     await websocket.accept()
     logger.info(f"WebSocket: Client connected to watch key: {key}")
     
+    session = ConfigWatchSession()
+    receive = changes = None
     try:
-        from app.core.consul_client import consul_client
-        
-        # Send initial value
-        initial_value = await consul_client.get_kv(key)
-        await websocket.send_json({
-            "key": key,
-            "value": initial_value,
-            "index": 0,
-            "action": "initial"
-        })
+        for message in await session.watch(key, prefix=prefix, index=index):
+            await websocket.send_json(message)
         
-        last_value = initial_value
-        index = 0
-        
-        # Poll for changes (in production, use Consul's blocking queries)
+        receive = asyncio.ensure_future(_receive_command(websocket))
+        changes = asyncio.ensure_future(session.changes())
         while True:
-            try:
-                # Check for client messages (ping/pong)
-                try:
-                    message = await asyncio.wait_for(
-                        websocket.receive_json(),
-                        timeout=0.1
-                    )
-                    if message.get("command") == "ping":
-                        await websocket.send_json({"command": "pong"})
-                except asyncio.TimeoutError:
-                    pass
-                
-                # Poll for value changes every 2 seconds
-                await asyncio.sleep(2)
-                
-                current_value = await consul_client.get_kv(key)
-                
-                # Send update if value changed
-                if current_value != last_value:
-                    index += 1
-                    await websocket.send_json({
-                        "key": key,
-                        "value": current_value,
-                        "index": index,
-                        "action": "update"
-                    })
-                    last_value = current_value
-                    logger.info(f"WebSocket: Sent config update for key: {key}")
-                
-            except WebSocketDisconnect:
-                logger.info(f"WebSocket: Client disconnected from key: {key}")
-                break
-            except Exception as e:
-                logger.error(f"WebSocket: Error watching key {key}: {e}")
-                await websocket.send_json({
-                    "error": str(e),
-                    "action": "error"
-                })
-                break
-                
+            done, _ = await asyncio.wait({receive, changes}, return_when=asyncio.FIRST_COMPLETED)
+            
+            if receive in done:
+                if receive.result().get("command") == "ping":
+                    await websocket.send_json({"command": "pong"})
+                receive = asyncio.ensure_future(_receive_command(websocket))
+            
+            if changes in done:
+                for message in changes.result():
+                    await websocket.send_json(message)
+                changes = asyncio.ensure_future(session.changes())
+                logger.debug(f"WebSocket: Sent config update for key: {key}")
+    
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket: Client disconnected from key: {key}")
+    except ConfigWatchCapacityError as e:
+        logger.warning(f"WebSocket: Refused watch on {key}: {e}")
+        await websocket.close(code=1013, reason=str(e))
     except Exception as e:
         logger.exception(f"WebSocket: Fatal error for key {key}: {e}")
         try:
             await websocket.close(code=1011, reason=str(e))
-        except:
+        except Exception:
             pass
+    finally:
+        for task in (receive, changes):
+            if task is not None:
+                task.cancel()
+        session.close()
@@ -267,15 +267,106 @@ class ServiceDiscoverySettings(Settings):
     CONSUL_SCHEME: str = Field(default="http", description="Consul scheme (http or https)")
     CONSUL_DATACENTER: str = Field(default="dc1", description="Consul datacenter")
     CONSUL_TOKEN: Optional[str] = Field(default=None, description="Consul ACL token")
+    CONSUL_TIMEOUT: float = Field(
+        default=5.0,
+        gt=0,
+        description="Timeout of regular Consul API calls in seconds"
+    )
+    CONSUL_MAX_CONNECTIONS: int = Field(
+        default=50,
+        ge=1,
+        description="Maximum pooled connections to the Consul agent"
+    )
+    CONSUL_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=20,
+        ge=0,
+        description="Idle keep-alive connections kept to the Consul agent"
+    )
+    CONSUL_BLOCKING_WAIT: int = Field(
+        default=55,
+        ge=1,
+        le=600,
+        description="Maximum wait of Consul blocking queries in seconds"
+    )
+    
+    # In-memory service catalog (kept current by blocking queries)
+    CATALOG_ENABLED: bool = Field(
+        default=True,
+        description="Serve discovery from the watched in-memory catalog"
+    )
+    CATALOG_IDLE_TTL: int = Field(
+        default=600,
+        ge=1,
+        description="Stop watching services not looked up for this many seconds"
+    )
+    CATALOG_RETRY_BACKOFF_MAX: float = Field(
+        default=30.0,
+        gt=0,
+        description="Maximum back-off between failed blocking queries in seconds"
+    )
+    CATALOG_MAX_WATCHED_SERVICES: int = Field(
+        default=256,
+        ge=1,
+        description="Services the catalog watches at most (one blocking query each)"
+    )
+    CONFIG_WATCH_MAX_KEYS: int = Field(
+        default=256,
+        ge=1,
+        description="Distinct keys/prefixes watched at most (one blocking query each)"
+    )
+    
+    # Latency-aware load balancing (peak_ewma strategy)
+    LB_EWMA_DECAY_TIME: float = Field(
+        default=10.0,
+        gt=0,
+        description="Seconds for the peak-EWMA latency of an instance to decay by 1/e"
+    )
+    LB_EWMA_FAILURE_PENALTY_MS: float = Field(
+        default=1000.0,
+        ge=0,
+        description="Latency recorded for a failed request (minimum), in milliseconds"
+    )
     
     # Service registration
     SERVICE_TTL: int = Field(default=30, description="Service TTL in seconds")
     HEALTH_CHECK_INTERVAL: str = Field(default="10s", description="Health check interval")
     HEALTH_CHECK_TIMEOUT: str = Field(default="5s", description="Health check timeout")
+    REGISTRY_BATCH_MAX_SIZE: int = Field(
+        default=500,
+        ge=1,
+        description="Maximum items in one batch register/deregister/heartbeat request"
+    )
+    REGISTRY_BATCH_CONCURRENCY: int = Field(
+        default=16,
+        ge=1,
+        description="Concurrent Consul agent calls while processing a batch"
+    )
+    
+    # Service event (audit) log, written in batches off the request path
+    EVENT_LOG_BATCH_SIZE: int = Field(
+        default=100,
+        ge=1,
+        description="Service events inserted per statement"
+    )
+    EVENT_LOG_FLUSH_INTERVAL: float = Field(
+        default=1.0,
+        gt=0,
+        description="Maximum seconds a service event waits in the buffer"
+    )
+    EVENT_LOG_MAX_PENDING: int = Field(
+        default=10000,
+        ge=1,
+        description="Buffered service events before callers must wait for a write"
+    )
     
     # WebSocket
     WS_HEARTBEAT_INTERVAL: int = Field(default=30, description="WebSocket heartbeat interval")
     WS_MAX_CONNECTIONS: int = Field(default=1000, description="Max WebSocket connections")
+    SUBSCRIPTION_MAX_SERVICES: int = Field(
+        default=100,
+        ge=1,
+        description="Services one discovery subscription connection may watch"
+    )
 
 
 # ==============================================================================
@@ -57,5 +57,21 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 """
 
 from app.core.consul_client import consul_client, ConsulClient, HealthCheck, ServiceInstance
+from app.core.service_catalog import service_catalog, ServiceCatalog
+from app.core.subscriptions import SubscriptionSession
+from app.core.config_watch import config_watch_hub, ConfigWatchHub
+from app.core.event_writer import service_event_writer, ServiceEventWriter
 
-__all__ = ["consul_client", "ConsulClient", "HealthCheck", "ServiceInstance"]
+__all__ = [
+    "consul_client",
+    "ConsulClient",
+    "HealthCheck",
+    "ServiceInstance",
+    "service_catalog",
+    "ServiceCatalog",
+    "SubscriptionSession",
+    "config_watch_hub",
+    "ConfigWatchHub",
+    "service_event_writer",
+    "ServiceEventWriter",
+]
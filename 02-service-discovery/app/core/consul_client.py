@@ -6,7 +6,7 @@ Project      : Gravity MicroServices Platform
 File         : consul_client.py
 Description  : HashiCorp Consul client wrapper for service discovery.
 Language     : English (UK)
-Framework    : python-consul2 / Python 3.11+
+Framework    : httpx / Python 3.11+
 
 ================================================================================
 AUTHORSHIP & CONTRIBUTION (مشارکت‌کنندگان)
@@ -19,7 +19,7 @@ Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
 TIMELINE & EFFORT (زمان‌بندی و تلاش)
 ================================================================================
 Created Date      : 2025-11-07 20:15 UTC
-Last Modified     : 2025-11-07 20:15 UTC
+Last Modified     : 2025-11-29 10:00 UTC
 Development Time  : 2 hours 0 minutes
 Review Time       : 0 hours 30 minutes
 Testing Time      : 1 hour 0 minutes
@@ -38,12 +38,16 @@ Total Cost        : $525.00 USD
 VERSION HISTORY (تاریخچه نسخه)
 ================================================================================
 v1.0.0 - 2025-11-07 - Elena Volkov - Initial implementation
+v2.0.0 - 2025-11-21 - Elena Volkov - Native async HTTP client with blocking queries
+v2.1.0 - 2025-11-23 - Elena Volkov - Blocking KV queries for the config watch hub
+v2.2.0 - 2025-11-28 - Elena Volkov - Separate connection pool for blocking queries
+v2.3.0 - 2025-11-29 - Elena Volkov - Blocking query for the service names
 
 ================================================================================
 DEPENDENCIES (وابستگی‌ها)
 ================================================================================
-Internal  : app.config
-External  : consul, httpx
+Internal  : app.config, app.core.metrics
+External  : httpx
 Database  : N/A
 
 ================================================================================
@@ -56,13 +60,15 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
-import consul
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Set, Tuple
 from dataclasses import dataclass
+from urllib.parse import quote
+import base64
 import httpx
 
 from app.config import settings
+from app.core.metrics import track_consul_operation
 
 logger = logging.getLogger(__name__)
 
@@ -92,27 +98,120 @@ class ServiceInstance:
     health_status: str  # passing, warning, critical
 
 
+@dataclass
+class KVEntry:
+    """Consul KV entry."""
+    key: str
+    value: Optional[str]
+    modify_index: int
+
+
 class ConsulClient:
     """
-    HashiCorp Consul client wrapper.
+    Asynchronous HashiCorp Consul HTTP API client.
     
     Provides simplified interface for service registration, discovery,
-    health checks, and KV store operations.
+    health checks, and KV store operations. Regular calls go through one pooled
+    ``httpx.AsyncClient`` with a per-call timeout, so a slow Consul agent
+    never blocks the event loop. Long-poll blocking queries are available
+    through ``watch_service`` and ``watch_kv``; they hold a connection for
+    up to CONSUL_BLOCKING_WAIT and therefore use a second client whose pool
+    is not limited, so watches can never starve registrations, heartbeats
+    or KV calls. The number of watches is bounded by their owners.
     """
     
-    def __init__(self, host=None, port=None, token=None, datacenter=None):
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        token=None,
+        datacenter=None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """Initialize Consul client."""
-        self.consul = consul.Consul(
-            host=host or settings.CONSUL_HOST,
-            port=port or settings.CONSUL_PORT,
-            scheme=settings.CONSUL_SCHEME,
-            token=token if token is not None else settings.CONSUL_TOKEN,
-            dc=datacenter or settings.CONSUL_DATACENTER
-        )
-        logger.info(
-            f"Consul client initialized: {settings.CONSUL_SCHEME}://"
+        self.base_url = (
+            f"{settings.CONSUL_SCHEME}://"
             f"{host or settings.CONSUL_HOST}:{port or settings.CONSUL_PORT}"
         )
+        self.datacenter = datacenter or settings.CONSUL_DATACENTER
+        self.timeout = settings.CONSUL_TIMEOUT
+        
+        token = token if token is not None else settings.CONSUL_TOKEN
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-Consul-Token": token} if token else {},
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=settings.CONSUL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CONSUL_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            transport=transport
+        )
+        self.watch_client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-Consul-Token": token} if token else {},
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=settings.CONSUL_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            transport=transport
+        )
+        
+        # Metric-tracking senders, one per operation label
+        self._senders: Dict[str, Any] = {}
+        
+        logger.info(f"Consul client initialized: {self.base_url}")
+    
+    async def close(self) -> None:
+        """Close pooled connections."""
+        await self.client.aclose()
+        await self.watch_client.aclose()
+    
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        path: str,
+        timeout: Optional[float] = None,
+        allow_not_found: bool = False,
+        watch: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send one Consul API request, recorded under ``operation``.
+        
+        Blocking queries pass ``watch=True`` to use the watch connection pool.
+        
+        Raises:
+            httpx.HTTPError: On transport errors, timeouts and non-2xx answers
+                (404 is returned instead when ``allow_not_found`` is set)
+        """
+        sender = self._senders.get(operation)
+        if sender is None:
+            sender = self._senders[operation] = track_consul_operation(operation)(self._send)
+        return await sender(method, path, timeout, allow_not_found, watch, **kwargs)
+    
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        timeout: Optional[float],
+        allow_not_found: bool,
+        watch: bool,
+        **kwargs
+    ) -> httpx.Response:
+        """Send a request and raise for non-2xx responses."""
+        client = self.watch_client if watch else self.client
+        response = await client.request(
+            method,
+            path,
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            **kwargs
+        )
+        if not (allow_not_found and response.status_code == 404):
+            response.raise_for_status()
+        return response
     
     async def register_service(
         self,
@@ -135,39 +234,35 @@ class ConsulClient:
             tags: Optional tags for service metadata
             meta: Optional metadata key-value pairs
             health_check: Optional health check configuration
-            
+        
         Returns:
             True if registration successful, False otherwise
         """
         try:
+            payload: Dict[str, Any] = {
+                "ID": service_id,
+                "Name": service_name,
+                "Address": address,
+                "Port": port,
+                "Tags": tags or [],
+                "Meta": meta or {},
+            }
+            
             # Prepare health check
-            check = None
             if health_check:
-                check = self._prepare_health_check(
+                payload["Check"] = self._prepare_health_check(
                     service_id, address, port, health_check
                 )
             
             # Register service
-            success = self.consul.agent.service.register(
-                name=service_name,
-                service_id=service_id,
-                address=address,
-                port=port,
-                tags=tags or [],
-                meta=meta or {},
-                check=check
-            )
-            
-            if success:
-                logger.info(
-                    f"Service registered: {service_id} ({service_name}) "
-                    f"at {address}:{port}"
-                )
-            else:
-                logger.error(f"Failed to register service: {service_id}")
-            
-            return success
+            await self._request("register", "PUT", "/v1/agent/service/register", json=payload)
             
+            logger.info(
+                f"Service registered: {service_id} ({service_name}) "
+                f"at {address}:{port}"
+            )
+            return True
+        
         except Exception as e:
             logger.exception(f"Error registering service {service_id}: {e}")
             return False
@@ -188,15 +283,15 @@ class ConsulClient:
             check["http"] = health_check.http_endpoint or f"http://{address}:{port}/health"
             check["interval"] = health_check.interval
             check["timeout"] = health_check.timeout
-            
+        
         elif health_check.check_type == "tcp":
             check["tcp"] = health_check.tcp_address or f"{address}:{port}"
             check["interval"] = health_check.interval
             check["timeout"] = health_check.timeout
-            
+        
         elif health_check.check_type == "ttl":
             check["ttl"] = health_check.ttl or "30s"
-            
+        
         elif health_check.check_type == "grpc":
             check["grpc"] = health_check.grpc_endpoint or f"{address}:{port}"
             check["interval"] = health_check.interval
@@ -210,24 +305,50 @@ class ConsulClient:
         
         Args:
             service_id: Unique identifier of the service instance
-            
+        
         Returns:
             True if deregistration successful, False otherwise
         """
         try:
-            success = self.consul.agent.service.deregister(service_id)
-            
-            if success:
-                logger.info(f"Service deregistered: {service_id}")
-            else:
-                logger.error(f"Failed to deregister service: {service_id}")
-            
-            return success
-            
+            await self._request(
+                "deregister", "PUT", f"/v1/agent/service/deregister/{quote(service_id, safe='')}"
+            )
+            logger.info(f"Service deregistered: {service_id}")
+            return True
+        
         except Exception as e:
             logger.exception(f"Error deregistering service {service_id}: {e}")
             return False
     
+    def _health_params(
+        self,
+        passing_only: bool,
+        tag: Optional[str],
+        datacenter: Optional[str]
+    ) -> Dict[str, str]:
+        """Query parameters of a health/service request."""
+        params = {"dc": datacenter or self.datacenter}
+        if passing_only:
+            params["passing"] = "1"
+        if tag:
+            params["tag"] = tag
+        return params
+    
+    def _parse_instances(self, services: List[Dict[str, Any]]) -> List[ServiceInstance]:
+        """Convert a health/service response body into instances."""
+        return [
+            ServiceInstance(
+                service_id=service['Service']['ID'],
+                service_name=service['Service']['Service'],
+                address=service['Service']['Address'],
+                port=service['Service']['Port'],
+                tags=service['Service'].get('Tags') or [],
+                meta=service['Service'].get('Meta') or {},
+                health_status=self._get_health_status(service['Checks'])
+            )
+            for service in services
+        ]
+    
     async def discover_service(
         self,
         service_name: str,
@@ -243,41 +364,113 @@ class ConsulClient:
             passing_only: Only return instances with passing health checks
             tag: Optional tag to filter by
             datacenter: Optional datacenter to query
-            
+        
         Returns:
             List of service instances
         """
         try:
-            index, services = self.consul.health.service(
-                service=service_name,
-                passing=passing_only,
-                tag=tag,
-                dc=datacenter or settings.CONSUL_DATACENTER
+            response = await self._request(
+                "discover",
+                "GET",
+                f"/v1/health/service/{quote(service_name, safe='')}",
+                params=self._health_params(passing_only, tag, datacenter)
             )
-            
-            instances = []
-            for service in services:
-                instance = ServiceInstance(
-                    service_id=service['Service']['ID'],
-                    service_name=service['Service']['Service'],
-                    address=service['Service']['Address'],
-                    port=service['Service']['Port'],
-                    tags=service['Service'].get('Tags', []),
-                    meta=service['Service'].get('Meta', {}),
-                    health_status=self._get_health_status(service['Checks'])
-                )
-                instances.append(instance)
+            instances = self._parse_instances(response.json())
             
             logger.debug(
                 f"Discovered {len(instances)} instances of service: {service_name}"
             )
             
             return instances
-            
+        
         except Exception as e:
             logger.exception(f"Error discovering service {service_name}: {e}")
             return []
     
+    async def watch_service(
+        self,
+        service_name: str,
+        index: int = 0,
+        wait: Optional[int] = None,
+        passing_only: bool = False,
+        tag: Optional[str] = None,
+        datacenter: Optional[str] = None
+    ) -> Tuple[int, List[ServiceInstance]]:
+        """
+        Blocking query for the instances of a service.
+        
+        Consul holds the request until the service's ``X-Consul-Index``
+        moves past ``index`` or ``wait`` seconds elapse; with ``index=0`` it
+        answers immediately. Unlike ``discover_service`` errors are raised so
+        that watchers can back off.
+        
+        Args:
+            service_name: Name of the service to watch
+            index: Last seen ``X-Consul-Index`` (0 = return immediately)
+            wait: Maximum blocking time in seconds (default CONSUL_BLOCKING_WAIT)
+            passing_only: Only return instances with passing health checks
+            tag: Optional tag to filter by
+            datacenter: Optional datacenter to query
+        
+        Returns:
+            Tuple of (new index, instances)
+        
+        Raises:
+            httpx.HTTPError: If Consul is unreachable or answers with an error
+        """
+        wait = wait if wait is not None else settings.CONSUL_BLOCKING_WAIT
+        params = self._health_params(passing_only, tag, datacenter)
+        params["index"] = str(index)
+        params["wait"] = f"{wait}s"
+        
+        # Consul adds up to wait/16 of jitter before answering
+        response = await self._request(
+            "watch",
+            "GET",
+            f"/v1/health/service/{quote(service_name, safe='')}",
+            timeout=wait + wait / 16 + self.timeout,
+            watch=True,
+            params=params
+        )
+        
+        new_index = int(response.headers.get("X-Consul-Index", "0"))
+        return new_index, self._parse_instances(response.json())
+    
+    async def watch_services(
+        self,
+        index: int = 0,
+        wait: Optional[int] = None
+    ) -> Tuple[int, Set[str]]:
+        """
+        Blocking query for the names of all registered services.
+        
+        Consul holds the request until a service is added to or removed from
+        the catalog (or ``wait`` seconds elapse); with ``index=0`` it answers
+        immediately. Errors are raised so that watchers can back off.
+        
+        Args:
+            index: Last seen ``X-Consul-Index`` (0 = return immediately)
+            wait: Maximum blocking time in seconds (default CONSUL_BLOCKING_WAIT)
+        
+        Returns:
+            Tuple of (new index, service names)
+        
+        Raises:
+            httpx.HTTPError: If Consul is unreachable or answers with an error
+        """
+        wait = wait if wait is not None else settings.CONSUL_BLOCKING_WAIT
+        response = await self._request(
+            "services_watch",
+            "GET",
+            "/v1/catalog/services",
+            timeout=wait + wait / 16 + self.timeout,
+            watch=True,
+            params={"dc": self.datacenter, "index": str(index), "wait": f"{wait}s"}
+        )
+        
+        new_index = int(response.headers.get("X-Consul-Index", "0"))
+        return new_index, set(response.json())
+    
     def _get_health_status(self, checks: List[Dict]) -> str:
         """Determine overall health status from checks."""
         if not checks:
@@ -300,10 +493,13 @@ class ConsulClient:
             Dictionary mapping service names to their tags
         """
         try:
-            index, services = self.consul.catalog.services()
+            response = await self._request(
+                "catalog", "GET", "/v1/catalog/services", params={"dc": self.datacenter}
+            )
+            services = response.json()
             logger.debug(f"Found {len(services)} registered services")
             return services
-            
+        
         except Exception as e:
             logger.exception(f"Error getting all services: {e}")
             return {}
@@ -316,23 +512,23 @@ class ConsulClient:
             check_id: Health check ID
             status: Health status (pass, warn, fail)
             output: Optional output message
-            
+        
         Returns:
             True if update successful, False otherwise
         """
+        if status not in ("pass", "warn", "fail"):
+            logger.error(f"Invalid health check status: {status}")
+            return False
+        
         try:
-            if status == "pass":
-                success = self.consul.agent.check.ttl_pass(check_id, output)
-            elif status == "warn":
-                success = self.consul.agent.check.ttl_warn(check_id, output)
-            elif status == "fail":
-                success = self.consul.agent.check.ttl_fail(check_id, output)
-            else:
-                logger.error(f"Invalid health check status: {status}")
-                return False
-            
-            return success
-            
+            await self._request(
+                "health_check",
+                "PUT",
+                f"/v1/agent/check/{status}/{quote(check_id, safe='')}",
+                params={"note": output} if output else None
+            )
+            return True
+        
         except Exception as e:
             logger.exception(f"Error updating health check {check_id}: {e}")
             return False
@@ -344,16 +540,19 @@ class ConsulClient:
         Args:
             key: Key name
             value: Value to store
-            
+        
         Returns:
             True if storage successful, False otherwise
         """
         try:
-            success = self.consul.kv.put(key, value)
+            response = await self._request(
+                "kv_put", "PUT", f"/v1/kv/{quote(key)}", content=value.encode("utf-8")
+            )
+            success = response.json() is True
             if success:
                 logger.debug(f"KV stored: {key}")
             return success
-            
+        
         except Exception as e:
             logger.exception(f"Error storing KV {key}: {e}")
             return False
@@ -364,36 +563,98 @@ class ConsulClient:
         
         Args:
             key: Key name
-            
+        
         Returns:
             Value if found, None otherwise
         """
         try:
-            index, data = self.consul.kv.get(key)
-            if data:
-                return data['Value'].decode('utf-8')
-            return None
+            response = await self._request(
+                "kv_get", "GET", f"/v1/kv/{quote(key)}", allow_not_found=True
+            )
+            if response.status_code == 404:
+                return None
             
+            data = response.json()
+            if data and data[0].get('Value') is not None:
+                return base64.b64decode(data[0]['Value']).decode('utf-8')
+            return None
+        
         except Exception as e:
             logger.exception(f"Error retrieving KV {key}: {e}")
             return None
     
+    async def watch_kv(
+        self,
+        key: str,
+        index: int = 0,
+        wait: Optional[int] = None,
+        recurse: bool = False
+    ) -> Tuple[int, Dict[str, KVEntry]]:
+        """
+        Blocking query for a key, or for every key under a prefix.
+        
+        Behaves like ``watch_service``: Consul answers once the index moves
+        past ``index`` (immediately for 0) and errors are raised. A missing
+        key is not an error; it yields no entries.
+        
+        Args:
+            key: Key name, or prefix when ``recurse`` is set
+            index: Last seen ``X-Consul-Index`` (0 = return immediately)
+            wait: Maximum blocking time in seconds (default CONSUL_BLOCKING_WAIT)
+            recurse: Return all keys under the prefix
+        
+        Returns:
+            Tuple of (new index, entries by key)
+        
+        Raises:
+            httpx.HTTPError: If Consul is unreachable or answers with an error
+        """
+        wait = wait if wait is not None else settings.CONSUL_BLOCKING_WAIT
+        params = {"index": str(index), "wait": f"{wait}s"}
+        if recurse:
+            params["recurse"] = "true"
+        
+        response = await self._request(
+            "kv_watch",
+            "GET",
+            f"/v1/kv/{quote(key)}",
+            timeout=wait + wait / 16 + self.timeout,
+            allow_not_found=True,
+            watch=True,
+            params=params
+        )
+        
+        new_index = int(response.headers.get("X-Consul-Index", "0"))
+        if response.status_code == 404:
+            return new_index, {}
+        
+        entries = {}
+        for item in response.json() or []:
+            value = item.get("Value")
+            entries[item["Key"]] = KVEntry(
+                key=item["Key"],
+                value=base64.b64decode(value).decode("utf-8") if value is not None else None,
+                modify_index=item.get("ModifyIndex", 0)
+            )
+        return new_index, entries
+    
     async def delete_kv(self, key: str) -> bool:
         """
         Delete a key from Consul KV store.
         
         Args:
             key: Key name
-            
+        
         Returns:
             True if deletion successful, False otherwise
         """
         try:
-            success = self.consul.kv.delete(key)
+            response = await self._request("kv_delete", "DELETE", f"/v1/kv/{quote(key)}")
+            success = response.json() is True
             if success:
                 logger.debug(f"KV deleted: {key}")
             return success
-            
+        
         except Exception as e:
             logger.exception(f"Error deleting KV {key}: {e}")
             return False
@@ -407,9 +668,9 @@ class ConsulClient:
         """
         try:
             # Try to get leader
-            leader = self.consul.status.leader()
-            return leader is not None
-            
+            response = await self._request("status", "GET", "/v1/status/leader")
+            return bool(response.json())
+        
         except Exception as e:
             logger.exception(f"Consul health check failed: {e}")
             return False
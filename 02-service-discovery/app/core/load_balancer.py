@@ -12,14 +12,14 @@ Framework    : Python 3.11+
 AUTHORSHIP & CONTRIBUTION (مشارکت‌کنندگان)
 ================================================================================
 Primary Author    : Elena Volkov (Backend & Integration Lead)
-Contributors      : None
+Contributors      : Takeshi Yamamoto (Performance Engineer)
 Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
 
 ================================================================================
 TIMELINE & EFFORT (زمان‌بندی و تلاش)
 ================================================================================
 Created Date      : 2025-11-07 20:30 UTC
-Last Modified     : 2025-11-07 20:30 UTC
+Last Modified     : 2025-11-29 16:00 UTC
 Development Time  : 1 hour 30 minutes
 Review Time       : 0 hours 20 minutes
 Testing Time      : 0 hours 40 minutes
@@ -38,11 +38,14 @@ Total Cost        : $375.00 USD
 VERSION HISTORY (تاریخچه نسخه)
 ================================================================================
 v1.0.0 - 2025-11-07 - Elena Volkov - Initial implementation
+v1.1.0 - 2025-11-24 - Takeshi Yamamoto - Precomputed selection state, alias tables, lock-free counters
+v1.2.0 - 2025-11-25 - Takeshi Yamamoto - Peak-EWMA power-of-two-choices strategy, completion feedback
+v1.2.1 - 2025-11-29 - Takeshi Yamamoto - Ignore completions of instances never selected
 
 ================================================================================
 DEPENDENCIES (وابستگی‌ها)
 ================================================================================
-Internal  : app.core.consul_client
+Internal  : app.config, app.core.consul_client
 External  : None
 Database  : Redis (for connection tracking)
 
@@ -56,17 +59,85 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
+import heapq
+import math
 import random
 import logging
-from typing import List, Optional, Dict
+import itertools
+import time
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
 from abc import ABC, abstractmethod
 from collections import defaultdict
-import asyncio
 
+from app.config import settings
 from app.core.consul_client import ServiceInstance
 
 logger = logging.getLogger(__name__)
 
+S = TypeVar("S")
+
+# Share of traffic an instance keeps for its health status (weighted strategy)
+HEALTH_WEIGHT_FACTORS: Dict[str, float] = {
+    "passing": 1.0,
+    "warning": 0.25,
+    "critical": 0.0,
+}
+
+
+def instance_weight(instance: ServiceInstance) -> float:
+    """Configured ``meta['weight']`` (default 1) scaled by the health status."""
+    try:
+        weight = max(float(instance.meta.get('weight', 1)), 0.0)
+    except (TypeError, ValueError):
+        weight = 1.0
+    return weight * HEALTH_WEIGHT_FACTORS.get(instance.health_status, 1.0)
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table for O(1) weighted random selection.
+    
+    Built once per instance set in O(n); each pick is two random numbers
+    and one comparison, independent of the number of instances.
+    """
+    
+    __slots__ = ("instances", "probability", "alias")
+    
+    def __init__(self, instances: List[ServiceInstance], weights: List[float]):
+        """
+        Build the table.
+        
+        Args:
+            instances: Instances to choose from
+            weights: Non-negative weight per instance (all zero = uniform)
+        """
+        count = len(instances)
+        total = sum(weights)
+        if total <= 0:
+            weights, total = [1.0] * count, float(count)
+        
+        scaled = [weight * count / total for weight in weights]
+        self.instances = instances
+        self.probability = [1.0] * count
+        self.alias = list(range(count))
+        
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.probability[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1.0 - scaled[low]
+            (small if scaled[high] < 1.0 else large).append(high)
+        # Whatever is left has probability 1 (up to rounding)
+    
+    def pick(self) -> ServiceInstance:
+        """Draw one instance with probability proportional to its weight."""
+        column = int(random.random() * len(self.instances))
+        if random.random() < self.probability[column]:
+            return self.instances[column]
+        return self.instances[self.alias[column]]
+
 
 class LoadBalancer(ABC):
     """Abstract base class for load balancing strategies."""
@@ -83,20 +154,86 @@ class LoadBalancer(ABC):
         Args:
             instances: List of available service instances
             **kwargs: Additional strategy-specific parameters
-            
+        
         Returns:
             Selected service instance or None if no instances available
         """
         pass
+    
+    async def record_completion(
+        self,
+        service_id: str,
+        latency_ms: Optional[float] = None,
+        success: bool = True
+    ) -> None:
+        """
+        Report that a request sent to a selected instance finished.
+        
+        Strategies that track in-flight requests or latency use it; the
+        others ignore it.
+        
+        Args:
+            service_id: Instance the request was sent to
+            latency_ms: Observed response time in milliseconds
+            success: Whether the request succeeded
+        """
+
+
+class PrecomputedLoadBalancer(LoadBalancer, Generic[S]):
+    """
+    Strategy whose selection structure is derived from the instance set.
+    
+    The structure is cached per service and rebuilt only when a different
+    instance list is passed in. The catalog returns the same list object
+    until the service's instances change, so in steady state selection
+    never re-reads metadata.
+    """
+    
+    # Instance lists (e.g. different filters) kept per service
+    max_states_per_service = 4
+    
+    def __init__(self):
+        self._prepared: Dict[str, Dict[int, Tuple[List[ServiceInstance], int, S]]] = {}
+    
+    @abstractmethod
+    def _prepare(self, instances: List[ServiceInstance]) -> S:
+        """Build the selection structure for an instance set."""
+    
+    def _state(self, instances: List[ServiceInstance]) -> S:
+        """Selection structure for an instance set, rebuilt only on change."""
+        states = self._prepared.get(instances[0].service_name)
+        if states is None:
+            states = self._prepared[instances[0].service_name] = {}
+        
+        cached = states.get(id(instances))
+        if cached is not None and cached[0] is instances and cached[1] == len(instances):
+            return cached[2]
+        
+        if len(states) >= self.max_states_per_service:
+            states.clear()
+        state = self._prepare(instances)
+        # Keep a reference to the list so its identity cannot be reused
+        states[id(instances)] = (instances, len(instances), state)
+        return state
+    
+    def _states(self):
+        """All cached selection structures."""
+        for states in self._prepared.values():
+            for _, _, state in states.values():
+                yield state
 
 
 class RoundRobinLoadBalancer(LoadBalancer):
-    """Round-robin load balancing strategy."""
+    """
+    Round-robin load balancing strategy.
+    
+    Uses one ``itertools.count`` per service; taking the next value is a
+    single atomic step, so no lock is needed.
+    """
     
     def __init__(self):
         """Initialize round-robin load balancer."""
-        self._counters: Dict[str, int] = defaultdict(int)
-        self._lock = asyncio.Lock()
+        self._counters: Dict[str, Any] = defaultdict(itertools.count)
     
     async def select_instance(
         self,
@@ -115,16 +252,12 @@ class RoundRobinLoadBalancer(LoadBalancer):
             return instances[0]
         
         # Use service name as key for counter
-        service_name = instances[0].service_name
-        
-        async with self._lock:
-            counter = self._counters[service_name]
-            selected = instances[counter % len(instances)]
-            self._counters[service_name] = counter + 1
+        position = next(self._counters[instances[0].service_name]) % len(instances)
+        selected = instances[position]
         
         logger.debug(
             f"Round-robin selected: {selected.service_id} "
-            f"({counter % len(instances)} of {len(instances)})"
+            f"({position} of {len(instances)})"
         )
         
         return selected
@@ -153,8 +286,17 @@ class RandomLoadBalancer(LoadBalancer):
         return selected
 
 
-class WeightedLoadBalancer(LoadBalancer):
-    """Weighted load balancing strategy."""
+class WeightedLoadBalancer(PrecomputedLoadBalancer[AliasTable]):
+    """
+    Weighted load balancing strategy.
+    
+    Weights come from ``meta['weight']`` (default 1) and are scaled down for
+    instances whose health is warning or critical. They are parsed once per
+    instance set into an alias table.
+    """
+    
+    def _prepare(self, instances: List[ServiceInstance]) -> AliasTable:
+        return AliasTable(instances, [instance_weight(instance) for instance in instances])
     
     async def select_instance(
         self,
@@ -170,14 +312,7 @@ class WeightedLoadBalancer(LoadBalancer):
         if not instances:
             return None
         
-        # Extract weights from metadata
-        weights = []
-        for instance in instances:
-            weight = int(instance.meta.get('weight', 1))
-            weights.append(weight)
-        
-        # Weighted random selection
-        selected = random.choices(instances, weights=weights, k=1)[0]
+        selected = self._state(instances).pick()
         
         logger.debug(
             f"Weighted selected: {selected.service_id} "
@@ -187,13 +322,70 @@ class WeightedLoadBalancer(LoadBalancer):
         return selected
 
 
-class LeastConnectionsLoadBalancer(LoadBalancer):
-    """Least connections load balancing strategy."""
+class ConnectionHeap:
+    """
+    Min-heap of ``(active connections, position)`` for one instance set.
+    
+    Counts live in the balancer's shared dictionary; heap entries are
+    refreshed lazily when they surface, so a selection is O(log n) instead
+    of a scan over every instance.
+    """
+    
+    __slots__ = ("instances", "positions", "heap")
+    
+    def __init__(self, instances: List[ServiceInstance], connections: Dict[str, int]):
+        self.instances = instances
+        self.positions = {instance.service_id: i for i, instance in enumerate(instances)}
+        self.rebuild(connections)
+    
+    def rebuild(self, connections: Dict[str, int]) -> None:
+        """Rebuild the heap from the current counts."""
+        self.heap = [
+            (connections.get(instance.service_id, 0), i)
+            for i, instance in enumerate(self.instances)
+        ]
+        heapq.heapify(self.heap)
+    
+    def acquire(self, connections: Dict[str, int]) -> ServiceInstance:
+        """Take the instance with the fewest connections (first one on ties)."""
+        heap = self.heap
+        while True:
+            count, position = heap[0]
+            instance = self.instances[position]
+            current = connections.get(instance.service_id, 0)
+            if count == current:
+                connections[instance.service_id] = current + 1
+                heapq.heapreplace(heap, (current + 1, position))
+                return instance
+            if count < current:
+                # Selected through another instance set meanwhile
+                heapq.heapreplace(heap, (current, position))
+            else:
+                # Superseded by the entry pushed on release
+                heapq.heappop(heap)
+    
+    def released(self, service_id: str, count: int) -> None:
+        """Record a lowered count for an instance of this set."""
+        position = self.positions.get(service_id)
+        if position is not None:
+            heapq.heappush(self.heap, (count, position))
+
+
+class LeastConnectionsLoadBalancer(PrecomputedLoadBalancer[ConnectionHeap]):
+    """
+    Least connections load balancing strategy.
+    
+    Selection and release never await, so the counters are updated without
+    a lock. Each instance set keeps a heap of connection counts.
+    """
     
     def __init__(self):
         """Initialize least connections load balancer."""
+        super().__init__()
         self._connections: Dict[str, int] = defaultdict(int)
-        self._lock = asyncio.Lock()
+    
+    def _prepare(self, instances: List[ServiceInstance]) -> ConnectionHeap:
+        return ConnectionHeap(instances, self._connections)
     
     async def select_instance(
         self,
@@ -208,28 +400,12 @@ class LeastConnectionsLoadBalancer(LoadBalancer):
         if not instances:
             return None
         
-        async with self._lock:
-            # Find instance with minimum connections
-            min_connections = float('inf')
-            selected = None
-            
-            for instance in instances:
-                connections = self._connections[instance.service_id]
-                if connections < min_connections:
-                    min_connections = connections
-                    selected = instance
-            
-            # Increment connection count
-            if selected:
-                self._connections[selected.service_id] += 1
-        
-        if selected is not None:
-            logger.debug(
-                f"Least connections selected: {selected.service_id} "
-                f"({min_connections} active connections)"
-            )
-        else:
-            logger.debug("Least connections: No instance selected")
+        selected = self._state(instances).acquire(self._connections)
+        
+        logger.debug(
+            f"Least connections selected: {selected.service_id} "
+            f"({self._connections[selected.service_id] - 1} active connections)"
+        )
         
         return selected
     
@@ -237,19 +413,57 @@ class LeastConnectionsLoadBalancer(LoadBalancer):
         """
         Release a connection for the given service instance.
         
+        Unknown IDs (instances without active connections) are ignored, so
+        releases cannot create counters.
+        
         Args:
             service_id: Service instance ID
         """
-        async with self._lock:
-            if self._connections[service_id] > 0:
-                self._connections[service_id] -= 1
+        count = self._connections.get(service_id, 0)
+        if count > 0:
+            count -= 1
+            if count:
+                self._connections[service_id] = count
+            else:
+                del self._connections[service_id]
+            for state in self._states():
+                state.released(service_id, count)
+                if len(state.heap) > 2 * len(state.instances) + 64:
+                    state.rebuild(self._connections)
         
         logger.debug(f"Released connection for: {service_id}")
+    
+    async def record_completion(
+        self,
+        service_id: str,
+        latency_ms: Optional[float] = None,
+        success: bool = True
+    ) -> None:
+        """Release the connection taken when the instance was selected."""
+        await self.release_connection(service_id)
 
 
-class GeographicLoadBalancer(LoadBalancer):
+class GeographicBuckets:
+    """Instances of one instance set grouped by zone and region."""
+    
+    __slots__ = ("zones", "regions")
+    
+    def __init__(self, instances: List[ServiceInstance]):
+        self.zones: Dict[str, List[ServiceInstance]] = defaultdict(list)
+        self.regions: Dict[str, List[ServiceInstance]] = defaultdict(list)
+        for instance in instances:
+            if instance.meta.get('zone'):
+                self.zones[instance.meta['zone']].append(instance)
+            if instance.meta.get('region'):
+                self.regions[instance.meta['region']].append(instance)
+
+
+class GeographicLoadBalancer(PrecomputedLoadBalancer[GeographicBuckets]):
     """Geographic load balancing strategy."""
     
+    def _prepare(self, instances: List[ServiceInstance]) -> GeographicBuckets:
+        return GeographicBuckets(instances)
+    
     async def select_instance(
         self,
         instances: List[ServiceInstance],
@@ -270,25 +484,20 @@ class GeographicLoadBalancer(LoadBalancer):
         
         client_region = kwargs.get('client_region')
         client_zone = kwargs.get('client_zone')
+        buckets = self._state(instances)
         
-        # Filter by zone first (most specific)
+        # Zone first (most specific)
         if client_zone:
-            zone_instances = [
-                inst for inst in instances
-                if inst.meta.get('zone') == client_zone
-            ]
+            zone_instances = buckets.zones.get(client_zone)
             if zone_instances:
                 logger.debug(
                     f"Geographic: Found {len(zone_instances)} instances in zone {client_zone}"
                 )
                 return random.choice(zone_instances)
         
-        # Filter by region
+        # Then region
         if client_region:
-            region_instances = [
-                inst for inst in instances
-                if inst.meta.get('region') == client_region
-            ]
+            region_instances = buckets.regions.get(client_region)
             if region_instances:
                 logger.debug(
                     f"Geographic: Found {len(region_instances)} instances in region {client_region}"
@@ -300,6 +509,174 @@ class GeographicLoadBalancer(LoadBalancer):
         return random.choice(instances)
 
 
+class EwmaStats:
+    """Peak-EWMA latency and in-flight requests of one instance."""
+    
+    __slots__ = ("latency", "stamp", "outstanding")
+    
+    def __init__(self, now: float):
+        self.latency = 0.0  # Milliseconds
+        self.stamp = now
+        self.outstanding = 0
+
+
+class PeakEwmaLoadBalancer(LoadBalancer):
+    """
+    Latency-aware strategy: peak-EWMA with power of two choices.
+    
+    Every instance has an exponentially weighted moving average of its
+    response time that jumps straight to any slower sample (the peak) and
+    decays with time constant LB_EWMA_DECAY_TIME otherwise, so a slow
+    instance is avoided at once and retried once it has been left alone
+    for a while. Its cost is that latency multiplied by the requests in
+    flight plus one. Each selection compares the cost of two random
+    instances and takes the cheaper one, which avoids the herding of
+    always picking the global minimum.
+    
+    Callers report completions (latency, success) through
+    ``record_completion``; failures count as at least
+    LB_EWMA_FAILURE_PENALTY_MS.
+    """
+    
+    # Cost of an instance with requests in flight but no latency sample yet
+    UNKNOWN_PENALTY = 1e6
+    # Stats entries kept before idle ones are pruned
+    MAX_TRACKED = 4096
+    
+    def __init__(
+        self,
+        decay_time: Optional[float] = None,
+        failure_penalty_ms: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize peak-EWMA load balancer.
+        
+        Args:
+            decay_time: Override LB_EWMA_DECAY_TIME (seconds)
+            failure_penalty_ms: Override LB_EWMA_FAILURE_PENALTY_MS
+            clock: Monotonic clock in seconds
+        """
+        self.decay_time = settings.LB_EWMA_DECAY_TIME if decay_time is None else decay_time
+        self.failure_penalty_ms = (
+            settings.LB_EWMA_FAILURE_PENALTY_MS if failure_penalty_ms is None else failure_penalty_ms
+        )
+        self._clock = clock
+        self._stats: Dict[str, EwmaStats] = {}
+    
+    def _observe(self, stats: EwmaStats, sample: float, now: float) -> None:
+        """Fold a latency sample in; a sample of 0 only applies the decay."""
+        elapsed = max(now - stats.stamp, 0.0)
+        stats.stamp = now
+        if sample > stats.latency:
+            stats.latency = sample
+        else:
+            weight = math.exp(-elapsed / self.decay_time)
+            stats.latency = stats.latency * weight + sample * (1.0 - weight)
+    
+    def _stats_for(self, service_id: str, now: float) -> EwmaStats:
+        """Stats of an instance, created on first use."""
+        stats = self._stats.get(service_id)
+        if stats is None:
+            if len(self._stats) >= self.MAX_TRACKED:
+                self._prune(now)
+            stats = self._stats[service_id] = EwmaStats(now)
+        return stats
+    
+    def _prune(self, now: float) -> None:
+        """Forget idle instances whose latency has decayed away."""
+        horizon = 10 * self.decay_time
+        for service_id, stats in list(self._stats.items()):
+            if stats.outstanding == 0 and now - stats.stamp > horizon:
+                del self._stats[service_id]
+    
+    def cost(self, service_id: str) -> float:
+        """Current cost of an instance (lower is better)."""
+        stats = self._stats.get(service_id)
+        if stats is None:
+            return 0.0
+        return self._cost(stats, self._clock())
+    
+    def _cost(self, stats: EwmaStats, now: float) -> float:
+        self._observe(stats, 0.0, now)
+        if stats.latency == 0.0 and stats.outstanding:
+            return self.UNKNOWN_PENALTY + stats.outstanding
+        return stats.latency * (stats.outstanding + 1)
+    
+    async def select_instance(
+        self,
+        instances: List[ServiceInstance],
+        **kwargs
+    ) -> Optional[ServiceInstance]:
+        """
+        Select the cheaper of two randomly chosen instances.
+        
+        The selected instance is counted as having one more request in
+        flight until ``record_completion`` is called for it.
+        """
+        if not instances:
+            return None
+        
+        now = self._clock()
+        count = len(instances)
+        if count == 1:
+            selected = instances[0]
+            stats = self._stats_for(selected.service_id, now)
+        else:
+            first = random.randrange(count)
+            second = random.randrange(count - 1)
+            if second >= first:
+                second += 1
+            
+            a, b = instances[first], instances[second]
+            stats_a = self._stats_for(a.service_id, now)
+            stats_b = self._stats_for(b.service_id, now)
+            if self._cost(stats_b, now) < self._cost(stats_a, now):
+                selected, stats = b, stats_b
+            else:
+                selected, stats = a, stats_a
+        
+        stats.outstanding += 1
+        
+        logger.debug(
+            f"Peak EWMA selected: {selected.service_id} "
+            f"({stats.latency:.1f} ms, {stats.outstanding} in flight)"
+        )
+        
+        return selected
+    
+    async def record_completion(
+        self,
+        service_id: str,
+        latency_ms: Optional[float] = None,
+        success: bool = True
+    ) -> None:
+        """
+        Record a finished request.
+        
+        Completions of instances this balancer never selected (or has
+        forgotten) are ignored, so reports cannot create stats entries.
+        
+        Args:
+            service_id: Instance the request was sent to
+            latency_ms: Observed response time in milliseconds
+            success: Whether the request succeeded
+        """
+        stats = self._stats.get(service_id)
+        if stats is None:
+            return
+        
+        now = self._clock()
+        if stats.outstanding > 0:
+            stats.outstanding -= 1
+        
+        sample = latency_ms or 0.0
+        if not success:
+            sample = max(sample, self.failure_penalty_ms)
+        if sample > 0:
+            self._observe(stats, sample, now)
+
+
 class LoadBalancerFactory:
     """Factory for creating load balancer instances."""
     
@@ -312,7 +689,8 @@ class LoadBalancerFactory:
         
         Args:
             strategy: Load balancing strategy name
-                     (round_robin, random, weighted, least_connections, geographic)
+                     (round_robin, random, weighted, least_connections, geographic,
+                     peak_ewma)
         
         Returns:
             Load balancer instance
@@ -335,6 +713,8 @@ class LoadBalancerFactory:
             lb = LeastConnectionsLoadBalancer()
         elif strategy == "geographic":
             lb = GeographicLoadBalancer()
+        elif strategy == "peak_ewma":
+            lb = PeakEwmaLoadBalancer()
         else:
             raise ValueError(f"Unsupported load balancing strategy: {strategy}")
         
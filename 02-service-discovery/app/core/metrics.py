@@ -148,6 +148,41 @@ cache_entries_total = Gauge(
     'Total number of entries in cache'
 )
 
+# ================================================================================
+# Service Catalog Metrics
+# ================================================================================
+
+# Catalog lookups
+catalog_lookups_total = Counter(
+    'catalog_lookups_total',
+    'Total number of in-memory catalog lookups',
+    ['result']  # hit, miss, bypass
+)
+
+# Services kept current by blocking queries
+catalog_watched_services = Gauge(
+    'catalog_watched_services',
+    'Number of services watched with Consul blocking queries'
+)
+
+# Discovery subscriptions
+discovery_subscriptions_active = Gauge(
+    'discovery_subscriptions_active',
+    'Number of open discovery subscription connections'
+)
+
+discovery_subscription_messages_total = Counter(
+    'discovery_subscription_messages_total',
+    'Total number of discovery subscription messages sent',
+    ['action']  # snapshot, subscribed, delta, unsubscribed
+)
+
+# Config watches
+config_watch_queries = Gauge(
+    'config_watch_queries',
+    'Number of Consul KV blocking queries shared by config watchers'
+)
+
 # ================================================================================
 # Consul Client Metrics
 # ================================================================================
@@ -197,6 +232,18 @@ service_events_total = Counter(
     ['event_type', 'service_name']  # registered, deregistered, updated, etc.
 )
 
+# Batched event log writer
+service_event_writes_total = Counter(
+    'service_event_writes_total',
+    'Total number of service events processed by the batched event log writer',
+    ['result']  # written, dropped
+)
+
+service_events_pending = Gauge(
+    'service_events_pending',
+    'Number of service events buffered and not yet written'
+)
+
 # ================================================================================
 # Error Metrics
 # ================================================================================
@@ -218,23 +265,23 @@ def track_service_registration(func: Callable) -> Callable:
     async def wrapper(*args, **kwargs):
         service_name = "unknown"
         start_time = time.time()
-
+        
         try:
             # Extract service_name from args if possible
             if args and hasattr(args[1], 'service_name'):
                 service_name = args[1].service_name
-
+            
             result = await func(*args, **kwargs)
-
+            
             # Track successful registration
             service_registrations_total.labels(
                 service_name=service_name,
                 result='success'
             ).inc()
-
+            
             # Update total registered services
             registered_services_total.inc()
-
+            
             return result
         except Exception as e:
             # Track failed registration
@@ -246,7 +293,7 @@ def track_service_registration(func: Callable) -> Callable:
         finally:
             duration = time.time() - start_time
             # Could add registration latency metric if needed
-
+    
     return wrapper
 
 
@@ -256,24 +303,24 @@ def track_service_deregistration(func: Callable) -> Callable:
     async def wrapper(*args, **kwargs):
         service_name = "unknown"
         start_time = time.time()
-
+        
         try:
             # Extract service_id from args
             if args and len(args) > 1:
                 service_id = args[1]
-
+            
             result = await func(*args, **kwargs)
-
+            
             # Track successful deregistration
             service_deregistrations_total.labels(
                 service_name=service_name,
                 result='success' if result else 'failure'
             ).inc()
-
+            
             if result:
                 # Update total registered services
                 registered_services_total.dec()
-
+            
             return result
         except Exception as e:
             # Track failed deregistration
@@ -284,7 +331,7 @@ def track_service_deregistration(func: Callable) -> Callable:
             raise
         finally:
             duration = time.time() - start_time
-
+    
     return wrapper
 
 
@@ -295,16 +342,16 @@ def track_service_discovery(func: Callable) -> Callable:
         start_time = time.time()
         service_name = "unknown"
         lb_strategy = "unknown"
-
+        
         try:
             # Extract service_name and lb_strategy from request if possible
             if args and hasattr(args[1], 'service_name'):
                 service_name = args[1].service_name
             if args and hasattr(args[1], 'lb_strategy') and args[1].lb_strategy:
                 lb_strategy = args[1].lb_strategy.value
-
+            
             result = await func(*args, **kwargs)
-
+            
             # Track discovery result
             result_type = 'found' if result else 'not_found'
             service_discovery_requests_total.labels(
@@ -312,14 +359,14 @@ def track_service_discovery(func: Callable) -> Callable:
                 result=result_type,
                 lb_strategy=lb_strategy
             ).inc()
-
+            
             # Track load balancer selection if instance found
             if result:
                 load_balancer_selections_total.labels(
                     strategy=lb_strategy,
                     service_name=service_name
                 ).inc()
-
+            
             return result
         except Exception as e:
             # Track discovery error
@@ -334,7 +381,7 @@ def track_service_discovery(func: Callable) -> Callable:
                 service_name=service_name,
                 lb_strategy=lb_strategy
             ).observe(duration)
-
+    
     return wrapper
 
 
@@ -344,21 +391,21 @@ def track_health_check_update(func: Callable) -> Callable:
     async def wrapper(*args, **kwargs):
         service_name = "unknown"
         start_time = time.time()
-
+        
         try:
             # Extract service_name from args if possible
             if args and len(args) > 1:
                 service_name = args[1]  # check_id might contain service info
-
+            
             result = await func(*args, **kwargs)
-
+            
             # Track health check update
             status = args[2] if len(args) > 2 else "unknown"
             health_check_updates_total.labels(
                 service_name=service_name,
                 status=status
             ).inc()
-
+            
             return result
         except Exception as e:
             raise
@@ -367,7 +414,7 @@ def track_health_check_update(func: Callable) -> Callable:
             health_check_latency_seconds.labels(
                 operation='update'
             ).observe(duration)
-
+    
     return wrapper
 
 
@@ -377,16 +424,16 @@ def track_consul_operation(operation: str) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
             start_time = time.time()
-
+            
             try:
                 result = await func(*args, **kwargs)
-
+                
                 # Track successful operation
                 consul_operations_total.labels(
                     operation=operation,
                     result='success'
                 ).inc()
-
+                
                 return result
             except Exception as e:
                 # Track failed operation
@@ -400,7 +447,7 @@ def track_consul_operation(operation: str) -> Callable:
                 consul_operation_latency_seconds.labels(
                     operation=operation
                 ).observe(duration)
-
+        
         return wrapper
     return decorator
 
@@ -411,17 +458,17 @@ def track_database_operation(operation: str, table: str) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs):
             start_time = time.time()
-
+            
             try:
                 result = await func(*args, **kwargs)
-
+                
                 # Track successful operation
                 database_operations_total.labels(
                     operation=operation,
                     table=table,
                     result='success'
                 ).inc()
-
+                
                 return result
             except Exception as e:
                 # Track failed operation
@@ -437,7 +484,7 @@ def track_database_operation(operation: str, table: str) -> Callable:
                     operation=operation,
                     table=table
                 ).observe(duration)
-
+        
         return wrapper
     return decorator
 
@@ -449,18 +496,18 @@ def track_cache_operation(operation: str) -> Callable:
         async def wrapper(*args, **kwargs):
             try:
                 result = await func(*args, **kwargs)
-
+                
                 # Determine if hit or miss for gets
                 if operation == 'get':
                     result_type = 'hit' if result else 'miss'
                 else:
                     result_type = 'success'
-
+                
                 cache_operations_total.labels(
                     operation=operation,
                     result=result_type
                 ).inc()
-
+                
                 return result
             except Exception as e:
                 cache_operations_total.labels(
@@ -468,7 +515,7 @@ def track_cache_operation(operation: str) -> Callable:
                     result='failure'
                 ).inc()
                 raise
-
+        
         return wrapper
     return decorator
 
@@ -82,7 +82,7 @@ class RedisClient:
                 max_connections=settings.REDIS_MAX_CONNECTIONS,
                 decode_responses=True
             )
-
+            
             ping_response = self.client.ping()
             ping_result = await ping_response if inspect.isawaitable(ping_response) else ping_response
             if not bool(ping_result):
@@ -104,7 +104,7 @@ class RedisClient:
         
         Args:
             key: Cache key
-            
+        
         Returns:
             Cached value or None
         """
@@ -133,7 +133,7 @@ class RedisClient:
             key: Cache key
             value: Value to cache
             expire: Expiration time in seconds
-            
+        
         Returns:
             True if successful, False otherwise
         """
@@ -151,13 +151,13 @@ class RedisClient:
             logger.error(f"Redis SET error for key {key}: {e}")
             return False
     
-    async def delete(self, key: str) -> bool:
+    async def delete(self, *keys: str) -> bool:
         """
-        Delete key from Redis.
+        Delete keys from Redis (one DEL command).
         
         Args:
-            key: Cache key
-            
+            keys: Cache keys
+        
         Returns:
             True if successful, False otherwise
         """
@@ -165,22 +165,22 @@ class RedisClient:
             return False
         
         try:
-            await self.client.delete(key)
+            await self.client.delete(*keys)
             return True
         except Exception as e:
-            logger.error(f"Redis DELETE error for key {key}: {e}")
+            logger.error(f"Redis DELETE error for keys {keys}: {e}")
             return False
     
     async def health_check(self) -> bool:
         """
         Check Redis health.
-
+        
         Returns:
             True if Redis is accessible, False otherwise.
         """
         if not self.client:
             return False
-
+        
         try:
             ping_response = self.client.ping()
             ping_result = await ping_response if inspect.isawaitable(ping_response) else ping_response
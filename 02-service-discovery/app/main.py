@@ -69,6 +69,9 @@ from app.api.v1 import services
 from app.core.database import db_manager, get_db
 from app.core.redis_client import redis_client
 from app.core.consul_client import consul_client
+from app.core.service_catalog import service_catalog
+from app.core.config_watch import config_watch_hub
+from app.core.event_writer import service_event_writer
 from app.core.metrics import update_registered_services_count
 from app.models.service import Base
 
@@ -118,6 +121,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     
     # Cleanup
     logger.info(f"Shutting down {settings.APP_NAME}...")
+    await service_catalog.stop()
+    await config_watch_hub.stop()
+    await service_event_writer.stop()  # Write buffered events before the DB closes
+    await consul_client.close()
     await redis_client.disconnect()
     await db_manager.close()
     logger.info(f"{settings.APP_NAME} shut down successfully")
@@ -204,7 +211,7 @@ async def health_check():
 async def welcome(request: Request):
     """
     Welcome endpoint.
-
+    
     Logs request metadata and returns a welcome message.
     """
     logger.info(f"Request received: {request.method} {request.url.path}")
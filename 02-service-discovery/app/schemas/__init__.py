@@ -68,6 +68,12 @@ from app.schemas.service import (
     ServiceListResponse,
     ServiceDeregister,
     HealthCheckUpdate,
+    ServiceBatchRegister,
+    ServiceBatchDeregister,
+    HealthCheckBatchUpdate,
+    BatchItemResult,
+    BatchOperationResponse,
+    ServiceFeedback,
     ServiceEventResponse,
     AllServicesResponse,
 )
@@ -84,6 +90,12 @@ __all__ = [
     "ServiceListResponse",
     "ServiceDeregister",
     "HealthCheckUpdate",
+    "ServiceBatchRegister",
+    "ServiceBatchDeregister",
+    "HealthCheckBatchUpdate",
+    "BatchItemResult",
+    "BatchOperationResponse",
+    "ServiceFeedback",
     "ServiceEventResponse",
     "AllServicesResponse",
 ]
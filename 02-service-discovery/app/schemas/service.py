@@ -84,6 +84,7 @@ class LoadBalancingStrategy(str, Enum):
     WEIGHTED = "weighted"
     LEAST_CONNECTIONS = "least_connections"
     GEOGRAPHIC = "geographic"
+    PEAK_EWMA = "peak_ewma"
 
 
 class HealthCheckCreate(BaseModel):
@@ -264,6 +265,73 @@ class HealthCheckUpdate(BaseModel):
         return v
 
 
+class ServiceBatchRegister(BaseModel):
+    """Batch registration schema (e.g. all replicas of a rolling deploy)."""
+    services: List[ServiceRegister] = Field(..., min_length=1, description="Service instances to register")
+
+
+class ServiceBatchDeregister(BaseModel):
+    """Batch deregistration schema."""
+    service_ids: List[str] = Field(..., min_length=1, description="Service instance IDs to deregister")
+
+
+class HealthCheckBatchUpdate(BaseModel):
+    """Batch of TTL health check updates."""
+    updates: List[HealthCheckUpdate] = Field(..., min_length=1, description="Health check updates")
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one item of a batch operation."""
+    id: str = Field(..., description="Service instance ID or health check ID")
+    success: bool
+    error: Optional[str] = None
+
+
+class BatchOperationResponse(BaseModel):
+    """Batch operation response schema."""
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [
+                    {"id": "auth-service-001", "success": True, "error": None},
+                    {"id": "auth-service-002", "success": False, "error": "Service not found"}
+                ],
+                "succeeded": 1,
+                "failed": 1
+            }
+        }
+    )
+    
+    @classmethod
+    def from_results(cls, results: List[BatchItemResult]) -> "BatchOperationResponse":
+        """Build the response and its counters from per-item results."""
+        succeeded = sum(1 for result in results if result.success)
+        return cls(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
+class ServiceFeedback(BaseModel):
+    """Completion report for a request sent to a discovered instance."""
+    service_id: str = Field(..., description="Instance the request was sent to")
+    strategy: LoadBalancingStrategy = Field(..., description="Strategy that selected the instance")
+    latency_ms: Optional[float] = Field(default=None, ge=0, description="Observed response time")
+    success: bool = Field(default=True, description="Whether the request succeeded")
+    
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "service_id": "auth-service-001",
+                "strategy": "peak_ewma",
+                "latency_ms": 42.5,
+                "success": True
+            }
+        }
+    )
+
+
 class ServiceEventResponse(BaseModel):
     """Service event response schema."""
     id: int
@@ -12,14 +12,14 @@ Framework    : Python 3.11+
 AUTHORSHIP & CONTRIBUTION (مشارکت‌کنندگان)
 ================================================================================
 Primary Author    : Elena Volkov (Backend & Integration Lead)
-Contributors      : None
+Contributors      : Takeshi Yamamoto (Performance Engineer)
 Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
 
 ================================================================================
 TIMELINE & EFFORT (زمان‌بندی و تلاش)
 ================================================================================
 Created Date      : 2025-11-07 21:20 UTC
-Last Modified     : 2025-11-07 21:20 UTC
+Last Modified     : 2025-11-27 11:00 UTC
 Development Time  : 3 hours 0 minutes
 Review Time       : 0 hours 45 minutes
 Testing Time      : 1 hour 15 minutes
@@ -38,6 +38,8 @@ Total Cost        : $750.00 USD
 VERSION HISTORY (تاریخچه نسخه)
 ================================================================================
 v1.0.0 - 2025-11-07 - Elena Volkov - Initial implementation
+v1.1.0 - 2025-11-26 - Takeshi Yamamoto - Batch register/deregister/heartbeat
+v1.2.0 - 2025-11-27 - Takeshi Yamamoto - Events written by the batched event writer
 
 ================================================================================
 DEPENDENCIES (وابستگی‌ها)
@@ -56,16 +58,21 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
+import asyncio
 import logging
-from typing import List, Optional, Dict
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Set
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
 
 from app.core.consul_client import consul_client, HealthCheck, ServiceInstance
+from app.core.event_writer import service_event_writer
 from app.core.load_balancer import LoadBalancerFactory
 from app.core.redis_client import redis_client
+from app.core.service_catalog import service_catalog
 from app.core.metrics import (
     track_service_registration,
     track_service_deregistration,
@@ -75,18 +82,55 @@ from app.core.metrics import (
     track_database_operation,
     track_cache_operation,
     track_service_event,
-    update_registered_services_count
+    update_registered_services_count,
+    service_registrations_total,
+    service_deregistrations_total,
+    registered_services_total,
+    health_check_updates_total,
 )
 from app.models.service import Service, ServiceEvent
 from app.schemas.service import (
     ServiceRegister,
     ServiceDiscoveryRequest,
     LoadBalancingStrategy,
+    HealthCheckUpdate,
+    BatchItemResult,
 )
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Columns refreshed when a batch registration hits an existing service_id
+# (same set as ServiceRegistryService._update_existing_service)
+UPSERT_COLUMNS = ("address", "port", "tags", "meta", "weight", "region", "zone", "is_active")
+
+
+async def gather_bounded(calls: Iterable[Awaitable[Any]], limit: Optional[int] = None) -> List[Any]:
+    """
+    Await calls concurrently with at most ``limit`` in flight.
+    
+    Args:
+        calls: Awaitables to run (coroutines start only when admitted)
+        limit: Concurrency limit (defaults to REGISTRY_BATCH_CONCURRENCY)
+    
+    Returns:
+        Results in input order; exceptions are returned, not raised
+    """
+    semaphore = asyncio.Semaphore(limit or settings.REGISTRY_BATCH_CONCURRENCY)
+    
+    async def run(call: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await call
+    
+    return await asyncio.gather(*(run(call) for call in calls), return_exceptions=True)
+
+
+def _failure_reason(outcome: Any, default: str) -> str:
+    """Error message of a failed Consul call outcome."""
+    if isinstance(outcome, BaseException):
+        return str(outcome) or type(outcome).__name__
+    return default
+
 
 class ServiceRegistryService:
     """Service registry business logic."""
@@ -107,66 +151,29 @@ class ServiceRegistryService:
     ) -> Service:
         """
         Register a new service.
-
+        
         Registers service with both Consul and local database.
-
+        
         Args:
             service_data: Service registration data
-
+        
         Returns:
             Registered service
-
+        
         Raises:
             Exception: If registration fails
         """
         logger.info(f"Registering service: {service_data.service_id}")
         
-        # Prepare health check
-        health_check = None
-        if service_data.health_check:
-            health_check = HealthCheck(
-                check_type=service_data.health_check.check_type,
-                interval=service_data.health_check.interval,
-                timeout=service_data.health_check.timeout,
-                http_endpoint=service_data.health_check.http_endpoint,
-                tcp_address=service_data.health_check.tcp_address,
-                grpc_endpoint=service_data.health_check.grpc_endpoint,
-                ttl=service_data.health_check.ttl,
-                deregister_critical_service_after=service_data.health_check.deregister_critical_service_after
-            )
-        
         # Register with Consul
-        consul_success = await consul_client.register_service(
-            service_id=service_data.service_id,
-            service_name=service_data.service_name,
-            address=service_data.address,
-            port=service_data.port,
-            tags=service_data.tags,
-            meta=service_data.meta,
-            health_check=health_check
-        )
+        consul_success = await self._register_with_consul(service_data)
         
         if not consul_success:
             raise Exception("Failed to register service with Consul")
         
         # Store in database
         try:
-            db_service = Service(
-                service_id=service_data.service_id,
-                service_name=service_data.service_name,
-                address=service_data.address,
-                port=service_data.port,
-                tags=service_data.tags or [],
-                meta=service_data.meta or {},
-                health_status="passing",
-                health_check_type=service_data.health_check.check_type if service_data.health_check else None,
-                health_check_endpoint=service_data.health_check.http_endpoint if service_data.health_check else None,
-                weight=service_data.weight or 1,
-                datacenter=service_data.datacenter,
-                region=service_data.region,
-                zone=service_data.zone,
-                is_active=True
-            )
+            db_service = Service(**self._service_row(service_data))
             
             self.db.add(db_service)
             await self.db.commit()
@@ -186,7 +193,7 @@ class ServiceRegistryService:
             logger.info(f"Service registered successfully: {service_data.service_id}")
             
             return db_service
-            
+        
         except IntegrityError:
             await self.db.rollback()
             # Service already exists, update it
@@ -200,6 +207,154 @@ class ServiceRegistryService:
             await consul_client.deregister_service(service_data.service_id)
             raise
     
+    @staticmethod
+    def _register_with_consul(service_data: ServiceRegister) -> Awaitable[bool]:
+        """Consul agent registration call for a service."""
+        health_check = None
+        if service_data.health_check:
+            health_check = HealthCheck(
+                check_type=service_data.health_check.check_type,
+                interval=service_data.health_check.interval,
+                timeout=service_data.health_check.timeout,
+                http_endpoint=service_data.health_check.http_endpoint,
+                tcp_address=service_data.health_check.tcp_address,
+                grpc_endpoint=service_data.health_check.grpc_endpoint,
+                ttl=service_data.health_check.ttl,
+                deregister_critical_service_after=service_data.health_check.deregister_critical_service_after
+            )
+        
+        return consul_client.register_service(
+            service_id=service_data.service_id,
+            service_name=service_data.service_name,
+            address=service_data.address,
+            port=service_data.port,
+            tags=service_data.tags,
+            meta=service_data.meta,
+            health_check=health_check
+        )
+    
+    @staticmethod
+    def _service_row(service_data: ServiceRegister) -> Dict[str, Any]:
+        """Column values of the services row for a registration."""
+        return {
+            "service_id": service_data.service_id,
+            "service_name": service_data.service_name,
+            "address": service_data.address,
+            "port": service_data.port,
+            "tags": service_data.tags or [],
+            "meta": service_data.meta or {},
+            "health_status": "passing",
+            "health_check_type": service_data.health_check.check_type if service_data.health_check else None,
+            "health_check_endpoint": service_data.health_check.http_endpoint if service_data.health_check else None,
+            "weight": service_data.weight or 1,
+            "datacenter": service_data.datacenter,
+            "region": service_data.region,
+            "zone": service_data.zone,
+            "is_active": True,
+        }
+    
+    async def register_services(
+        self,
+        services: List[ServiceRegister]
+    ) -> List[BatchItemResult]:
+        """
+        Register many service instances at once.
+        
+        Consul registrations run concurrently (bounded by
+        REGISTRY_BATCH_CONCURRENCY). Instances accepted by Consul are stored
+        with a single multi-row upsert and transaction; each affected
+        service's cache is invalidated once.
+        If the transaction fails, the instances are deregistered from Consul
+        again, as in register_service.
+        
+        Args:
+            services: Registrations; a repeated service_id keeps the last one
+        
+        Returns:
+            Per-instance results in request order (one per service_id)
+        """
+        batch = list({service.service_id: service for service in services}.values())
+        logger.info(f"Registering {len(batch)} services in batch")
+        
+        outcomes = await gather_bounded(self._register_with_consul(service) for service in batch)
+        
+        results: Dict[str, BatchItemResult] = {}
+        accepted: List[ServiceRegister] = []
+        for service_data, outcome in zip(batch, outcomes):
+            if outcome is True:
+                accepted.append(service_data)
+            else:
+                results[service_data.service_id] = BatchItemResult(
+                    id=service_data.service_id,
+                    success=False,
+                    error=_failure_reason(outcome, "Failed to register service with Consul")
+                )
+        
+        if accepted:
+            try:
+                inserted = await self._upsert_services(accepted)
+            except Exception as e:
+                await self.db.rollback()
+                logger.exception(f"Database error during batch registration: {e}")
+                await gather_bounded(consul_client.deregister_service(s.service_id) for s in accepted)
+                for service_data in accepted:
+                    results[service_data.service_id] = BatchItemResult(
+                        id=service_data.service_id,
+                        success=False,
+                        error=f"Database error: {e}"
+                    )
+                accepted = []
+            else:
+                registered_services_total.inc(inserted)
+        
+        for service_data in accepted:
+            results[service_data.service_id] = BatchItemResult(id=service_data.service_id, success=True)
+        
+        for service_data in batch:
+            service_registrations_total.labels(
+                service_name=service_data.service_name,
+                result='success' if results[service_data.service_id].success else 'failure'
+            ).inc()
+        
+        await self._invalidate_caches({service.service_name for service in accepted})
+        
+        return [results[service.service_id] for service in batch]
+    
+    async def _upsert_services(self, services: List[ServiceRegister]) -> int:
+        """
+        Insert or refresh services rows in one transaction and log their events.
+        
+        Returns:
+            Number of rows that were newly inserted
+        """
+        stmt = pg_insert(Service).values([self._service_row(service) for service in services])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Service.service_id],
+            set_={
+                **{column: stmt.excluded[column] for column in UPSERT_COLUMNS},
+                "updated_at": func.now(),
+            }
+        ).returning(
+            Service.service_id,
+            # xmax is 0 only for rows created by this statement
+            literal_column("xmax = 0").label("inserted")
+        )
+        
+        result = await self.db.execute(stmt)
+        inserted = {row.service_id for row in result.all() if row.inserted}
+        
+        await self.db.commit()
+        
+        for service in services:
+            await self._log_event(
+                service_id=service.service_id,
+                service_name=service.service_name,
+                event_type="registered" if service.service_id in inserted else "updated",
+                details={"address": service.address, "port": service.port, "batch": True}
+            )
+        
+        return len(inserted)
+    
     async def _update_existing_service(
         self,
         service_data: ServiceRegister
@@ -242,10 +397,10 @@ class ServiceRegistryService:
     async def deregister_service(self, service_id: str) -> bool:
         """
         Deregister a service.
-
+        
         Args:
             service_id: Service instance ID
-
+        
         Returns:
             True if successful, False otherwise
         """
@@ -287,6 +442,73 @@ class ServiceRegistryService:
         
         return consul_success
     
+    async def deregister_services(self, service_ids: List[str]) -> List[BatchItemResult]:
+        """
+        Deregister many service instances at once.
+        
+        Known instances are deregistered from Consul concurrently, then
+        marked inactive with one UPDATE; each affected service's cache is
+        invalidated once.
+        
+        Args:
+            service_ids: Service instance IDs
+        
+        Returns:
+            Per-instance results in request order (one per service ID)
+        """
+        batch = list(dict.fromkeys(service_ids))
+        logger.info(f"Deregistering {len(batch)} services in batch")
+        
+        result = await self.db.execute(
+            select(Service.service_id, Service.service_name).where(Service.service_id.in_(batch))
+        )
+        names = {row.service_id: row.service_name for row in result.all()}
+        found = [service_id for service_id in batch if service_id in names]
+        
+        outcomes = await gather_bounded(consul_client.deregister_service(service_id) for service_id in found)
+        consul_outcomes = dict(zip(found, outcomes))
+        
+        if found:
+            await self.db.execute(
+                update(Service)
+                .where(Service.service_id.in_(found))
+                .values(is_active=False, updated_at=datetime.utcnow())
+            )
+            await self.db.commit()
+            
+            for service_id in found:
+                await self._log_event(
+                    service_id=service_id,
+                    service_name=names[service_id],
+                    event_type="deregistered",
+                    details={"batch": True}
+                )
+        
+        results = []
+        for service_id in batch:
+            if service_id not in names:
+                logger.warning(f"Service not found in database: {service_id}")
+                results.append(BatchItemResult(id=service_id, success=False, error="Service not found"))
+                continue
+            
+            outcome = consul_outcomes[service_id]
+            success = outcome is True
+            results.append(BatchItemResult(
+                id=service_id,
+                success=success,
+                error=None if success else _failure_reason(outcome, "Failed to deregister service from Consul")
+            ))
+            service_deregistrations_total.labels(
+                service_name=names[service_id],
+                result='success' if success else 'failure'
+            ).inc()
+            if success:
+                registered_services_total.dec()
+        
+        await self._invalidate_caches(set(names.values()))
+        
+        return results
+    
     @track_service_discovery
     async def discover_service(
         self,
@@ -294,23 +516,15 @@ class ServiceRegistryService:
     ) -> Optional[ServiceInstance]:
         """
         Discover a service instance using load balancing.
-
+        
         Args:
             request: Service discovery request
-
+        
         Returns:
             Selected service instance or None
         """
-        # Check cache first
-        if settings.CACHE_ENABLED:
-            cache_key = f"service:{request.service_name}"
-            cached = await redis_client.get(cache_key)
-            if cached:
-                logger.debug(f"Cache hit for service: {request.service_name}")
-                # Note: Still need to apply load balancing
-        
-        # Discover from Consul
-        instances = await consul_client.discover_service(
+        # Served from the watched in-memory catalog
+        instances = await service_catalog.get_instances(
             service_name=request.service_name,
             passing_only=request.passing_only,
             tag=request.tag,
@@ -331,10 +545,6 @@ class ServiceRegistryService:
             client_zone=request.client_zone
         )
         
-        # Cache instances
-        if settings.CACHE_ENABLED and instances:
-            await self._cache_service_instances(request.service_name, instances)
-        
         return selected
     
     async def get_all_instances(
@@ -346,11 +556,11 @@ class ServiceRegistryService:
         
         Args:
             request: Service discovery request
-            
+        
         Returns:
             List of service instances
         """
-        instances = await consul_client.discover_service(
+        instances = await service_catalog.get_instances(
             service_name=request.service_name,
             passing_only=request.passing_only,
             tag=request.tag,
@@ -377,17 +587,50 @@ class ServiceRegistryService:
     ) -> bool:
         """
         Update TTL health check.
-
+        
         Args:
             check_id: Health check ID
             status: Health status (pass, warn, fail)
             output: Optional output message
-
+        
         Returns:
             True if successful, False otherwise
         """
         return await consul_client.update_health_check(check_id, status, output)
     
+    async def update_health_checks(self, updates: List[HealthCheckUpdate]) -> List[BatchItemResult]:
+        """
+        Update many TTL health checks at once.
+        
+        Consul has no batch TTL endpoint, so the agent calls run
+        concurrently (bounded by REGISTRY_BATCH_CONCURRENCY) instead of one
+        request round trip each.
+        
+        Args:
+            updates: Health check updates
+        
+        Returns:
+            Per-check results in request order
+        """
+        outcomes = await gather_bounded(
+            consul_client.update_health_check(u.check_id, u.status, u.output or "") for u in updates
+        )
+        
+        results = []
+        for health_update, outcome in zip(updates, outcomes):
+            success = outcome is True
+            results.append(BatchItemResult(
+                id=health_update.check_id,
+                success=success,
+                error=None if success else _failure_reason(outcome, "Failed to update health check")
+            ))
+            health_check_updates_total.labels(
+                service_name=health_update.check_id,
+                status=health_update.status
+            ).inc()
+        
+        return results
+    
     async def get_service_events(
         self,
         service_id: Optional[str] = None,
@@ -396,13 +639,17 @@ class ServiceRegistryService:
         """
         Get service events.
         
+        Buffered events are written first, so recent changes are included.
+        
         Args:
             service_id: Optional service ID filter
             limit: Maximum number of events to return
-            
+        
         Returns:
             List of service events
         """
+        await service_event_writer.flush()
+        
         stmt = select(ServiceEvent).order_by(ServiceEvent.created_at.desc()).limit(limit)
         
         if service_id:
@@ -422,44 +669,33 @@ class ServiceRegistryService:
         new_status: Optional[str] = None,
         details: Optional[Dict] = None
     ) -> None:
-        """Log service event to database."""
-        event = ServiceEvent(
+        """Queue service event for the batched event log writer."""
+        await service_event_writer.record(
             service_id=service_id,
             service_name=service_name,
             event_type=event_type,
             old_status=old_status,
             new_status=new_status,
-            details=details or {}
+            details=details
         )
-        
-        self.db.add(event)
-        await self.db.commit()
     
     async def _invalidate_cache(self, service_name: str) -> None:
         """Invalidate service cache."""
+        service_catalog.invalidate(service_name)
+        
         if settings.CACHE_ENABLED:
             cache_key = f"service:{service_name}"
             await redis_client.delete(cache_key)
             logger.debug(f"Cache invalidated for service: {service_name}")
     
-    async def _cache_service_instances(
-        self,
-        service_name: str,
-        instances: List[ServiceInstance]
-    ) -> None:
-        """Cache service instances."""
-        cache_key = f"service:{service_name}"
-        cache_data = [
-            {
-                "service_id": inst.service_id,
-                "address": inst.address,
-                "port": inst.port,
-                "tags": inst.tags,
-                "meta": inst.meta,
-                "health_status": inst.health_status
-            }
-            for inst in instances
-        ]
+    async def _invalidate_caches(self, service_names: Set[str]) -> None:
+        """Invalidate the caches of several services (one Redis call)."""
+        if not service_names:
+            return
         
-        await redis_client.set(cache_key, cache_data, expire=settings.CACHE_TTL)
-        logger.debug(f"Cached {len(instances)} instances for service: {service_name}")
+        for service_name in service_names:
+            service_catalog.invalidate(service_name)
+        
+        if settings.CACHE_ENABLED:
+            await redis_client.delete(*(f"service:{name}" for name in sorted(service_names)))
+            logger.debug(f"Cache invalidated for services: {sorted(service_names)}")
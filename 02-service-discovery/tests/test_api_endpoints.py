@@ -56,7 +56,7 @@ from httpx import AsyncClient, ASGITransport
 
 from app.main import app
 from app.core.consul_client import ConsulClient
-from app.schemas.service import LoadBalancingStrategy
+from app.schemas.service import LoadBalancingStrategy, BatchItemResult
 
 
 @pytest.fixture
@@ -69,7 +69,7 @@ async def async_client():
 
 class TestConfigEndpoints:
     """Unit tests for configuration management endpoints."""
-
+    
     @pytest.mark.asyncio
     async def test_get_config_success(self, async_client):
         """Test GET /config/{key} endpoint with successful retrieval."""
@@ -83,7 +83,7 @@ class TestConfigEndpoints:
             assert data["key"] == "test-key"
             assert data["value"] == "test-value"
             mock_consul.get_kv.assert_called_once_with("test-key")
-
+    
     @pytest.mark.asyncio
     async def test_get_config_not_found(self, async_client):
         """Test GET /config/{key} with non-existent key."""
@@ -94,7 +94,7 @@ class TestConfigEndpoints:
             
             assert response.status_code == 404
             assert "not found" in response.json()["detail"].lower()
-
+    
     @pytest.mark.asyncio
     async def test_put_config_success(self, async_client):
         """Test PUT /config/{key} endpoint with successful storage."""
@@ -111,7 +111,7 @@ class TestConfigEndpoints:
             assert data["success"] is True
             assert data["key"] == "test-key"
             mock_consul.put_kv.assert_called_once_with("test-key", "new-value")
-
+    
     @pytest.mark.asyncio
     async def test_put_config_failure(self, async_client):
         """Test PUT /config/{key} with storage failure."""
@@ -124,7 +124,7 @@ class TestConfigEndpoints:
             )
             
             assert response.status_code == 500
-
+    
     @pytest.mark.asyncio
     async def test_put_config_with_numeric_value(self, async_client):
         """Test PUT /config/{key} with numeric value (should convert to string)."""
@@ -143,7 +143,7 @@ class TestConfigEndpoints:
 
 class TestDeleteServiceEndpoint:
     """Unit tests for DELETE /deregister/{service_id} endpoint."""
-
+    
     @pytest.mark.asyncio
     async def test_deregister_via_delete_success(self, async_client):
         """Test DELETE /services/deregister/{service_id} success."""
@@ -157,7 +157,7 @@ class TestDeleteServiceEndpoint:
             data = response.json()
             assert data["success"] is True
             assert "test-service-123" in data["message"]
-
+    
     @pytest.mark.asyncio
     async def test_deregister_via_delete_not_found(self, async_client):
         """Test DELETE /services/deregister/{service_id} with non-existent service."""
@@ -169,7 +169,7 @@ class TestDeleteServiceEndpoint:
             
             assert response.status_code == 404
             assert "not found" in response.json()["detail"].lower()
-
+    
     @pytest.mark.asyncio
     async def test_deregister_via_delete_error(self, async_client):
         """Test DELETE /services/deregister/{service_id} with internal error."""
@@ -186,7 +186,7 @@ class TestDeleteServiceEndpoint:
 
 class TestGetServiceInstance:
     """Unit tests for GET /services/{name}/instance endpoint."""
-
+    
     @pytest.mark.asyncio
     async def test_get_instance_round_robin(self, async_client):
         """Test GET /services/{name}/instance with round-robin strategy."""
@@ -213,7 +213,7 @@ class TestGetServiceInstance:
             assert data["service_name"] == "api-service"
             assert data["address"] == "192.168.1.10"
             assert data["port"] == 8080
-
+    
     @pytest.mark.asyncio
     async def test_get_instance_with_geographic_filters(self, async_client):
         """Test GET /services/{name}/instance with geographic routing."""
@@ -242,7 +242,7 @@ class TestGetServiceInstance:
             assert response.status_code == 200
             data = response.json()
             assert data["address"] == "10.0.1.5"
-
+    
     @pytest.mark.asyncio
     async def test_get_instance_not_found(self, async_client):
         """Test GET /services/{name}/instance with no instances."""
@@ -253,11 +253,11 @@ class TestGetServiceInstance:
             response = await async_client.get("/api/v1/services/nonexistent/instance")
             
             assert response.status_code == 404
-
+    
     @pytest.mark.asyncio
     async def test_get_instance_all_strategies(self, async_client):
         """Test GET /services/{name}/instance with all load balancing strategies."""
-        strategies = ["round_robin", "weighted", "least_connections", "geographic", "random"]
+        strategies = ["round_robin", "weighted", "least_connections", "geographic", "random", "peak_ewma"]
         
         for strategy in strategies:
             with patch("app.api.v1.services.ServiceRegistryService") as MockRegistry:
@@ -279,7 +279,7 @@ class TestGetServiceInstance:
                 )
                 
                 assert response.status_code == 200, f"Failed for strategy: {strategy}"
-
+    
     @pytest.mark.asyncio
     async def test_get_instance_with_datacenter(self, async_client):
         """Test GET /services/{name}/instance with datacenter filter."""
@@ -302,3 +302,103 @@ class TestGetServiceInstance:
             )
             
             assert response.status_code == 200
+
+
+class TestFeedbackEndpoint:
+    """Unit tests for POST /services/feedback endpoint."""
+    
+    @pytest.mark.asyncio
+    async def test_feedback_reaches_strategy(self, async_client):
+        """Test completion reports are passed to the selecting strategy."""
+        with patch("app.api.v1.services.LoadBalancerFactory") as MockFactory:
+            mock_lb = MockFactory.get_load_balancer.return_value
+            mock_lb.record_completion = AsyncMock()
+            
+            response = await async_client.post(
+                "/api/v1/services/feedback",
+                json={"service_id": "api-1", "strategy": "peak_ewma", "latency_ms": 35.0, "success": False}
+            )
+            
+            assert response.status_code == 200
+            MockFactory.get_load_balancer.assert_called_once_with("peak_ewma")
+            mock_lb.record_completion.assert_called_once_with("api-1", latency_ms=35.0, success=False)
+    
+    @pytest.mark.asyncio
+    async def test_feedback_rejects_negative_latency(self, async_client):
+        """Test invalid latency values are rejected."""
+        response = await async_client.post(
+            "/api/v1/services/feedback",
+            json={"service_id": "api-1", "strategy": "peak_ewma", "latency_ms": -1}
+        )
+        
+        assert response.status_code == 422
+
+
+class TestBatchEndpoints:
+    """Unit tests for the batch register/deregister/heartbeat endpoints."""
+    
+    @pytest.mark.asyncio
+    async def test_register_batch_reports_per_instance(self, async_client):
+        """Test POST /services/register/batch returns per-instance results."""
+        with patch("app.api.v1.services.ServiceRegistryService") as MockRegistry:
+            mock_registry = MockRegistry.return_value
+            mock_registry.register_services = AsyncMock(return_value=[
+                BatchItemResult(id="api-1", success=True),
+                BatchItemResult(id="api-2", success=False, error="Failed to register service with Consul"),
+            ])
+            
+            response = await async_client.post(
+                "/api/v1/services/register/batch",
+                json={"services": [
+                    {"service_id": f"api-{i}", "service_name": "api", "address": "10.0.0.1", "port": 8000 + i}
+                    for i in (1, 2)
+                ]}
+            )
+            
+            assert response.status_code == 200
+            data = response.json()
+            assert data["succeeded"] == 1
+            assert data["failed"] == 1
+            assert data["results"][1]["error"] == "Failed to register service with Consul"
+            assert len(mock_registry.register_services.call_args.args[0]) == 2
+    
+    @pytest.mark.asyncio
+    async def test_batch_size_limit(self, async_client):
+        """Test batches above REGISTRY_BATCH_MAX_SIZE are rejected."""
+        with patch("app.api.v1.services.settings") as mock_settings:
+            mock_settings.REGISTRY_BATCH_MAX_SIZE = 2
+            
+            response = await async_client.post(
+                "/api/v1/services/deregister/batch",
+                json={"service_ids": ["a", "b", "c"]}
+            )
+            
+            assert response.status_code == 413
+    
+    @pytest.mark.asyncio
+    async def test_empty_batch_rejected(self, async_client):
+        """Test empty batches fail validation."""
+        response = await async_client.post("/api/v1/health/update/batch", json={"updates": []})
+        
+        assert response.status_code == 422
+    
+    @pytest.mark.asyncio
+    async def test_health_update_batch(self, async_client):
+        """Test POST /health/update/batch passes all updates to the registry."""
+        with patch("app.api.v1.services.ServiceRegistryService") as MockRegistry:
+            mock_registry = MockRegistry.return_value
+            mock_registry.update_health_checks = AsyncMock(return_value=[
+                BatchItemResult(id="service:api-1", success=True),
+                BatchItemResult(id="service:api-2", success=True),
+            ])
+            
+            response = await async_client.post(
+                "/api/v1/health/update/batch",
+                json={"updates": [
+                    {"check_id": "service:api-1", "status": "pass"},
+                    {"check_id": "service:api-2", "status": "pass"},
+                ]}
+            )
+            
+            assert response.status_code == 200
+            assert response.json()["succeeded"] == 2
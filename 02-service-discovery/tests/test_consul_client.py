@@ -43,14 +43,67 @@ License: MIT License
 ================================================================================
 """
 
+import base64
+import json
+
+import httpx
 import pytest
-from unittest.mock import AsyncMock, Mock, patch
 from app.core.consul_client import (
     ConsulClient,
     HealthCheck,
     ServiceInstance,
     consul_client,
 )
+from app.core.metrics import consul_operations_total
+
+
+class ConsulStub:
+    """Stand-in for the Consul HTTP API, used as an httpx MockTransport handler."""
+    
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+    
+    def on(self, method, path, body=None, status=200, headers=None, error=None):
+        """Answer ``method path`` with a JSON body, or raise ``error``."""
+        self.routes[(method, path)] = (status, body, headers or {}, error)
+    
+    def calls(self, method, path):
+        """Requests received for ``method path``."""
+        return [
+            request for request in self.requests
+            if request.method == method and request.url.path == path
+        ]
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        route = self.routes.get((request.method, request.url.path))
+        if route is None:
+            return httpx.Response(404)
+        status, body, headers, error = route
+        if error is not None:
+            raise error
+        return httpx.Response(status, json=body, headers=headers)
+
+
+def payload(request: httpx.Request) -> dict:
+    """JSON body of a recorded request."""
+    return json.loads(request.content)
+
+
+def health_entry(service_id, address='10.0.1.100', tags=None, meta=None, status='passing'):
+    """One element of a /v1/health/service response."""
+    return {
+        'Service': {
+            'ID': service_id,
+            'Service': 'test-service',
+            'Address': address,
+            'Port': 8080,
+            'Tags': tags if tags is not None else [],
+            'Meta': meta if meta is not None else {}
+        },
+        'Checks': [{'Status': status}]
+    }
 
 
 @pytest.mark.asyncio
@@ -58,359 +111,322 @@ class TestConsulClient:
     """Test Consul client operations."""
     
     @pytest.fixture
-    def client(self):
+    def consul(self):
+        """Fake Consul HTTP API."""
+        return ConsulStub()
+    
+    @pytest.fixture
+    def client(self, consul):
         """Create Consul client instance."""
         return ConsulClient(
             host="localhost",
             port=8500,
             token=None,
-            datacenter="dc1"
+            datacenter="dc1",
+            transport=httpx.MockTransport(consul)
         )
     
-    async def test_register_service_http_check(self, client):
+    async def test_register_service_http_check(self, client, consul):
         """Test service registration with HTTP health check."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            health_check = HealthCheck(
-                check_type="http",
-                interval="10s",
-                timeout="5s",
-                http_endpoint="http://localhost:8080/health"
-            )
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080,
-                tags=["v1.0.0"],
-                meta={"version": "1.0.0"},
-                health_check=health_check
-            )
-            
-            assert result is True
-            mock_register.assert_called_once()
-    
-    async def test_register_service_tcp_check(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        health_check = HealthCheck(
+            check_type="http",
+            interval="10s",
+            timeout="5s",
+            http_endpoint="http://localhost:8080/health"
+        )
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080,
+            tags=["v1.0.0"],
+            meta={"version": "1.0.0"},
+            health_check=health_check
+        )
+        
+        assert result is True
+        calls = consul.calls("PUT", "/v1/agent/service/register")
+        assert len(calls) == 1
+        body = payload(calls[0])
+        assert body["ID"] == "test-001"
+        assert body["Name"] == "test-service"
+        assert body["Check"]["http"] == "http://localhost:8080/health"
+    
+    async def test_register_service_tcp_check(self, client, consul):
         """Test service registration with TCP health check."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            health_check = HealthCheck(
-                check_type="tcp",
-                interval="10s",
-                timeout="5s",
-                tcp_address="10.0.1.100:8080"
-            )
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080,
-                health_check=health_check
-            )
-            
-            assert result is True
-    
-    async def test_register_service_ttl_check(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        health_check = HealthCheck(
+            check_type="tcp",
+            interval="10s",
+            timeout="5s",
+            tcp_address="10.0.1.100:8080"
+        )
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080,
+            health_check=health_check
+        )
+        
+        assert result is True
+        body = payload(consul.calls("PUT", "/v1/agent/service/register")[0])
+        assert body["Check"]["tcp"] == "10.0.1.100:8080"
+    
+    async def test_register_service_ttl_check(self, client, consul):
         """Test service registration with TTL health check."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            health_check = HealthCheck(
-                check_type="ttl",
-                ttl="30s"
-            )
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080,
-                health_check=health_check
-            )
-            
-            assert result is True
-    
-    async def test_deregister_service(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        health_check = HealthCheck(
+            check_type="ttl",
+            ttl="30s"
+        )
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080,
+            health_check=health_check
+        )
+        
+        assert result is True
+        body = payload(consul.calls("PUT", "/v1/agent/service/register")[0])
+        assert body["Check"]["ttl"] == "30s"
+    
+    async def test_deregister_service(self, client, consul):
         """Test service deregistration."""
-        with patch.object(client.consul.agent.service, 'deregister') as mock_deregister:
-            mock_deregister.return_value = True
-            
-            result = await client.deregister_service("test-001")
-            
-            assert result is True
-            mock_deregister.assert_called_once_with("test-001")
-    
-    async def test_discover_service(self, client):
+        consul.on("PUT", "/v1/agent/service/deregister/test-001")
+        
+        result = await client.deregister_service("test-001")
+        
+        assert result is True
+        assert len(consul.calls("PUT", "/v1/agent/service/deregister/test-001")) == 1
+    
+    async def test_discover_service(self, client, consul):
         """Test service discovery."""
         mock_services = [
-            {
-                'Service': {
-                    'ID': 'test-001',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.100',
-                    'Port': 8080,
-                    'Tags': ['v1.0.0'],
-                    'Meta': {'version': '1.0.0'}
-                },
-                'Checks': [{'Status': 'passing'}]
-            },
-            {
-                'Service': {
-                    'ID': 'test-002',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.101',
-                    'Port': 8080,
-                    'Tags': ['v1.0.0'],
-                    'Meta': {'version': '1.0.0'}
-                },
-                'Checks': [{'Status': 'passing'}]
-            },
+            health_entry('test-001', tags=['v1.0.0'], meta={'version': '1.0.0'}),
+            health_entry('test-002', address='10.0.1.101', tags=['v1.0.0'], meta={'version': '1.0.0'}),
         ]
+        consul.on("GET", "/v1/health/service/test-service", mock_services)
         
-        with patch.object(client.consul.health, 'service', return_value=(None, mock_services)):
-            instances = await client.discover_service("test-service")
-            
-            assert len(instances) == 2
-            assert instances[0].service_id == "test-001"
-            assert instances[1].service_id == "test-002"
+        instances = await client.discover_service("test-service")
+        
+        assert len(instances) == 2
+        assert instances[0].service_id == "test-001"
+        assert instances[1].service_id == "test-002"
     
-    async def test_discover_service_with_tags(self, client):
+    async def test_discover_service_with_tags(self, client, consul):
         """Test service discovery with tag filtering."""
         mock_services = [
-            {
-                'Service': {
-                    'ID': 'test-001',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.100',
-                    'Port': 8080,
-                    'Tags': ['v1.0.0', 'production'],
-                    'Meta': {}
-                },
-                'Checks': [{'Status': 'passing'}]
-            },
-            {
-                'Service': {
-                    'ID': 'test-002',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.101',
-                    'Port': 8080,
-                    'Tags': ['v1.0.0', 'staging'],
-                    'Meta': {}
-                },
-                'Checks': [{'Status': 'passing'}]
-            },
+            health_entry('test-001', tags=['v1.0.0', 'production']),
+            health_entry('test-002', address='10.0.1.101', tags=['v1.0.0', 'staging']),
         ]
+        consul.on("GET", "/v1/health/service/test-service", mock_services)
+        
+        instances = await client.discover_service("test-service", tag="production")
         
-        with patch.object(client.consul.health, 'service', return_value=(None, mock_services)):
-            instances = await client.discover_service("test-service", tag="production")
-            
-            # Both will be returned by Consul API, filtering happens in Consul
-            assert len(instances) == 2
+        # Both will be returned by Consul API, filtering happens in Consul
+        assert len(instances) == 2
+        request = consul.calls("GET", "/v1/health/service/test-service")[0]
+        assert request.url.params["tag"] == "production"
     
-    async def test_discover_service_only_healthy(self, client):
+    async def test_discover_service_only_healthy(self, client, consul):
         """Test service discovery filtering only healthy instances."""
-        mock_services = [
-            {
-                'Service': {
-                    'ID': 'test-001',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.100',
-                    'Port': 8080,
-                    'Tags': [],
-                    'Meta': {}
-                },
-                'Checks': [{'Status': 'passing'}]
-            },
-        ]
+        consul.on("GET", "/v1/health/service/test-service", [health_entry('test-001')])
         
-        with patch.object(client.consul.health, 'service', return_value=(None, mock_services)):
-            instances = await client.discover_service("test-service", passing_only=True)
-            
-            assert len(instances) == 1
-            assert instances[0].service_id == "test-001"
+        instances = await client.discover_service("test-service", passing_only=True)
+        
+        assert len(instances) == 1
+        assert instances[0].service_id == "test-001"
+        request = consul.calls("GET", "/v1/health/service/test-service")[0]
+        assert request.url.params["passing"] == "1"
     
-    async def test_get_all_services(self, client):
+    async def test_get_all_services(self, client, consul):
         """Test getting all registered services."""
         mock_services = {
             'test-service': ['v1.0.0', 'production'],
             'auth-service': ['v2.0.0', 'api'],
         }
+        consul.on("GET", "/v1/catalog/services", mock_services)
+        
+        services = await client.get_all_services()
         
-        with patch.object(client.consul.catalog, 'services', return_value=(None, mock_services)):
-            services = await client.get_all_services()
-            
-            assert len(services) == 2
-            assert 'test-service' in services
-            assert 'auth-service' in services
-            assert services['test-service'] == ['v1.0.0', 'production']
+        assert len(services) == 2
+        assert 'test-service' in services
+        assert 'auth-service' in services
+        assert services['test-service'] == ['v1.0.0', 'production']
     
-    async def test_update_health_check_pass(self, client):
+    async def test_update_health_check_pass(self, client, consul):
         """Test updating health check to passing."""
-        with patch.object(client, 'update_health_check', return_value=True) as mock_update:
-            result = await client.update_health_check("test-001", "pass")
-            assert result is True
+        consul.on("PUT", "/v1/agent/check/pass/test-001")
+        
+        result = await client.update_health_check("test-001", "pass")
+        
+        assert result is True
+        assert len(consul.calls("PUT", "/v1/agent/check/pass/test-001")) == 1
     
-    async def test_update_health_check_warn(self, client):
+    async def test_update_health_check_warn(self, client, consul):
         """Test updating health check to warning."""
-        with patch.object(client, 'update_health_check', return_value=True) as mock_update:
-            result = await client.update_health_check("test-001", "warn", "High latency")
-            assert result is True
+        consul.on("PUT", "/v1/agent/check/warn/test-001")
+        
+        result = await client.update_health_check("test-001", "warn", "High latency")
+        
+        assert result is True
+        request = consul.calls("PUT", "/v1/agent/check/warn/test-001")[0]
+        assert request.url.params["note"] == "High latency"
     
-    async def test_update_health_check_fail(self, client):
+    async def test_update_health_check_fail(self, client, consul):
         """Test updating health check to failing."""
-        with patch.object(client, 'update_health_check', return_value=True) as mock_update:
-            result = await client.update_health_check("test-001", "fail", "Service down")
-            assert result is True
+        consul.on("PUT", "/v1/agent/check/fail/test-001")
+        
+        result = await client.update_health_check("test-001", "fail", "Service down")
+        
+        assert result is True
+        assert len(consul.calls("PUT", "/v1/agent/check/fail/test-001")) == 1
     
-    async def test_kv_operations(self, client):
+    async def test_kv_operations(self, client, consul):
         """Test KV store operations."""
         # Put
-        with patch.object(client.consul.kv, 'put', return_value=True) as mock_put:
-            result = await client.put_kv("test/key", "value")
-            assert result is True
-            mock_put.assert_called_once_with("test/key", "value")
+        consul.on("PUT", "/v1/kv/test/key", True)
+        result = await client.put_kv("test/key", "value")
+        assert result is True
+        assert consul.calls("PUT", "/v1/kv/test/key")[0].content == b"value"
         
         # Get
-        with patch.object(client.consul.kv, 'get', return_value=(None, {'Value': b'value'})) as mock_get:
-            result = await client.get_kv("test/key")
-            assert result == "value"
-            mock_get.assert_called_once_with("test/key")
+        consul.on("GET", "/v1/kv/test/key", [{'Key': 'test/key', 'Value': base64.b64encode(b'value').decode()}])
+        result = await client.get_kv("test/key")
+        assert result == "value"
+        assert len(consul.calls("GET", "/v1/kv/test/key")) == 1
         
         # Delete
-        with patch.object(client.consul.kv, 'delete', return_value=True) as mock_delete:
-            result = await client.delete_kv("test/key")
-            assert result is True
-            mock_delete.assert_called_once_with("test/key")
+        consul.on("DELETE", "/v1/kv/test/key", True)
+        result = await client.delete_kv("test/key")
+        assert result is True
+        assert len(consul.calls("DELETE", "/v1/kv/test/key")) == 1
     
-    async def test_health_check(self, client):
+    async def test_health_check(self, client, consul):
         """Test Consul health check."""
-        with patch.object(client, 'health_check', return_value=True) as mock_health:
-            result = await client.health_check()
-            assert result is True
+        consul.on("GET", "/v1/status/leader", "10.0.0.1:8300")
+        
+        result = await client.health_check()
+        
+        assert result is True
     
-    async def test_error_handling(self, client):
+    async def test_error_handling(self, client, consul):
         """Test error handling in Consul operations."""
-        with patch.object(client.consul.agent.service, 'register', side_effect=Exception("Consul error")):
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080
-            )
-            assert result is False
-    
-    async def test_register_service_grpc_check(self, client):
+        consul.on("PUT", "/v1/agent/service/register", error=httpx.ConnectError("Consul error"))
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080
+        )
+        assert result is False
+    
+    async def test_register_service_grpc_check(self, client, consul):
         """Test service registration with gRPC health check."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            health_check = HealthCheck(
-                check_type="grpc",
-                interval="10s",
-                timeout="5s",
-                grpc_endpoint="10.0.1.100:9090"
-            )
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080,
-                health_check=health_check
-            )
-            
-            assert result is True
-            mock_register.assert_called_once()
-    
-    async def test_register_service_without_health_check(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        health_check = HealthCheck(
+            check_type="grpc",
+            interval="10s",
+            timeout="5s",
+            grpc_endpoint="10.0.1.100:9090"
+        )
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080,
+            health_check=health_check
+        )
+        
+        assert result is True
+        calls = consul.calls("PUT", "/v1/agent/service/register")
+        assert len(calls) == 1
+        assert payload(calls[0])["Check"]["grpc"] == "10.0.1.100:9090"
+    
+    async def test_register_service_without_health_check(self, client, consul):
         """Test service registration without health check."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080
-            )
-            
-            assert result is True
-            # Verify no health check was passed
-            call_args = mock_register.call_args
-            assert call_args[1]['check'] is None
-    
-    async def test_register_service_with_metadata(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080
+        )
+        
+        assert result is True
+        # Verify no health check was passed
+        body = payload(consul.calls("PUT", "/v1/agent/service/register")[0])
+        assert "Check" not in body
+    
+    async def test_register_service_with_metadata(self, client, consul):
         """Test service registration with tags and metadata."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = True
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080,
-                tags=["v1.0.0", "production", "api"],
-                meta={"version": "1.0.0", "team": "backend", "region": "us-east-1"}
-            )
-            
-            assert result is True
-            call_args = mock_register.call_args
-            assert call_args[1]['tags'] == ["v1.0.0", "production", "api"]
-            assert call_args[1]['meta'] == {"version": "1.0.0", "team": "backend", "region": "us-east-1"}
-    
-    async def test_deregister_service_error(self, client):
+        consul.on("PUT", "/v1/agent/service/register")
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080,
+            tags=["v1.0.0", "production", "api"],
+            meta={"version": "1.0.0", "team": "backend", "region": "us-east-1"}
+        )
+        
+        assert result is True
+        body = payload(consul.calls("PUT", "/v1/agent/service/register")[0])
+        assert body["Tags"] == ["v1.0.0", "production", "api"]
+        assert body["Meta"] == {"version": "1.0.0", "team": "backend", "region": "us-east-1"}
+    
+    async def test_deregister_service_error(self, client, consul):
         """Test error handling in service deregistration."""
-        with patch.object(client.consul.agent.service, 'deregister', side_effect=Exception("Deregister error")):
-            result = await client.deregister_service("test-001")
-            assert result is False
+        consul.on(
+            "PUT", "/v1/agent/service/deregister/test-001",
+            error=httpx.ConnectError("Deregister error")
+        )
+        result = await client.deregister_service("test-001")
+        assert result is False
     
-    async def test_deregister_service_failure(self, client):
+    async def test_deregister_service_failure(self, client, consul):
         """Test service deregistration failure."""
-        with patch.object(client.consul.agent.service, 'deregister') as mock_deregister:
-            mock_deregister.return_value = False
-            
-            result = await client.deregister_service("test-001")
-            assert result is False
+        consul.on("PUT", "/v1/agent/service/deregister/test-001", status=500)
+        
+        result = await client.deregister_service("test-001")
+        assert result is False
     
-    async def test_discover_service_empty(self, client):
+    async def test_discover_service_empty(self, client, consul):
         """Test service discovery with no instances."""
-        with patch.object(client.consul.health, 'service', return_value=(None, [])):
-            instances = await client.discover_service("non-existent-service")
-            assert len(instances) == 0
+        consul.on("GET", "/v1/health/service/non-existent-service", [])
+        instances = await client.discover_service("non-existent-service")
+        assert len(instances) == 0
     
-    async def test_discover_service_error(self, client):
+    async def test_discover_service_error(self, client, consul):
         """Test error handling in service discovery."""
-        with patch.object(client.consul.health, 'service', side_effect=Exception("Discovery error")):
-            instances = await client.discover_service("test-service")
-            assert len(instances) == 0
+        consul.on("GET", "/v1/health/service/test-service", error=httpx.ReadTimeout("Discovery error"))
+        instances = await client.discover_service("test-service")
+        assert len(instances) == 0
     
-    async def test_discover_service_with_datacenter(self, client):
+    async def test_discover_service_with_datacenter(self, client, consul):
         """Test service discovery with custom datacenter."""
-        mock_services = [
-            {
-                'Service': {
-                    'ID': 'test-001',
-                    'Service': 'test-service',
-                    'Address': '10.0.1.100',
-                    'Port': 8080,
-                    'Tags': [],
-                    'Meta': {}
-                },
-                'Checks': [{'Status': 'passing'}]
-            }
-        ]
+        consul.on("GET", "/v1/health/service/test-service", [health_entry('test-001')])
         
-        with patch.object(client.consul.health, 'service', return_value=(None, mock_services)) as mock_health:
-            instances = await client.discover_service("test-service", datacenter="dc2")
-            
-            assert len(instances) == 1
-            mock_health.assert_called_once()
-            call_args = mock_health.call_args
-            assert call_args[1]['dc'] == 'dc2'
+        instances = await client.discover_service("test-service", datacenter="dc2")
+        
+        assert len(instances) == 1
+        calls = consul.calls("GET", "/v1/health/service/test-service")
+        assert len(calls) == 1
+        assert calls[0].url.params['dc'] == 'dc2'
     
     async def test_get_health_status_critical(self, client):
         """Test health status determination with critical checks."""
@@ -445,72 +461,70 @@ class TestConsulClient:
         status = client._get_health_status(checks)
         assert status == 'passing'
     
-    async def test_get_all_services_error(self, client):
+    async def test_get_all_services_error(self, client, consul):
         """Test error handling when getting all services."""
-        with patch.object(client.consul.catalog, 'services', side_effect=Exception("Catalog error")):
-            services = await client.get_all_services()
-            assert services == {}
+        consul.on("GET", "/v1/catalog/services", error=httpx.ConnectError("Catalog error"))
+        services = await client.get_all_services()
+        assert services == {}
     
-    async def test_update_health_check_invalid_status(self, client):
+    async def test_update_health_check_invalid_status(self, client, consul):
         """Test updating health check with invalid status."""
-        with patch.object(client.consul.agent.check, 'ttl_pass') as mock_pass:
-            result = await client.update_health_check("test-001", "invalid")
-            assert result is False
-            mock_pass.assert_not_called()
+        result = await client.update_health_check("test-001", "invalid")
+        assert result is False
+        assert consul.requests == []
     
-    async def test_update_health_check_error(self, client):
+    async def test_update_health_check_error(self, client, consul):
         """Test error handling in health check update."""
-        with patch.object(client.consul.agent.check, 'ttl_pass', side_effect=Exception("Update error")):
-            result = await client.update_health_check("test-001", "pass")
-            assert result is False
+        consul.on("PUT", "/v1/agent/check/pass/test-001", error=httpx.ConnectError("Update error"))
+        result = await client.update_health_check("test-001", "pass")
+        assert result is False
     
-    async def test_put_kv_error(self, client):
+    async def test_put_kv_error(self, client, consul):
         """Test error handling in KV put operation."""
-        with patch.object(client.consul.kv, 'put', side_effect=Exception("KV error")):
-            result = await client.put_kv("test/key", "value")
-            assert result is False
+        consul.on("PUT", "/v1/kv/test/key", error=httpx.ConnectError("KV error"))
+        result = await client.put_kv("test/key", "value")
+        assert result is False
     
-    async def test_put_kv_failure(self, client):
+    async def test_put_kv_failure(self, client, consul):
         """Test KV put operation failure."""
-        with patch.object(client.consul.kv, 'put', return_value=False):
-            result = await client.put_kv("test/key", "value")
-            assert result is False
+        consul.on("PUT", "/v1/kv/test/key", False)
+        result = await client.put_kv("test/key", "value")
+        assert result is False
     
-    async def test_get_kv_not_found(self, client):
+    async def test_get_kv_not_found(self, client, consul):
         """Test getting non-existent key from KV store."""
-        with patch.object(client.consul.kv, 'get', return_value=(None, None)):
-            result = await client.get_kv("non/existent/key")
-            assert result is None
+        result = await client.get_kv("non/existent/key")
+        assert result is None
     
-    async def test_get_kv_error(self, client):
+    async def test_get_kv_error(self, client, consul):
         """Test error handling in KV get operation."""
-        with patch.object(client.consul.kv, 'get', side_effect=Exception("Get error")):
-            result = await client.get_kv("test/key")
-            assert result is None
+        consul.on("GET", "/v1/kv/test/key", error=httpx.ConnectError("Get error"))
+        result = await client.get_kv("test/key")
+        assert result is None
     
-    async def test_delete_kv_error(self, client):
+    async def test_delete_kv_error(self, client, consul):
         """Test error handling in KV delete operation."""
-        with patch.object(client.consul.kv, 'delete', side_effect=Exception("Delete error")):
-            result = await client.delete_kv("test/key")
-            assert result is False
+        consul.on("DELETE", "/v1/kv/test/key", error=httpx.ConnectError("Delete error"))
+        result = await client.delete_kv("test/key")
+        assert result is False
     
-    async def test_delete_kv_failure(self, client):
+    async def test_delete_kv_failure(self, client, consul):
         """Test KV delete operation failure."""
-        with patch.object(client.consul.kv, 'delete', return_value=False):
-            result = await client.delete_kv("test/key")
-            assert result is False
+        consul.on("DELETE", "/v1/kv/test/key", False)
+        result = await client.delete_kv("test/key")
+        assert result is False
     
-    async def test_health_check_failure(self, client):
+    async def test_health_check_failure(self, client, consul):
         """Test Consul health check failure."""
-        with patch.object(client.consul.status, 'leader', return_value=None):
-            result = await client.health_check()
-            assert result is False
+        consul.on("GET", "/v1/status/leader", "")
+        result = await client.health_check()
+        assert result is False
     
-    async def test_health_check_error(self, client):
+    async def test_health_check_error(self, client, consul):
         """Test error handling in Consul health check."""
-        with patch.object(client.consul.status, 'leader', side_effect=Exception("Health check error")):
-            result = await client.health_check()
-            assert result is False
+        consul.on("GET", "/v1/status/leader", error=httpx.ConnectError("Health check error"))
+        result = await client.health_check()
+        assert result is False
     
     async def test_prepare_health_check_http_default_endpoint(self, client):
         """Test HTTP health check with default endpoint."""
@@ -582,21 +596,20 @@ class TestConsulClient:
         assert check_config['interval'] == "10s"
         assert check_config['timeout'] == "5s"
     
-    async def test_register_service_failure(self, client):
+    async def test_register_service_failure(self, client, consul):
         """Test service registration returning False."""
-        with patch.object(client.consul.agent.service, 'register') as mock_register:
-            mock_register.return_value = False
-            
-            result = await client.register_service(
-                service_id="test-001",
-                service_name="test-service",
-                address="10.0.1.100",
-                port=8080
-            )
-            
-            assert result is False
-    
-    async def test_discover_service_without_tags_or_meta(self, client):
+        consul.on("PUT", "/v1/agent/service/register", status=500)
+        
+        result = await client.register_service(
+            service_id="test-001",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080
+        )
+        
+        assert result is False
+    
+    async def test_discover_service_without_tags_or_meta(self, client, consul):
         """Test service discovery with services missing tags and meta."""
         mock_services = [
             {
@@ -609,13 +622,93 @@ class TestConsulClient:
                 'Checks': [{'Status': 'passing'}]
             }
         ]
+        consul.on("GET", "/v1/health/service/test-service", mock_services)
         
-        with patch.object(client.consul.health, 'service', return_value=(None, mock_services)):
-            instances = await client.discover_service("test-service")
-            
-            assert len(instances) == 1
-            assert instances[0].tags == []
-            assert instances[0].meta == {}
+        instances = await client.discover_service("test-service")
+        
+        assert len(instances) == 1
+        assert instances[0].tags == []
+        assert instances[0].meta == {}
+    
+    async def test_watch_service_blocking_query(self, client, consul):
+        """Test blocking query passes the index and returns the new one."""
+        consul.on(
+            "GET", "/v1/health/service/test-service",
+            [health_entry('test-001', status='critical')],
+            headers={"X-Consul-Index": "42"}
+        )
+        
+        index, instances = await client.watch_service("test-service", index=7, wait=30)
+        
+        assert index == 42
+        assert instances[0].health_status == "critical"
+        request = consul.calls("GET", "/v1/health/service/test-service")[0]
+        assert request.url.params["index"] == "7"
+        assert request.url.params["wait"] == "30s"
+        assert "passing" not in request.url.params
+        # The read timeout outlasts the blocking wait
+        assert request.extensions["timeout"]["read"] > 30
+    
+    async def test_watch_service_raises_on_error(self, client, consul):
+        """Test blocking query errors reach the caller."""
+        consul.on("GET", "/v1/health/service/test-service", status=500)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.watch_service("test-service")
+    
+    async def test_watch_services_blocking_query(self, client, consul):
+        """Test the service list blocking query returns the registered names."""
+        consul.on(
+            "GET", "/v1/catalog/services",
+            {"consul": [], "test-service": ["api"]},
+            headers={"X-Consul-Index": "21"}
+        )
+        
+        assert await client.watch_services(index=20, wait=30) == (21, {"consul", "test-service"})
+        request = consul.calls("GET", "/v1/catalog/services")[0]
+        assert request.url.params["index"] == "20"
+        assert request.url.params["wait"] == "30s"
+    
+    async def test_watch_kv_prefix(self, client, consul):
+        """Test KV blocking query decodes entries with their modify indexes."""
+        consul.on(
+            "GET", "/v1/kv/config/app/",
+            [
+                {'Key': 'config/app/a', 'Value': base64.b64encode(b'1').decode(), 'ModifyIndex': 11},
+                {'Key': 'config/app/', 'Value': None, 'ModifyIndex': 3},
+            ],
+            headers={"X-Consul-Index": "12"}
+        )
+        
+        index, entries = await client.watch_kv("config/app/", index=9, wait=30, recurse=True)
+        
+        assert index == 12
+        assert entries["config/app/a"].value == "1"
+        assert entries["config/app/a"].modify_index == 11
+        assert entries["config/app/"].value is None
+        request = consul.calls("GET", "/v1/kv/config/app/")[0]
+        assert request.url.params["recurse"] == "true"
+        assert request.url.params["index"] == "9"
+    
+    async def test_watch_kv_missing_key(self, client, consul):
+        """Test a missing key yields no entries but keeps the index."""
+        consul.on("GET", "/v1/kv/missing", status=404, headers={"X-Consul-Index": "7"})
+        
+        assert await client.watch_kv("missing") == (7, {})
+    
+    async def test_operations_are_tracked(self, client, consul):
+        """Test Consul calls are recorded per operation and result."""
+        success = consul_operations_total.labels(operation="register", result="success")
+        failure = consul_operations_total.labels(operation="register", result="failure")
+        successes, failures = success._value.get(), failure._value.get()
+        
+        consul.on("PUT", "/v1/agent/service/register")
+        await client.register_service("test-001", "test-service", "10.0.1.100", 8080)
+        consul.on("PUT", "/v1/agent/service/register", status=500)
+        await client.register_service("test-001", "test-service", "10.0.1.100", 8080)
+        
+        assert success._value.get() == successes + 1
+        assert failure._value.get() == failures + 1
 
 
 class TestHealthCheck:
@@ -764,25 +857,48 @@ class TestConsulClientInitialization:
     
     def test_client_init_with_defaults(self):
         """Test client initialization with default settings."""
-        with patch('app.core.consul_client.consul.Consul') as mock_consul:
-            client = ConsulClient()
-            mock_consul.assert_called_once()
+        from app.config import settings
+        
+        client = ConsulClient()
+        
+        assert client.base_url == (
+            f"{settings.CONSUL_SCHEME}://{settings.CONSUL_HOST}:{settings.CONSUL_PORT}"
+        )
+        assert client.datacenter == settings.CONSUL_DATACENTER
     
     def test_client_init_with_custom_params(self):
         """Test client initialization with custom parameters."""
-        with patch('app.core.consul_client.consul.Consul') as mock_consul:
-            client = ConsulClient(
-                host="consul.example.com",
-                port=8600,
-                token="test-token",
-                datacenter="dc2"
-            )
-            mock_consul.assert_called_once()
-            call_args = mock_consul.call_args
-            assert call_args[1]['host'] == "consul.example.com"
-            assert call_args[1]['port'] == 8600
-            assert call_args[1]['token'] == "test-token"
-            assert call_args[1]['dc'] == "dc2"
+        client = ConsulClient(
+            host="consul.example.com",
+            port=8600,
+            token="test-token",
+            datacenter="dc2"
+        )
+        
+        assert client.base_url.endswith("://consul.example.com:8600")
+        assert client.client.headers["X-Consul-Token"] == "test-token"
+        assert client.watch_client.headers["X-Consul-Token"] == "test-token"
+        assert client.datacenter == "dc2"
+    
+    @pytest.mark.asyncio
+    async def test_blocking_queries_use_their_own_pool(self):
+        """Test long-held watches cannot exhaust the pool of regular calls."""
+        from app.config import settings
+        
+        client = ConsulClient()
+        assert client.watch_client is not client.client
+        assert client.watch_client._transport._pool._max_connections > settings.CONSUL_MAX_CONNECTIONS
+        
+        consul = ConsulStub()
+        consul.on("GET", "/v1/health/service/test-service", [], headers={"X-Consul-Index": "3"})
+        await client.client.aclose()
+        await client.watch_client.aclose()
+        client.watch_client = httpx.AsyncClient(
+            base_url=client.base_url, transport=httpx.MockTransport(consul)
+        )
+        
+        assert await client.watch_service("test-service") == (3, [])
+        await client.close()
 
 
 class TestGlobalConsulClient:
@@ -19,7 +19,7 @@ Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
 TIMELINE & EFFORT (زمان‌بندی و تلاش)
 ================================================================================
 Created Date      : 2025-11-07 22:10 UTC
-Last Modified     : 2025-11-07 22:10 UTC
+Last Modified     : 2025-11-29 16:00 UTC
 Development Time  : 1 hour 0 minutes
 Review Time       : 0 hours 15 minutes
 Testing Time      : 0 hours 20 minutes
@@ -38,6 +38,7 @@ Total Cost        : $237.50 USD
 VERSION HISTORY (تاریخچه نسخه)
 ================================================================================
 v1.0.0 - 2025-11-07 - Elena Volkov - Initial implementation
+v1.0.1 - 2025-11-29 - Takeshi Yamamoto - Completions of unknown instances
 
 ================================================================================
 DEPENDENCIES (وابستگی‌ها)
@@ -56,6 +57,9 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
+import math
+import random
+
 import pytest
 from app.core.load_balancer import (
     RoundRobinLoadBalancer,
@@ -64,7 +68,27 @@ from app.core.load_balancer import (
     LeastConnectionsLoadBalancer,
     GeographicLoadBalancer,
     LoadBalancerFactory,
+    PeakEwmaLoadBalancer,
+    AliasTable,
+    instance_weight,
 )
+from app.core.consul_client import ServiceInstance
+
+
+def make_instances(count, **meta):
+    """Fresh list of passing instances of test-service."""
+    return [
+        ServiceInstance(
+            service_id=f"test-service-{i:03d}",
+            service_name="test-service",
+            address="10.0.1.100",
+            port=8080 + i,
+            tags=[],
+            meta=dict(meta),
+            health_status="passing"
+        )
+        for i in range(count)
+    ]
 
 
 @pytest.mark.asyncio
@@ -161,6 +185,64 @@ class TestWeightedLoadBalancer:
         instance = await lb.select_instance(sample_service_instances)
         
         assert instance is not None
+    
+    
+    async def test_health_scales_weights(self, sample_service_instances):
+        """Test critical instances get no traffic and warning ones less."""
+        sample_service_instances[0].health_status = 'critical'
+        sample_service_instances[1].health_status = 'warning'
+        
+        lb = WeightedLoadBalancer()
+        selections = {}
+        for _ in range(500):
+            instance = await lb.select_instance(sample_service_instances)
+            selections[instance.service_id] = selections.get(instance.service_id, 0) + 1
+        
+        assert 'test-service-001' not in selections
+        assert selections['test-service-003'] > selections['test-service-002']
+    
+    async def test_weights_parsed_once_per_instance_set(self):
+        """Test the alias table is rebuilt only for a different instance list."""
+        lb = WeightedLoadBalancer()
+        instances = make_instances(5, weight='2')
+        
+        await lb.select_instance(instances)
+        table = lb._state(instances)
+        for _ in range(10):
+            await lb.select_instance(instances)
+        
+        assert lb._state(instances) is table
+        replaced = make_instances(5, weight='2')
+        assert lb._state(replaced) is not table
+
+
+class TestAliasTable:
+    """Test weighted selection structures."""
+    
+    def test_alias_table_matches_weights(self):
+        """Test alias table draws follow the weights."""
+        instances = make_instances(4)
+        table = AliasTable(instances, [1, 2, 3, 4])
+        
+        counts = {instance.service_id: 0 for instance in instances}
+        for _ in range(20000):
+            counts[table.pick().service_id] += 1
+        
+        for i, instance in enumerate(instances):
+            assert counts[instance.service_id] / 20000 == pytest.approx((i + 1) / 10, abs=0.02)
+    
+    def test_alias_table_all_zero_weights_is_uniform(self):
+        """Test a table without positive weights falls back to uniform."""
+        instances = make_instances(3)
+        table = AliasTable(instances, [0, 0, 0])
+        
+        assert {table.pick().service_id for _ in range(200)} == {i.service_id for i in instances}
+    
+    def test_invalid_weight_defaults_to_one(self):
+        """Test unparsable weight metadata counts as weight 1."""
+        instance = make_instances(1, weight='heavy')[0]
+        
+        assert instance_weight(instance) == 1.0
 
 
 @pytest.mark.asyncio
@@ -187,6 +269,30 @@ class TestLeastConnectionsLoadBalancer:
         instance3 = await lb.select_instance(sample_service_instances)
         assert instance3 is not None
     
+    async def test_matches_linear_scan(self):
+        """Test heap selection always picks the first least-loaded instance."""
+        lb = LeastConnectionsLoadBalancer()
+        instances = make_instances(50)
+        subset = instances[10:30]
+        rng = random.Random(7)
+        
+        for _ in range(2000):
+            pool = subset if rng.random() < 0.3 else instances
+            if rng.random() < 0.4:
+                await lb.release_connection(rng.choice(instances).service_id)
+                continue
+            expected = min(pool, key=lambda inst: lb._connections[inst.service_id])
+            assert await lb.select_instance(pool) is expected
+    
+    async def test_record_completion_releases(self, sample_service_instances):
+        """Test completion feedback releases the selected connection."""
+        lb = LeastConnectionsLoadBalancer()
+        
+        instance = await lb.select_instance(sample_service_instances)
+        await lb.record_completion(instance.service_id, latency_ms=12.0)
+        
+        assert lb._connections[instance.service_id] == 0
+    
     async def test_release_connection(self, sample_service_instances):
         """Test connection release."""
         lb = LeastConnectionsLoadBalancer()
@@ -198,6 +304,15 @@ class TestLeastConnectionsLoadBalancer:
             assert lb._connections[instance.service_id] == 0
         else:
             pytest.fail("No instance was selected to release connection.")
+    
+    async def test_release_unknown_instance_ignored(self):
+        """Test releases for instances never selected do not create counters."""
+        lb = LeastConnectionsLoadBalancer()
+        
+        for i in range(100):
+            await lb.record_completion(f"unknown-{i}")
+        
+        assert len(lb._connections) == 0
 
 
 @pytest.mark.asyncio
@@ -244,6 +359,21 @@ class TestGeographicLoadBalancer:
         # Should only select from us-east-1 region
         assert 'test-service-001' in [inst.service_id for inst in sample_service_instances if inst.meta.get('region') == 'us-east-1']
     
+    async def test_buckets_follow_instance_changes(self):
+        """Test zone buckets are rebuilt when the instance set changes."""
+        lb = GeographicLoadBalancer()
+        instances = make_instances(100, zone='us-east-1b')
+        instances[42].meta['zone'] = 'us-east-1a'
+        
+        for _ in range(10):
+            instance = await lb.select_instance(instances, client_zone='us-east-1a')
+            assert instance.service_id == 'test-service-042'
+        
+        moved = make_instances(100, zone='us-east-1b')
+        moved[7].meta['zone'] = 'us-east-1a'
+        instance = await lb.select_instance(moved, client_zone='us-east-1a')
+        assert instance.service_id == 'test-service-007'
+    
     async def test_random_fallback(self, sample_service_instances):
         """Test random fallback when no geographic match."""
         lb = GeographicLoadBalancer()
@@ -257,6 +387,97 @@ class TestGeographicLoadBalancer:
         assert instance is not None
 
 
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+class TestPeakEwmaLoadBalancer:
+    """Test latency-aware power-of-two-choices balancing."""
+    
+    async def test_slow_instance_avoided(self):
+        """Test traffic moves away from an instance reporting high latency."""
+        clock = FakeClock()
+        lb = PeakEwmaLoadBalancer(decay_time=10.0, clock=clock)
+        instances = make_instances(2)
+        await lb.select_instance(instances)  # Compares (and tracks) both
+        
+        await lb.record_completion("test-service-000", latency_ms=500.0)
+        await lb.record_completion("test-service-001", latency_ms=5.0)
+        
+        selections = [await lb.select_instance(instances) for _ in range(20)]
+        for instance in selections:
+            await lb.record_completion(instance.service_id)
+        
+        assert {instance.service_id for instance in selections} == {"test-service-001"}
+    
+    async def test_outstanding_requests_raise_cost(self):
+        """Test in-flight requests spread load between equal instances."""
+        lb = PeakEwmaLoadBalancer(clock=FakeClock())
+        instances = make_instances(2)
+        for instance in instances:
+            await lb.record_completion(instance.service_id, latency_ms=10.0)
+        
+        selections = [await lb.select_instance(instances) for _ in range(10)]
+        
+        counts = [sum(1 for i in selections if i is instance) for instance in instances]
+        assert counts == [5, 5]
+    
+    async def test_peak_is_taken_then_decays(self):
+        """Test a slow sample counts at once and fades with time."""
+        clock = FakeClock()
+        lb = PeakEwmaLoadBalancer(decay_time=10.0, clock=clock)
+        await lb.select_instance(make_instances(1))
+        
+        await lb.record_completion("test-service-000", latency_ms=10.0)
+        await lb.record_completion("test-service-000", latency_ms=400.0)
+        assert lb.cost("test-service-000") == pytest.approx(400.0)
+        
+        clock.now += 10.0
+        assert lb.cost("test-service-000") == pytest.approx(400.0 / math.e)
+    
+    async def test_failure_counts_as_penalty(self):
+        """Test failed requests are recorded as at least the failure penalty."""
+        lb = PeakEwmaLoadBalancer(failure_penalty_ms=1000.0, clock=FakeClock())
+        await lb.select_instance(make_instances(1))
+        
+        await lb.record_completion("test-service-000", latency_ms=3.0, success=False)
+        
+        assert lb.cost("test-service-000") == pytest.approx(1000.0)
+    
+    async def test_completion_releases_in_flight(self):
+        """Test selections are tracked until their completion is reported."""
+        lb = PeakEwmaLoadBalancer(clock=FakeClock())
+        instances = make_instances(1)
+        
+        await lb.select_instance(instances)
+        await lb.select_instance(instances)
+        await lb.record_completion("test-service-000", latency_ms=20.0)
+        
+        assert lb._stats["test-service-000"].outstanding == 1
+        assert lb.cost("test-service-000") == pytest.approx(40.0)
+    
+    async def test_unknown_completions_ignored(self):
+        """Test completions for instances never selected do not create stats."""
+        lb = PeakEwmaLoadBalancer(clock=FakeClock())
+        
+        for i in range(100):
+            await lb.record_completion(f"unknown-{i}", latency_ms=5.0)
+        
+        assert lb._stats == {}
+    
+    async def test_empty_instances(self):
+        """Test with no instances."""
+        lb = PeakEwmaLoadBalancer()
+        assert await lb.select_instance([]) is None
+
+
 @pytest.mark.asyncio
 class TestLoadBalancerFactory:
     """Test load balancer factory."""
@@ -286,6 +507,11 @@ class TestLoadBalancerFactory:
         lb = LoadBalancerFactory.get_load_balancer('geographic')
         assert isinstance(lb, GeographicLoadBalancer)
     
+    def test_peak_ewma_creation(self):
+        """Test peak-EWMA load balancer creation."""
+        lb = LoadBalancerFactory.get_load_balancer('peak_ewma')
+        assert isinstance(lb, PeakEwmaLoadBalancer)
+    
     def test_invalid_strategy(self):
         """Test invalid strategy raises error."""
         with pytest.raises(ValueError):
@@ -71,6 +71,7 @@ class TestLifespan:
         mock_redis.disconnect = AsyncMock()
         
         mock_consul.health_check = AsyncMock(return_value=True)
+        mock_consul.close = AsyncMock()
         
         # Act
         async with lifespan(app):
@@ -80,6 +81,7 @@ class TestLifespan:
         mock_db_manager.init.assert_called_once()
         mock_redis.connect.assert_called_once()
         mock_consul.health_check.assert_called_once()
+        mock_consul.close.assert_called_once()
         mock_redis.disconnect.assert_called_once()
         mock_db_manager.close.assert_called_once()
 
@@ -117,6 +119,7 @@ class TestLifespan:
         mock_redis.disconnect = AsyncMock()
         
         mock_consul.health_check = AsyncMock(return_value=False)  # Consul unhealthy
+        mock_consul.close = AsyncMock()
         
         # Act (should not raise, just warn)
         async with lifespan(app):
@@ -38,6 +38,7 @@ from app.schemas.service import (
     ServiceDiscoveryRequest,
     LoadBalancingStrategy,
     HealthCheckCreate,
+    HealthCheckUpdate,
 )
 from app.models.service import Service, ServiceEvent
 from app.core.consul_client import ServiceInstance, HealthCheck
@@ -55,6 +56,15 @@ def mock_db_session():
     return session
 
 
+@pytest.fixture(autouse=True)
+def mock_event_writer():
+    """Mock the batched event writer (events are not written by these tests)."""
+    with patch("app.services.registry_service.service_event_writer") as writer:
+        writer.record = AsyncMock()
+        writer.flush = AsyncMock()
+        yield writer
+
+
 @pytest.fixture
 def registry_service(mock_db_session):
     """Create ServiceRegistryService instance with mocked DB."""
@@ -136,7 +146,7 @@ def sample_service_instances():
 
 class TestRegisterService:
     """Tests for register_service method."""
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
@@ -168,11 +178,11 @@ class TestRegisterService:
         # Assert
         assert result is not None
         mock_consul.register_service.assert_called_once()
-        # Note: add() called twice - once for Service, once for ServiceEvent in _log_event
-        assert mock_db_session.add.call_count == 2
-        mock_db_session.commit.assert_called()
+        # Only the Service row; the event goes to the batched event writer
+        mock_db_session.add.assert_called_once()
+        mock_db_session.commit.assert_called_once()
         mock_redis.delete.assert_called_once()
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     async def test_register_service_consul_failure(
@@ -188,7 +198,7 @@ class TestRegisterService:
         # Act & Assert
         with pytest.raises(Exception, match="Failed to register service with Consul"):
             await registry_service.register_service(sample_service_register)
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
@@ -230,7 +240,7 @@ class TestRegisterService:
         assert result is not None
         assert result.service_id == sample_service_register.service_id
         mock_db_session.rollback.assert_called_once()
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     async def test_register_service_database_error_rollback(
@@ -254,7 +264,7 @@ class TestRegisterService:
         
         mock_db_session.rollback.assert_called_once()
         mock_consul.deregister_service.assert_called_once_with(sample_service_register.service_id)
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
@@ -295,7 +305,7 @@ class TestRegisterService:
 
 class TestDeregisterService:
     """Tests for deregister_service method."""
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
@@ -328,7 +338,7 @@ class TestDeregisterService:
         assert result is True
         mock_consul.deregister_service.assert_called_once_with("test-service-1")
         mock_redis.delete.assert_called_once()
-
+    
     @pytest.mark.asyncio
     async def test_deregister_service_not_found(
         self,
@@ -348,32 +358,202 @@ class TestDeregisterService:
         assert result is False
 
 
-class TestDiscoverService:
-    """Tests for discover_service method."""
+def make_registration(index: int, service_name: str = "test-service") -> ServiceRegister:
+    """Minimal registration for batch tests."""
+    return ServiceRegister(
+        service_id=f"{service_name}-{index}",
+        service_name=service_name,
+        address=f"10.0.0.{index}",
+        port=8080
+    )
+
 
+def make_rows(**columns):
+    """Result whose all() returns rows with the given column values."""
+    keys = list(columns)
+    rows = [MagicMock(**dict(zip(keys, values))) for values in zip(*columns.values())]
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+class TestBatchOperations:
+    """Tests for register_services, deregister_services and update_health_checks."""
+    
+    @pytest.mark.asyncio
+    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.redis_client")
+    async def test_register_services_single_transaction(
+        self,
+        mock_redis,
+        mock_consul,
+        registry_service,
+        mock_db_session,
+        mock_event_writer
+    ):
+        """Test accepted instances are upserted with one statement and one commit."""
+        # Arrange
+        mock_consul.register_service = AsyncMock(side_effect=[True, False, True])
+        mock_redis.delete = AsyncMock()
+        mock_db_session.execute.return_value = make_rows(
+            service_id=["test-service-1", "other-3"],
+            inserted=[True, False]
+        )
+        batch = [make_registration(1), make_registration(2), make_registration(3, "other")]
+        
+        # Act
+        results = await registry_service.register_services(batch)
+        
+        # Assert
+        assert [(r.id, r.success) for r in results] == [
+            ("test-service-1", True),
+            ("test-service-2", False),
+            ("other-3", True),
+        ]
+        mock_db_session.execute.assert_called_once()  # One upsert for the whole batch
+        mock_db_session.commit.assert_called_once()
+        assert [call.kwargs["event_type"] for call in mock_event_writer.record.call_args_list] == [
+            "registered",
+            "updated",
+        ]
+        mock_db_session.add.assert_not_called()
+        mock_redis.delete.assert_called_once_with("service:other", "service:test-service")
+        
+        upsert = str(mock_db_session.execute.call_args_list[0].args[0])
+        assert "ON CONFLICT" in upsert
+    
+    @pytest.mark.asyncio
+    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.redis_client")
+    async def test_register_services_duplicate_ids_keep_last(
+        self,
+        mock_redis,
+        mock_consul,
+        registry_service,
+        mock_db_session
+    ):
+        """Test a service_id repeated in one batch is registered once."""
+        # Arrange
+        mock_consul.register_service = AsyncMock(return_value=True)
+        mock_redis.delete = AsyncMock()
+        mock_db_session.execute.return_value = make_rows(service_id=["test-service-1"], inserted=[True])
+        moved = make_registration(1)
+        moved.port = 9090
+        
+        # Act
+        results = await registry_service.register_services([make_registration(1), moved])
+        
+        # Assert
+        assert len(results) == 1
+        mock_consul.register_service.assert_called_once()
+        assert mock_consul.register_service.call_args.kwargs["port"] == 9090
+    
+    @pytest.mark.asyncio
+    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.redis_client")
+    async def test_register_services_database_error_rolls_back(
+        self,
+        mock_redis,
+        mock_consul,
+        registry_service,
+        mock_db_session
+    ):
+        """Test a failed transaction deregisters the batch from Consul again."""
+        # Arrange
+        mock_consul.register_service = AsyncMock(return_value=True)
+        mock_consul.deregister_service = AsyncMock(return_value=True)
+        mock_redis.delete = AsyncMock()
+        mock_db_session.execute.side_effect = Exception("Database error")
+        
+        # Act
+        results = await registry_service.register_services([make_registration(1), make_registration(2)])
+        
+        # Assert
+        assert not any(result.success for result in results)
+        assert "Database error" in results[0].error
+        mock_db_session.rollback.assert_called_once()
+        assert mock_consul.deregister_service.call_count == 2
+        mock_redis.delete.assert_not_called()
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
+    async def test_deregister_services(
+        self,
+        mock_redis,
+        mock_consul,
+        registry_service,
+        mock_db_session
+    ):
+        """Test known instances are deactivated together and unknown ones reported."""
+        # Arrange
+        mock_consul.deregister_service = AsyncMock(return_value=True)
+        mock_redis.delete = AsyncMock()
+        mock_db_session.execute.side_effect = [
+            make_rows(service_id=["test-service-1", "test-service-2"], service_name=["test-service"] * 2),
+            MagicMock(),
+        ]
+        
+        # Act
+        results = await registry_service.deregister_services(
+            ["test-service-1", "missing", "test-service-2"]
+        )
+        
+        # Assert
+        assert [(r.id, r.success) for r in results] == [
+            ("test-service-1", True),
+            ("missing", False),
+            ("test-service-2", True),
+        ]
+        assert results[1].error == "Service not found"
+        assert mock_consul.deregister_service.call_count == 2
+        mock_db_session.commit.assert_called_once()
+        mock_redis.delete.assert_called_once_with("service:test-service")
+    
+    @pytest.mark.asyncio
+    @patch("app.services.registry_service.consul_client")
+    async def test_update_health_checks(
+        self,
+        mock_consul,
+        registry_service
+    ):
+        """Test heartbeats are sent concurrently and failures reported per check."""
+        # Arrange
+        mock_consul.update_health_check = AsyncMock(side_effect=[True, Exception("timeout")])
+        updates = [
+            HealthCheckUpdate(check_id="service:test-service-1", status="pass"),
+            HealthCheckUpdate(check_id="service:test-service-2", status="warn", output="slow"),
+        ]
+        
+        # Act
+        results = await registry_service.update_health_checks(updates)
+        
+        # Assert
+        assert results[0].success is True
+        assert results[1].success is False
+        assert results[1].error == "timeout"
+        mock_consul.update_health_check.assert_any_call("service:test-service-2", "warn", "slow")
+
+
+class TestDiscoverService:
+    """Tests for discover_service method."""
+    
+    @pytest.mark.asyncio
+    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.service_catalog")
     @patch("app.services.registry_service.LoadBalancerFactory")
-    @patch("app.services.registry_service.settings")
     async def test_discover_service_success(
         self,
-        mock_settings,
         mock_lb_factory,
-        mock_redis,
+        mock_catalog,
         mock_consul,
         registry_service,
         sample_service_instances
     ):
         """Test successful service discovery with load balancing."""
         # Arrange
-        mock_settings.CACHE_ENABLED = True
-        mock_settings.CACHE_TTL = 60
-        
-        mock_redis.get = AsyncMock(return_value=None)  # Cache miss
-        mock_redis.set = AsyncMock()
-        
-        mock_consul.discover_service = AsyncMock(return_value=sample_service_instances)
+        mock_catalog.get_instances = AsyncMock(return_value=sample_service_instances)
+        mock_consul.discover_service = AsyncMock()
         
         mock_lb = AsyncMock()
         mock_lb.select_instance = AsyncMock(return_value=sample_service_instances[0])
@@ -391,23 +571,21 @@ class TestDiscoverService:
         # Assert
         assert result is not None
         assert result.service_id == "test-service-1"
-        mock_consul.discover_service.assert_called_once()
+        mock_catalog.get_instances.assert_called_once()
         mock_lb.select_instance.assert_called_once()
-        mock_redis.set.assert_called_once()
-
+        # Served from the catalog, not a Consul round trip per call
+        mock_consul.discover_service.assert_not_called()
+    
     @pytest.mark.asyncio
-    @patch("app.services.registry_service.consul_client")
-    @patch("app.services.registry_service.settings")
+    @patch("app.services.registry_service.service_catalog")
     async def test_discover_service_no_instances(
         self,
-        mock_settings,
-        mock_consul,
+        mock_catalog,
         registry_service
     ):
         """Test service discovery when no instances found."""
         # Arrange
-        mock_settings.CACHE_ENABLED = False
-        mock_consul.discover_service = AsyncMock(return_value=[])
+        mock_catalog.get_instances = AsyncMock(return_value=[])
         
         request = ServiceDiscoveryRequest(
             service_name="non-existent-service",
@@ -419,27 +597,24 @@ class TestDiscoverService:
         
         # Assert
         assert result is None
-
+    
     @pytest.mark.asyncio
-    @patch("app.services.registry_service.consul_client")
     @patch("app.services.registry_service.redis_client")
+    @patch("app.services.registry_service.service_catalog")
     @patch("app.services.registry_service.LoadBalancerFactory")
-    @patch("app.services.registry_service.settings")
     async def test_discover_service_with_cache_hit(
         self,
-        mock_settings,
         mock_lb_factory,
+        mock_catalog,
         mock_redis,
-        mock_consul,
         registry_service,
         sample_service_instances
     ):
-        """Test service discovery with cache hit."""
+        """Test service discovery does not read or write Redis per call."""
         # Arrange
-        mock_settings.CACHE_ENABLED = True
         mock_redis.get = AsyncMock(return_value={"some": "cached_data"})
-        mock_redis.set = AsyncMock()  # Make it AsyncMock
-        mock_consul.discover_service = AsyncMock(return_value=sample_service_instances)
+        mock_redis.set = AsyncMock()
+        mock_catalog.get_instances = AsyncMock(return_value=sample_service_instances)
         
         mock_lb = AsyncMock()
         mock_lb.select_instance = AsyncMock(return_value=sample_service_instances[0])
@@ -455,25 +630,22 @@ class TestDiscoverService:
         
         # Assert
         assert result is not None
-        # Note: Current implementation still calls Consul even on cache hit
-        mock_redis.get.assert_called_once()
-
+        mock_redis.get.assert_not_called()
+        mock_redis.set.assert_not_called()
+    
     @pytest.mark.asyncio
-    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.service_catalog")
     @patch("app.services.registry_service.LoadBalancerFactory")
-    @patch("app.services.registry_service.settings")
     async def test_discover_service_with_filters(
         self,
-        mock_settings,
         mock_lb_factory,
-        mock_consul,
+        mock_catalog,
         registry_service,
         sample_service_instances
     ):
         """Test service discovery with tag, datacenter filters."""
         # Arrange
-        mock_settings.CACHE_ENABLED = False
-        mock_consul.discover_service = AsyncMock(return_value=sample_service_instances)
+        mock_catalog.get_instances = AsyncMock(return_value=sample_service_instances)
         
         mock_lb = AsyncMock()
         mock_lb.select_instance = AsyncMock(return_value=sample_service_instances[0])
@@ -493,7 +665,7 @@ class TestDiscoverService:
         
         # Assert
         assert result is not None
-        mock_consul.discover_service.assert_called_once_with(
+        mock_catalog.get_instances.assert_called_once_with(
             service_name="test-service",
             passing_only=True,
             tag="api",
@@ -508,18 +680,18 @@ class TestDiscoverService:
 
 class TestGetAllInstances:
     """Tests for get_all_instances method."""
-
+    
     @pytest.mark.asyncio
-    @patch("app.services.registry_service.consul_client")
+    @patch("app.services.registry_service.service_catalog")
     async def test_get_all_instances_success(
         self,
-        mock_consul,
+        mock_catalog,
         registry_service,
         sample_service_instances
     ):
         """Test getting all service instances."""
         # Arrange
-        mock_consul.discover_service = AsyncMock(return_value=sample_service_instances)
+        mock_catalog.get_instances = AsyncMock(return_value=sample_service_instances)
         
         request = ServiceDiscoveryRequest(
             service_name="test-service",
@@ -537,7 +709,7 @@ class TestGetAllInstances:
 
 class TestGetAllServices:
     """Tests for get_all_services method."""
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     async def test_get_all_services_success(
@@ -565,7 +737,7 @@ class TestGetAllServices:
 
 class TestUpdateHealthCheck:
     """Tests for update_health_check method."""
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     async def test_update_health_check_success(
@@ -591,7 +763,7 @@ class TestUpdateHealthCheck:
             "pass",
             "All systems operational"
         )
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.consul_client")
     async def test_update_health_check_failure(
@@ -615,7 +787,7 @@ class TestUpdateHealthCheck:
 
 class TestGetServiceEvents:
     """Tests for get_service_events method."""
-
+    
     @pytest.mark.asyncio
     async def test_get_service_events_all(
         self,
@@ -652,7 +824,7 @@ class TestGetServiceEvents:
         assert len(result) == 2
         assert result[0].event_type == "registered"
         assert result[1].event_type == "deregistered"
-
+    
     @pytest.mark.asyncio
     async def test_get_service_events_filtered(
         self,
@@ -681,7 +853,7 @@ class TestGetServiceEvents:
         # Assert
         assert len(result) == 1
         assert result[0].service_id == "test-service-1"
-
+    
     @pytest.mark.asyncio
     async def test_get_service_events_with_limit(
         self,
@@ -704,14 +876,15 @@ class TestGetServiceEvents:
 
 class TestPrivateMethods:
     """Tests for private helper methods."""
-
+    
     @pytest.mark.asyncio
     async def test_log_event(
         self,
         registry_service,
-        mock_db_session
+        mock_db_session,
+        mock_event_writer
     ):
-        """Test _log_event creates ServiceEvent."""
+        """Test _log_event queues the event instead of committing it."""
         # Act
         await registry_service._log_event(
             service_id="test-service-1",
@@ -723,9 +896,17 @@ class TestPrivateMethods:
         )
         
         # Assert
-        mock_db_session.add.assert_called_once()
-        mock_db_session.commit.assert_called_once()
-
+        mock_event_writer.record.assert_called_once_with(
+            service_id="test-service-1",
+            service_name="test-service",
+            event_type="registered",
+            old_status=None,
+            new_status="passing",
+            details={"version": "1.0.0"}
+        )
+        mock_db_session.add.assert_not_called()
+        mock_db_session.commit.assert_not_called()
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.redis_client")
     @patch("app.services.registry_service.settings")
@@ -745,7 +926,7 @@ class TestPrivateMethods:
         
         # Assert
         mock_redis.delete.assert_called_once_with("service:test-service")
-
+    
     @pytest.mark.asyncio
     @patch("app.services.registry_service.redis_client")
     @patch("app.services.registry_service.settings")
@@ -765,28 +946,22 @@ class TestPrivateMethods:
         
         # Assert
         mock_redis.delete.assert_not_called()
-
+    
     @pytest.mark.asyncio
-    @patch("app.services.registry_service.redis_client")
+    @patch("app.services.registry_service.service_catalog")
     @patch("app.services.registry_service.settings")
-    async def test_cache_service_instances(
+    async def test_invalidate_cache_refreshes_catalog(
         self,
         mock_settings,
-        mock_redis,
-        registry_service,
-        sample_service_instances
+        mock_catalog,
+        registry_service
     ):
-        """Test caching service instances."""
+        """Test local changes make the catalog re-read the service."""
         # Arrange
-        mock_settings.CACHE_TTL = 60
-        mock_redis.set = AsyncMock()
+        mock_settings.CACHE_ENABLED = False
         
         # Act
-        await registry_service._cache_service_instances("test-service", sample_service_instances)
+        await registry_service._invalidate_cache("test-service")
         
         # Assert
-        mock_redis.set.assert_called_once()
-        call_args = mock_redis.set.call_args
-        assert call_args[0][0] == "service:test-service"
-        assert len(call_args[0][1]) == 2  # 2 instances
-        assert call_args.kwargs["expire"] == 60
+        mock_catalog.invalidate.assert_called_once_with("test-service")
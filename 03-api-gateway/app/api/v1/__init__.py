@@ -0,0 +1,5 @@
+
+
+from app.api.v1 import aggregate
+
+__all__ = ["aggregate"]
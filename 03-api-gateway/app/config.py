@@ -46,7 +46,7 @@ Repository: https://github.com/Shakour-Data/03-api-gateway
 ================================================================================
 """
 
-from typing import Optional, List
+from typing import Any, Dict, List, Optional, Union
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -129,6 +129,30 @@ class Settings(BaseSettings):
         description="Refresh token expiration in days"
     )
     
+    # Gateway authentication stage
+    AUTH_ENABLED: bool = Field(default=True, description="Verify access tokens at the gateway")
+    AUTH_TOKEN_CACHE_SIZE: int = Field(default=10000, ge=1, description="Verified tokens cached")
+    AUTH_BLACKLIST_REFRESH_INTERVAL: float = Field(
+        default=5.0,
+        gt=0,
+        description="Seconds between rebuilds of the local token blacklist filter"
+    )
+    AUTH_BLACKLIST_BLOOM_CAPACITY: int = Field(
+        default=100000,
+        ge=1,
+        description="Revoked tokens the blacklist bloom filter is sized for"
+    )
+    AUTH_BLACKLIST_BLOOM_ERROR_RATE: float = Field(
+        default=0.001,
+        gt=0,
+        lt=1,
+        description="Bloom filter false positive rate (hits are confirmed in Redis)"
+    )
+    AUTH_IDENTITY_SIGNING_KEY: Optional[str] = Field(
+        default=None,
+        description="HMAC key for forwarded identity headers (defaults to SECRET_KEY)"
+    )
+    
     # ==============================================================================
     # CORS Configuration
     # ==============================================================================
@@ -157,6 +181,24 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = Field(default=True, description="Enable rate limiting")
     RATE_LIMIT_PER_MINUTE: int = Field(default=60, description="Requests per minute")
     RATE_LIMIT_PER_HOUR: int = Field(default=1000, description="Requests per hour")
+    RATE_LIMIT_LOCAL_TIER: bool = Field(
+        default=True,
+        description="Decide requests with in-process token buckets and sync usage to Redis in batches"
+    )
+    RATE_LIMIT_SYNC_INTERVAL: float = Field(
+        default=1.0,
+        gt=0,
+        description="Seconds between batched usage syncs to Redis"
+    )
+    RATE_LIMIT_LOCAL_MAX_CLIENTS: int = Field(
+        default=100_000,
+        ge=1,
+        description="Max clients tracked by the local token bucket tier"
+    )
+    RATE_LIMIT_POLICIES_FILE: Optional[str] = Field(
+        default=None,
+        description="JSON file with per-route and per-tier rate limit policies"
+    )
     
     # ==============================================================================
     # Service Discovery (Consul)
@@ -187,6 +229,14 @@ class Settings(BaseSettings):
         default="http://localhost:8007",
         description="Notification Service URL"
     )
+    FILE_SERVICE_URL: str = Field(
+        default="http://localhost:8010",
+        description="File Storage Service URL"
+    )
+    PAYMENT_SERVICE_URL: str = Field(
+        default="http://localhost:8015",
+        description="Payment Service URL"
+    )
     
     # ==============================================================================
     # Monitoring & Observability
@@ -255,19 +305,247 @@ class ApiGatewaySettings(Settings):
     # Circuit breaker
     CIRCUIT_BREAKER_ENABLED: bool = Field(default=True, description="Enable circuit breaker")
     CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = Field(default=5, description="Failure threshold")
+    CIRCUIT_BREAKER_SUCCESS_THRESHOLD: int = Field(
+        default=2,
+        description="Successes required to close a half-open circuit"
+    )
     CIRCUIT_BREAKER_TIMEOUT: int = Field(default=60, description="Circuit breaker timeout")
+    CIRCUIT_BREAKER_WINDOW_TYPE: str = Field(
+        default="count",
+        description="Rolling window type: count (last N calls) or time (last N seconds)"
+    )
+    CIRCUIT_BREAKER_WINDOW_SIZE: int = Field(
+        default=20,
+        ge=1,
+        description="Rolling window size in calls or seconds"
+    )
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = Field(
+        default=10,
+        ge=1,
+        description="Calls in the window before failure and slow call rates are evaluated"
+    )
+    CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD: float = Field(
+        default=0.3,
+        gt=0,
+        le=1,
+        description="Failure rate in the window that opens the circuit"
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION: float = Field(
+        default=5.0,
+        gt=0,
+        description="Seconds after which an upstream call counts as slow"
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD: float = Field(
+        default=0.8,
+        gt=0,
+        le=1,
+        description="Slow call rate in the window that opens the circuit"
+    )
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = Field(
+        default=1,
+        ge=1,
+        description="Concurrent probe requests admitted while a circuit is half-open"
+    )
     
     # Load balancing
-    LOAD_BALANCE_STRATEGY: str = Field(default="round_robin", description="Load balance strategy")
-
-
-settings = ApiGatewaySettings()
+    LOAD_BALANCE_STRATEGY: str = Field(
+        default="round_robin",
+        description="Instance selection: round_robin, weighted, least_outstanding or power_of_two"
+    )
+    UPSTREAM_INSTANCES: Dict[str, List[Union[str, Dict[str, Any]]]] = Field(
+        default_factory=dict,
+        description=(
+            "Additional instances per service as JSON, e.g. "
+            '{"user-service": ["http://user-2:8006", {"url": "http://user-3:8006", "weight": 2}]}'
+        )
+    )
+    UPSTREAM_EJECTION_THRESHOLD: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive proxied failures before an instance is ejected"
+    )
+    UPSTREAM_EJECTION_TIME: float = Field(
+        default=30.0,
+        description="Base ejection time in seconds (doubles on repeat ejections)"
+    )
+    UPSTREAM_MAX_EJECTION_TIME: float = Field(
+        default=300.0,
+        description="Maximum ejection time in seconds"
+    )
+    
+    # Active health checks
+    HEALTH_CHECK_INTERVAL: float = Field(default=30.0, description="Seconds between probes per instance")
+    HEALTH_CHECK_JITTER: float = Field(
+        default=0.2,
+        ge=0.0,
+        lt=1.0,
+        description="Random +/- fraction applied to each probe interval"
+    )
+    HEALTH_CHECK_CONCURRENCY: int = Field(default=10, ge=1, description="Max concurrent probes")
+    HEALTH_CHECK_TIMEOUT: float = Field(default=5.0, description="Probe timeout in seconds")
+    
+    # Upstream proxy timeouts (seconds)
+    PROXY_CONNECT_TIMEOUT: float = Field(default=5.0, description="Upstream connect timeout")
+    PROXY_READ_TIMEOUT: float = Field(default=30.0, description="Upstream read timeout")
+    PROXY_WRITE_TIMEOUT: float = Field(default=30.0, description="Upstream write timeout")
+    PROXY_POOL_TIMEOUT: float = Field(default=5.0, description="Connection pool acquire timeout")
+    
+    # Upstream connection pools (one per service)
+    PROXY_MAX_CONNECTIONS: int = Field(default=100, ge=1, description="Connections per upstream service")
+    PROXY_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=20,
+        ge=0,
+        description="Idle keep-alive connections kept per upstream service"
+    )
+    PROXY_KEEPALIVE_EXPIRY: float = Field(default=5.0, ge=0, description="Idle connection lifetime")
+    PROXY_HTTP2: bool = Field(default=False, description="Use HTTP/2 to upstreams (needs h2)")
+    PROXY_HTTP2_MAX_STREAMS: int = Field(
+        default=100,
+        ge=1,
+        description="Concurrent requests admitted per HTTP/2 connection"
+    )
+    PROXY_UPSTREAM_POOLS: str = Field(
+        default="",
+        description="JSON object with per-service pool overrides"
+    )
+    
+    # Retries and hedging (idempotent methods with replayable bodies only)
+    PROXY_MAX_RETRIES: int = Field(
+        default=2,
+        ge=0,
+        description="Default retries per proxied request (overridable per route)"
+    )
+    PROXY_RETRY_BACKOFF: float = Field(
+        default=0.025,
+        ge=0,
+        description="Base back-off in seconds before a retry (full jitter, doubled per retry)"
+    )
+    PROXY_RETRY_BACKOFF_MAX: float = Field(default=0.25, ge=0, description="Maximum retry back-off")
+    PROXY_RETRY_BUDGET_RATIO: float = Field(
+        default=0.2,
+        ge=0,
+        description="Retries allowed per service as a fraction of first attempts"
+    )
+    PROXY_RETRY_BUDGET_MIN_PER_SECOND: float = Field(
+        default=5.0,
+        ge=0,
+        description="Retries per second always allowed per service regardless of traffic"
+    )
+    PROXY_HEDGE_QUANTILE: float = Field(
+        default=0.95,
+        gt=0,
+        lt=1,
+        description="Upstream latency quantile after which a hedged attempt is sent"
+    )
+    PROXY_HEDGE_MIN_DELAY: float = Field(default=0.01, ge=0, description="Minimum hedge delay")
+    PROXY_HEDGE_MAX_DELAY: float = Field(default=1.0, gt=0, description="Maximum hedge delay")
+    
+    # Response cache (opt-in per route)
+    RESPONSE_CACHE_ENABLED: bool = Field(default=True, description="Enable the response cache")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(default=10000, ge=1, description="Maximum cached responses")
+    RESPONSE_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        ge=1,
+        description="Maximum memory used by cached responses"
+    )
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = Field(
+        default=1024 * 1024,
+        ge=1,
+        description="Responses larger than this are not cached"
+    )
+    RESPONSE_CACHE_REDIS_ENABLED: bool = Field(
+        default=False,
+        description="Share cached responses between gateway instances through Redis"
+    )
+    
+    # Request aggregation (POST /api/v1/aggregate)
+    AGGREGATION_MAX_REQUESTS: int = Field(default=10, ge=1, description="Sub-requests per aggregation")
+    AGGREGATION_TIMEOUT: float = Field(default=10.0, gt=0, description="Timeout per sub-request")
+    AGGREGATION_MAX_RESPONSE_BYTES: int = Field(
+        default=1024 * 1024,
+        ge=1,
+        description="Largest sub-request response body that can be aggregated"
+    )
+    
+    # Response compression
+    COMPRESSION_ENABLED: bool = Field(default=True, description="Compress responses")
+    COMPRESSION_ENCODINGS: str = Field(
+        default="zstd,br,gzip",
+        description="Comma-separated encodings in preference order (zstd/br need their libraries)"
+    )
+    COMPRESSION_MIN_SIZE: int = Field(
+        default=1024,
+        ge=0,
+        description="Complete bodies smaller than this are not compressed"
+    )
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6, ge=1, le=9, description="gzip level")
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=4, ge=0, le=11, description="Brotli quality")
+    COMPRESSION_ZSTD_LEVEL: int = Field(default=3, ge=1, le=22, description="zstd level")
+    
+    # Streaming proxy
+    PROXY_STREAMING_ENABLED: bool = Field(
+        default=True,
+        description="Stream large request/response bodies instead of buffering them"
+    )
+    PROXY_STREAM_THRESHOLD_BYTES: int = Field(
+        default=1024 * 1024,
+        ge=0,
+        description="Bodies larger than this (or of unknown length) are streamed"
+    )
+    PROXY_STREAMING_ROUTES: str = Field(
+        default="/api/files",
+        description="Comma-separated route prefixes that are always streamed"
+    )
+    
+    # WebSocket / Server-Sent Events proxy
+    STREAM_PROXY_ENABLED: bool = Field(default=True, description="Proxy WebSocket and SSE connections")
+    STREAM_PROXY_MAX_CONNECTIONS_PER_SERVICE: int = Field(
+        default=1000,
+        ge=1,
+        description="Open WebSocket / SSE connections allowed per upstream service"
+    )
+    STREAM_PROXY_WS_MAX_MESSAGE_BYTES: int = Field(
+        default=1024 * 1024,
+        ge=1,
+        description="Largest WebSocket message accepted from an upstream"
+    )
+    STREAM_PROXY_WS_MAX_QUEUE: int = Field(
+        default=16,
+        ge=1,
+        description="Upstream WebSocket frames buffered before reading pauses"
+    )
+    
+    # Routing
+    ROUTES_FILE: Optional[str] = Field(
+        default=None,
+        description="JSON file with gateway routes (replaces the built-in routes)"
+    )
+    ADMIN_API_KEY: Optional[str] = Field(
+        default=None,
+        description="Key required in X-Admin-Key for the /admin endpoints (unset = disabled)"
+    )
+    
+    @property
+    def proxy_streaming_routes_list(self) -> List[str]:
+        """Parse streaming route prefixes from comma-separated string."""
+        return [
+            prefix.strip() for prefix in self.PROXY_STREAMING_ROUTES.split(",")
+            if prefix.strip()
+        ]
+    
+    @property
+    def compression_encodings_list(self) -> List[str]:
+        """Parse compression encodings from comma-separated string."""
+        return [
+            encoding.strip().lower() for encoding in self.COMPRESSION_ENCODINGS.split(",")
+            if encoding.strip()
+        ]
 
 
 # ==============================================================================
 # Global Settings Instance
 # ==============================================================================
-settings = Settings()
+settings = ApiGatewaySettings()
 
 
 # ==============================================================================
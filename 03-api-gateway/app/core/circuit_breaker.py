@@ -57,14 +57,16 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
-import asyncio
 import time
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
-from typing import Callable, Any, Optional
+from typing import Callable, Any, Dict, Iterable, List, Optional, Tuple
 import logging
 
+from app.config import settings
+from app.core.metrics import track_circuit_breaker_trip, update_circuit_breaker_state
+
 logger = logging.getLogger(__name__)
 
 
@@ -80,22 +82,149 @@ class CircuitState(str, Enum):
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+# Module-level aliases keep the per-call state checks to a global lookup
+_CLOSED = CircuitState.CLOSED
+_OPEN = CircuitState.OPEN
+_HALF_OPEN = CircuitState.HALF_OPEN
+
+# Metric values for each state
+STATE_METRIC_VALUES = {
+    CircuitState.CLOSED: 0,
+    CircuitState.OPEN: 1,
+    CircuitState.HALF_OPEN: 2,
+}
+
+
 @dataclass
 class CircuitBreakerConfig:
     """Circuit breaker configuration"""
-    failure_threshold: int = 5  # Number of failures before opening
+    failure_threshold: int = 5  # Consecutive failures before opening
     success_threshold: int = 2  # Number of successes to close from half-open
     timeout: int = 60  # Seconds to wait before trying half-open
-    window_size: int = 10  # Rolling window size for failure tracking
+    window_size: int = 10  # Rolling window size (calls, or seconds for a time window)
+    window_type: str = "count"  # "count" or "time"
+    minimum_calls: int = 10  # Calls in the window before rates are evaluated
+    failure_rate_threshold: float = 0.5  # Failure rate (0-1) that opens the circuit
+    slow_call_duration: float = 5.0  # Seconds after which a call counts as slow
+    slow_call_rate_threshold: float = 1.0  # Slow call rate (0-1) that opens the circuit
+    half_open_max_calls: int = 1  # Concurrent probes admitted while half-open
+
+
+class CountSlidingWindow:
+    """
+    Outcomes of the last ``size`` calls.
+    
+    Outcomes are kept in a fixed ring and totals are updated incrementally as
+    outcomes enter and leave the window, so recording and reading are O(1).
+    A success replacing a success (the common case) touches no counters.
+    """
+    
+    # Outcome codes stored in the ring
+    SUCCESS, FAILURE, SLOW, SLOW_FAILURE = 0, 1, 2, 3
+    
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._ring: List[int] = [self.SUCCESS] * self.size
+        self._index = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+    
+    def record(self, failed: bool, slow: bool, now: float) -> None:
+        """Add the outcome of one call."""
+        code = failed | (slow << 1)
+        index = self._index
+        old = self._ring[index]
+        self._ring[index] = code
+        self._index = index + 1 if index + 1 < self.size else 0
+        
+        if self.calls < self.size:
+            self.calls += 1
+        if old == code:
+            return
+        
+        self.failures += (code & 1) - (old & 1)
+        self.slow_calls += (code >> 1) - (old >> 1)
+    
+    def totals(self, now: float) -> Tuple[int, int, int]:
+        """Return (calls, failures, slow calls) in the window."""
+        return self.calls, self.failures, self.slow_calls
+    
+    def clear(self) -> None:
+        """Forget all outcomes."""
+        self._ring = [self.SUCCESS] * self.size
+        self._index = 0
+        self.calls = self.failures = self.slow_calls = 0
+
+
+class TimeSlidingWindow:
+    """
+    Outcomes of the calls made in the last ``size`` seconds.
+    
+    Calls are aggregated into one bucket per second in a ring, so memory is
+    bounded by the window length rather than the request rate.
+    """
+    
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        # Per bucket: [epoch second, calls, failures, slow calls]
+        self._buckets: List[List[int]] = [[-1, 0, 0, 0] for _ in range(self.size)]
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+    
+    def _expire(self, second: int) -> None:
+        """Drop buckets that fell out of the window."""
+        for bucket in self._buckets:
+            if bucket[0] != -1 and bucket[0] <= second - self.size:
+                self.calls -= bucket[1]
+                self.failures -= bucket[2]
+                self.slow_calls -= bucket[3]
+                bucket[:] = [-1, 0, 0, 0]
+    
+    def record(self, failed: bool, slow: bool, now: float) -> None:
+        """Add the outcome of one call."""
+        second = int(now)
+        self._expire(second)
+        
+        bucket = self._buckets[second % self.size]
+        if bucket[0] != second:
+            bucket[:] = [second, 0, 0, 0]
+        
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+        self.calls += 1
+        self.failures += failed
+        self.slow_calls += slow
+    
+    def totals(self, now: float) -> Tuple[int, int, int]:
+        """Return (calls, failures, slow calls) in the window."""
+        self._expire(int(now))
+        return self.calls, self.failures, self.slow_calls
+    
+    def clear(self) -> None:
+        """Forget all outcomes."""
+        for bucket in self._buckets:
+            bucket[:] = [-1, 0, 0, 0]
+        self.calls = self.failures = self.slow_calls = 0
 
 
 class CircuitBreaker:
     """
     Circuit Breaker implementation with three states: CLOSED, OPEN, HALF_OPEN
     
-    CLOSED: Normal operation, requests pass through
+    CLOSED: Normal operation, requests pass through. Outcomes are recorded in
+        a rolling window; the circuit opens when the failure rate or slow call
+        rate over at least ``minimum_calls`` calls reaches its threshold, or
+        after ``failure_threshold`` consecutive failures.
     OPEN: Too many failures, requests fail fast without calling service
-    HALF_OPEN: Testing if service recovered, limited requests allowed
+    HALF_OPEN: Testing if service recovered; at most ``half_open_max_calls``
+        probes run at a time, any failed or slow probe re-opens the circuit
+    
+    All state changes happen synchronously between awaits on the event loop,
+    so no lock is needed. A call on a CLOSED circuit costs one state
+    comparison and two monotonic clock reads.
     """
     
     def __init__(
@@ -108,9 +237,17 @@ class CircuitBreaker:
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.success_count = 0
+        self.opened_at = 0.0  # time.monotonic() when the circuit last opened
         self.last_failure_time: Optional[datetime] = None
         self.last_state_change: datetime = datetime.utcnow()
-        self._lock = asyncio.Lock()
+        self._half_open_calls = 0
+        
+        if self.config.window_type == "time":
+            self.window = TimeSlidingWindow(self.config.window_size)
+        elif self.config.window_type == "count":
+            self.window = CountSlidingWindow(self.config.window_size)
+        else:
+            raise ValueError(f"Unsupported circuit breaker window type: {self.config.window_type}")
         
         logger.info(
             f"Circuit breaker '{name}' initialized",
@@ -120,120 +257,193 @@ class CircuitBreaker:
                     "failure_threshold": self.config.failure_threshold,
                     "success_threshold": self.config.success_threshold,
                     "timeout": self.config.timeout,
+                    "window_type": self.config.window_type,
+                    "window_size": self.config.window_size,
+                    "failure_rate_threshold": self.config.failure_rate_threshold,
+                    "slow_call_rate_threshold": self.config.slow_call_rate_threshold,
                 }
             }
         )
     
-    async def call(self, func: Callable, *args, **kwargs) -> Any:
+    async def call(
+        self,
+        func: Callable,
+        *args,
+        is_failure: Optional[Callable[[Any], bool]] = None,
+        **kwargs
+    ) -> Any:
         """
         Execute function with circuit breaker protection
         
         Args:
             func: Async function to execute
             *args: Positional arguments for func
+            is_failure: Classifies a returned result as a failure
+                (e.g. an HTTP 5xx response); exceptions always count as failures
             **kwargs: Keyword arguments for func
-            
+        
         Returns:
             Result from func execution
-            
+        
         Raises:
-            ServiceUnavailableError: When circuit is open
+            ServiceUnavailableError: When circuit is open or no probe slot is free
         """
-        # Check if circuit should transition to half-open
-        await self._check_timeout()
+        start_time = time.monotonic()
         
-        # Fail fast if circuit is open
-        if self.state == CircuitState.OPEN:
-            logger.warning(
-                f"Circuit breaker '{self.name}' is OPEN - failing fast",
-                extra={
-                    "circuit_breaker": self.name,
-                    "state": self.state,
-                    "failure_count": self.failure_count
-                }
-            )
-            raise ServiceUnavailableError(
-                f"Service '{self.name}' is currently unavailable"
-            )
+        probe = False
+        if self.state is not _CLOSED:
+            # Check if circuit should transition to half-open
+            self._try_half_open(start_time)
+            
+            # Fail fast if circuit is open
+            if self.state is _OPEN:
+                logger.warning(
+                    f"Circuit breaker '{self.name}' is OPEN - failing fast",
+                    extra={
+                        "circuit_breaker": self.name,
+                        "state": self.state,
+                        "failure_count": self.failure_count
+                    }
+                )
+                raise ServiceUnavailableError(
+                    f"Service '{self.name}' is currently unavailable"
+                )
+            
+            # Only a bounded number of probes may test a recovering service
+            if self._half_open_calls >= self.config.half_open_max_calls:
+                raise ServiceUnavailableError(
+                    f"Service '{self.name}' is recovering - probe limit reached"
+                )
+            self._half_open_calls += 1
+            probe = True
         
         try:
             # Execute the function
             result = await func(*args, **kwargs)
-            
-            # Record success
-            await self._on_success()
-            
-            return result
-            
-        except Exception as e:
+        except Exception:
             # Record failure
-            await self._on_failure()
+            self._on_failure(start_time, time.monotonic())
             raise
+        finally:
+            if probe:
+                self._half_open_calls -= 1
+        
+        now = time.monotonic()
+        if is_failure is not None and is_failure(result):
+            self._on_failure(start_time, now)
+        else:
+            # Record success
+            self._on_success(start_time, now)
+        
+        return result
     
-    async def _on_success(self):
+    def _on_success(self, start_time: float, now: float) -> None:
         """Handle successful execution"""
-        async with self._lock:
+        slow = now - start_time >= self.config.slow_call_duration
+        
+        if self.state is _CLOSED:
             self.success_count += 1
+            # Consecutive failure streak is broken, the window keeps history
+            self.failure_count = 0
+            self.window.record(False, slow, now)
+            # A fast success cannot raise either rate
+            if slow:
+                self._evaluate_window(now)
+        elif self.state is _HALF_OPEN:
+            if slow:
+                # Still too slow to take full traffic
+                self._open("slow probe", now)
+                return
             
-            if self.state == CircuitState.HALF_OPEN:
-                if self.success_count >= self.config.success_threshold:
-                    # Enough successes - close the circuit
-                    self._transition_to(CircuitState.CLOSED)
-                    logger.info(
-                        f"Circuit breaker '{self.name}' transitioned to CLOSED",
-                        extra={
-                            "circuit_breaker": self.name,
-                            "success_count": self.success_count
-                        }
-                    )
-            elif self.state == CircuitState.CLOSED:
-                # Reset failure count on success
-                self.failure_count = 0
-    
-    async def _on_failure(self):
-        """Handle failed execution"""
-        async with self._lock:
-            self.failure_count += 1
-            self.last_failure_time = datetime.utcnow()
-            
-            if self.state == CircuitState.HALF_OPEN:
-                # Failure in half-open state - open circuit again
-                self._transition_to(CircuitState.OPEN)
-                logger.warning(
-                    f"Circuit breaker '{self.name}' transitioned back to OPEN",
+            self.success_count += 1
+            if self.success_count >= self.config.success_threshold:
+                # Enough successes - close the circuit
+                self._transition_to(CircuitState.CLOSED)
+                logger.info(
+                    f"Circuit breaker '{self.name}' transitioned to CLOSED",
                     extra={
                         "circuit_breaker": self.name,
-                        "failure_count": self.failure_count
+                        "success_count": self.success_count
                     }
                 )
-            elif self.state == CircuitState.CLOSED:
-                if self.failure_count >= self.config.failure_threshold:
-                    # Too many failures - open circuit
-                    self._transition_to(CircuitState.OPEN)
-                    logger.error(
-                        f"Circuit breaker '{self.name}' transitioned to OPEN",
-                        extra={
-                            "circuit_breaker": self.name,
-                            "failure_count": self.failure_count,
-                            "threshold": self.config.failure_threshold
-                        }
-                    )
+    
+    def _on_failure(self, start_time: float, now: float) -> None:
+        """Handle failed execution"""
+        self.failure_count += 1
+        self.last_failure_time = datetime.utcnow()
+        
+        if self.state is _HALF_OPEN:
+            # Failure in half-open state - open circuit again
+            self.opened_at = now
+            self._transition_to(CircuitState.OPEN)
+            logger.warning(
+                f"Circuit breaker '{self.name}' transitioned back to OPEN",
+                extra={
+                    "circuit_breaker": self.name,
+                    "failure_count": self.failure_count
+                }
+            )
+        elif self.state is _CLOSED:
+            slow = now - start_time >= self.config.slow_call_duration
+            self.window.record(True, slow, now)
+            
+            if self.failure_count >= self.config.failure_threshold:
+                # Too many consecutive failures - open circuit
+                self._open("consecutive failures", now)
+            else:
+                self._evaluate_window(now)
+    
+    def _evaluate_window(self, now: float) -> None:
+        """Open the circuit if the window's failure or slow call rate is too high"""
+        calls, failures, slow_calls = self.window.totals(now)
+        if calls < max(1, self.config.minimum_calls):
+            return
+        
+        if failures / calls >= self.config.failure_rate_threshold:
+            self._open(f"failure rate {failures}/{calls}", now)
+        elif slow_calls / calls >= self.config.slow_call_rate_threshold:
+            self._open(f"slow call rate {slow_calls}/{calls}", now)
+    
+    def _open(self, reason: str, now: float) -> None:
+        """Open the circuit"""
+        self.opened_at = now
+        self.last_failure_time = datetime.utcnow()
+        self._transition_to(CircuitState.OPEN)
+        logger.error(
+            f"Circuit breaker '{self.name}' transitioned to OPEN ({reason})",
+            extra={
+                "circuit_breaker": self.name,
+                "failure_count": self.failure_count,
+                "threshold": self.config.failure_threshold,
+                "reason": reason
+            }
+        )
+    
+    def _try_half_open(self, now: float) -> None:
+        """Move an OPEN circuit to HALF_OPEN once the timeout has elapsed"""
+        if self.state is not _OPEN:
+            return
+        
+        elapsed = now - self.opened_at
+        if elapsed >= self.config.timeout:
+            self._transition_to(CircuitState.HALF_OPEN)
+            logger.info(
+                f"Circuit breaker '{self.name}' transitioned to HALF_OPEN",
+                extra={
+                    "circuit_breaker": self.name,
+                    "elapsed_seconds": elapsed
+                }
+            )
     
     async def _check_timeout(self):
         """Check if enough time has passed to try half-open state"""
-        if self.state == CircuitState.OPEN:
-            if self.last_failure_time:
-                elapsed = (datetime.utcnow() - self.last_failure_time).total_seconds()
-                if elapsed >= self.config.timeout:
-                    async with self._lock:
-                        self._transition_to(CircuitState.HALF_OPEN)
-                        logger.info(
-                            f"Circuit breaker '{self.name}' transitioned to HALF_OPEN",
-                            extra={
-                                "circuit_breaker": self.name,
-                                "elapsed_seconds": elapsed
-                            }
-                        )
+        self._try_half_open(time.monotonic())
+    
+    def is_open(self) -> bool:
+        """Check whether the circuit currently rejects all calls"""
+        if self.state is not _OPEN:
+            return False
+        return time.monotonic() - self.opened_at < self.config.timeout
     
     def _transition_to(self, new_state: CircuitState):
         """Transition to a new state"""
@@ -245,8 +455,15 @@ class CircuitBreaker:
         if new_state == CircuitState.CLOSED:
             self.failure_count = 0
             self.success_count = 0
+            self.window.clear()
         elif new_state == CircuitState.HALF_OPEN:
             self.success_count = 0
+        elif new_state == CircuitState.OPEN:
+            self.window.clear()
+            if old_state != CircuitState.OPEN:
+                track_circuit_breaker_trip(self.name)
+        
+        update_circuit_breaker_state(self.name, STATE_METRIC_VALUES[new_state])
         
         logger.info(
             f"Circuit breaker state transition",
@@ -259,31 +476,69 @@ class CircuitBreaker:
     
     def get_state(self) -> dict:
         """Get current circuit breaker state"""
+        calls, failures, slow_calls = self.window.totals(time.monotonic())
         return {
             "name": self.name,
             "state": self.state,
             "failure_count": self.failure_count,
             "success_count": self.success_count,
+            "window_calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow_calls / calls if calls else 0.0,
             "last_failure_time": self.last_failure_time.isoformat() if self.last_failure_time else None,
             "last_state_change": self.last_state_change.isoformat(),
         }
     
     async def reset(self):
         """Manually reset circuit breaker to closed state"""
-        async with self._lock:
-            self._transition_to(CircuitState.CLOSED)
-            logger.info(
-                f"Circuit breaker '{self.name}' manually reset",
-                extra={"circuit_breaker": self.name}
-            )
+        self._transition_to(CircuitState.CLOSED)
+        logger.info(
+            f"Circuit breaker '{self.name}' manually reset",
+            extra={"circuit_breaker": self.name}
+        )
+
+
+def instance_breaker_name(service_name: str, instance_url: str) -> str:
+    """
+    Name of the circuit breaker guarding one instance of a service.
+    
+    Args:
+        service_name: Service identifier
+        instance_url: Base URL of the instance
+    
+    Returns:
+        Breaker name ("service@url")
+    """
+    return f"{service_name}@{instance_url}"
 
 
 class CircuitBreakerManager:
-    """Manages multiple circuit breakers for different services"""
+    """
+    Manages multiple circuit breakers for different services and instances
+    
+    Breakers are normally created up front (see prepare()); lookups are plain
+    dictionary reads and share one cached default configuration.
+    """
     
-    def __init__(self):
+    def __init__(self, config: Optional[CircuitBreakerConfig] = None):
         self.breakers: dict[str, CircuitBreaker] = {}
-        self._lock = asyncio.Lock()
+        self.default_config = config or CircuitBreakerConfig()
+    
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        """Get an existing circuit breaker"""
+        return self.breakers.get(name)
+    
+    def get_or_create(
+        self,
+        name: str,
+        config: Optional[CircuitBreakerConfig] = None
+    ) -> CircuitBreaker:
+        """Get or create a circuit breaker without awaiting"""
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, config or self.default_config)
+            self.breakers[name] = breaker
+        return breaker
     
     async def get_breaker(
         self,
@@ -291,15 +546,40 @@ class CircuitBreakerManager:
         config: Optional[CircuitBreakerConfig] = None
     ) -> CircuitBreaker:
         """Get or create circuit breaker for a service"""
-        if service_name not in self.breakers:
-            async with self._lock:
-                if service_name not in self.breakers:
-                    self.breakers[service_name] = CircuitBreaker(
-                        service_name,
-                        config
-                    )
+        return self.get_or_create(service_name, config)
+    
+    def prepare(self, service_name: str, instance_urls: Iterable[str]) -> int:
+        """
+        Pre-create the per-instance breakers of a service.
         
-        return self.breakers[service_name]
+        Args:
+            service_name: Service identifier
+            instance_urls: Base URLs of the service instances
+            
+        Returns:
+            Number of breakers created
+        """
+        created = 0
+        for url in instance_urls:
+            name = instance_breaker_name(service_name, url)
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name, self.default_config)
+                created += 1
+        return created
+    
+    def is_open(self, name: str) -> bool:
+        """Check whether an existing breaker is currently rejecting calls"""
+        breaker = self.breakers.get(name)
+        return breaker is not None and breaker.is_open()
+    
+    def get_service_breakers(self, service_name: str) -> Dict[str, CircuitBreaker]:
+        """Get the service-level and all per-instance breakers of a service"""
+        prefix = f"{service_name}@"
+        return {
+            name: breaker
+            for name, breaker in self.breakers.items()
+            if name == service_name or name.startswith(prefix)
+        }
     
     def get_all_states(self) -> dict[str, dict]:
         """Get states of all circuit breakers"""
@@ -314,5 +594,21 @@ class CircuitBreakerManager:
             await breaker.reset()
 
 
+def config_from_settings() -> CircuitBreakerConfig:
+    """Build the gateway circuit breaker configuration from settings"""
+    return CircuitBreakerConfig(
+        failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        success_threshold=settings.CIRCUIT_BREAKER_SUCCESS_THRESHOLD,
+        timeout=settings.CIRCUIT_BREAKER_TIMEOUT,
+        window_size=settings.CIRCUIT_BREAKER_WINDOW_SIZE,
+        window_type=settings.CIRCUIT_BREAKER_WINDOW_TYPE,
+        minimum_calls=settings.CIRCUIT_BREAKER_MINIMUM_CALLS,
+        failure_rate_threshold=settings.CIRCUIT_BREAKER_FAILURE_RATE_THRESHOLD,
+        slow_call_duration=settings.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+        slow_call_rate_threshold=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE_THRESHOLD,
+        half_open_max_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS,
+    )
+
+
 # Global circuit breaker manager instance
-circuit_breaker_manager = CircuitBreakerManager()
+circuit_breaker_manager = CircuitBreakerManager(config_from_settings())
@@ -88,6 +88,54 @@ gateway_service_latency_seconds = Histogram(
     buckets=[0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0]
 )
 
+# Upstream retries
+gateway_upstream_retries_total = Counter(
+    'gateway_upstream_retries_total',
+    'Total number of retried upstream attempts',
+    ['service', 'reason']  # error, status, budget_exhausted
+)
+
+# Hedged requests
+gateway_hedged_requests_total = Counter(
+    'gateway_hedged_requests_total',
+    'Total number of hedged upstream attempts',
+    ['service', 'winner']  # primary, hedge
+)
+
+# Upstream connection pools
+gateway_upstream_pool_wait_seconds = Histogram(
+    'gateway_upstream_pool_wait_seconds',
+    'Time spent waiting for a free upstream connection pool slot',
+    ['service'],
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+gateway_upstream_pool_in_flight = Gauge(
+    'gateway_upstream_pool_in_flight',
+    'Requests currently holding an upstream connection pool slot',
+    ['service']
+)
+
+gateway_upstream_pool_exhausted_total = Counter(
+    'gateway_upstream_pool_exhausted_total',
+    'Total number of requests that timed out waiting for an upstream pool slot',
+    ['service']
+)
+
+# Aggregated (fan-out) sub-requests
+gateway_aggregation_subrequests_total = Counter(
+    'gateway_aggregation_subrequests_total',
+    'Total number of sub-requests executed by the aggregation endpoint',
+    ['service', 'outcome']  # ok, error
+)
+
+# Gateway authentication
+gateway_auth_requests_total = Counter(
+    'gateway_auth_requests_total',
+    'Total number of requests seen by the gateway auth stage',
+    ['result']  # authenticated, rejected, anonymous
+)
+
 # ================================================================================
 # Rate Limiting Metrics
 # ================================================================================
@@ -205,6 +253,19 @@ websocket_connections_active = Gauge(
     'Number of active WebSocket connections'
 )
 
+# Proxied long-lived streams per upstream service
+gateway_stream_connections_active = Gauge(
+    'gateway_stream_connections_active',
+    'Open proxied WebSocket / SSE connections',
+    ['service', 'kind']  # websocket, sse
+)
+
+gateway_stream_connections_rejected_total = Counter(
+    'gateway_stream_connections_rejected_total',
+    'Total number of streams rejected by the per-service connection cap',
+    ['service', 'kind']
+)
+
 # WebSocket messages sent
 websocket_messages_sent_total = Counter(
     'websocket_messages_sent_total',
@@ -373,3 +434,48 @@ def track_websocket_message_sent() -> None:
 def track_websocket_message_received() -> None:
     """Track WebSocket message received."""
     websocket_messages_received_total.inc()
+
+
+def track_upstream_retry(service: str, reason: str) -> None:
+    """Track a retried (or budget-denied) upstream attempt."""
+    gateway_upstream_retries_total.labels(service=service, reason=reason).inc()
+
+
+def track_hedged_request(service: str, winner: str) -> None:
+    """Track a hedged upstream attempt and which attempt won."""
+    gateway_hedged_requests_total.labels(service=service, winner=winner).inc()
+
+
+def observe_upstream_pool_wait(service: str, seconds: float) -> None:
+    """Record time spent waiting for an upstream pool slot."""
+    gateway_upstream_pool_wait_seconds.labels(service=service).observe(seconds)
+
+
+def update_upstream_pool_in_flight(service: str, count: int) -> None:
+    """Update requests in flight on an upstream pool."""
+    gateway_upstream_pool_in_flight.labels(service=service).set(count)
+
+
+def track_upstream_pool_exhausted(service: str) -> None:
+    """Track a request that timed out waiting for an upstream pool slot."""
+    gateway_upstream_pool_exhausted_total.labels(service=service).inc()
+
+
+def track_gateway_auth(result: str) -> None:
+    """Track the outcome of gateway token verification."""
+    gateway_auth_requests_total.labels(result=result).inc()
+
+
+def track_aggregation_subrequest(service: str, outcome: str) -> None:
+    """Track an aggregated sub-request."""
+    gateway_aggregation_subrequests_total.labels(service=service, outcome=outcome).inc()
+
+
+def update_stream_connections(service: str, kind: str, count: int) -> None:
+    """Update open proxied streams for a service."""
+    gateway_stream_connections_active.labels(service=service, kind=kind).set(count)
+
+
+def track_stream_connection_rejected(service: str, kind: str) -> None:
+    """Track a stream rejected by the per-service connection cap."""
+    gateway_stream_connections_rejected_total.labels(service=service, kind=kind).inc()
@@ -57,7 +57,10 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
-from typing import Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import asyncio
 import time
 import hashlib
 import logging
@@ -65,32 +68,291 @@ from fastapi import Request, HTTPException, status
 from redis.asyncio import Redis
 
 from app.config import settings
+from app.core.rate_limit_policy import RateLimitPolicyManager, rate_limit_policies
 
 logger = logging.getLogger(__name__)
 
 
+# Window lengths in seconds
+MINUTE_WINDOW = 60
+HOUR_WINDOW = 3600
+
+
+# Sliding window counter for the minute and hour windows in one round trip.
+#
+# Each window keeps only two integer counters: the current fixed window and
+# the previous one. The request count over the sliding window is estimated as
+#     previous * (1 - elapsed / window) + current
+# which needs O(1) memory per client regardless of request rate. Rejected
+# requests are not counted.
+#
+# KEYS[1], KEYS[2]: minute window (current, previous)
+# KEYS[3], KEYS[4]: hour window (current, previous)
+# ARGV[1]: current time in seconds (float)
+# ARGV[2]: minute limit
+# ARGV[3]: hour limit
+# ARGV[4]: cost of this request
+# ARGV[5]: "1" to record the cost unconditionally (batched sync of requests
+#          already admitted by the local tier), "0" to admit or reject
+#
+# Returns {allowed, blocked_window, minute_count, hour_count} where
+# blocked_window is 0 (none), 1 (minute) or 2 (hour).
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local minute_limit = tonumber(ARGV[2])
+local hour_limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local force = ARGV[5] == '1'
+
+local function estimate(current_key, previous_key, window)
+    local weight = (window - (now % window)) / window
+    local current = tonumber(redis.call('GET', current_key) or '0')
+    local previous = tonumber(redis.call('GET', previous_key) or '0')
+    return previous * weight + current
+end
+
+local minute_count = estimate(KEYS[1], KEYS[2], 60)
+local hour_count = estimate(KEYS[3], KEYS[4], 3600)
+
+local function record()
+    if cost > 0 then
+        redis.call('INCRBY', KEYS[1], cost)
+        redis.call('EXPIRE', KEYS[1], 120)
+        redis.call('INCRBY', KEYS[3], cost)
+        redis.call('EXPIRE', KEYS[3], 7200)
+        minute_count = minute_count + cost
+        hour_count = hour_count + cost
+    end
+end
+
+local blocked = 0
+if force then
+    -- Requests were already admitted locally: record them, then report
+    -- whether the client is now over its limit
+    record()
+    if minute_count > minute_limit then
+        blocked = 1
+    elseif hour_count > hour_limit then
+        blocked = 2
+    end
+else
+    if minute_count + cost > minute_limit then
+        blocked = 1
+    elseif hour_count + cost > hour_limit then
+        blocked = 2
+    else
+        record()
+    end
+end
+
+return {blocked == 0 and 1 or 0, blocked, math.ceil(minute_count), math.ceil(hour_count)}
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate.
+    
+    Uses time.monotonic() timestamps supplied by the caller.
+    """
+    
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+    
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+    
+    def consume(self, now: float, cost: float = 1.0) -> bool:
+        """
+        Take tokens from the bucket.
+        
+        Args:
+            now: Current monotonic time
+            cost: Tokens required
+            
+        Returns:
+            True if enough tokens were available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+@dataclass
+class PendingUsage:
+    """Locally admitted requests not yet recorded in Redis."""
+    identifier: str
+    endpoint: str
+    minute_limit: int
+    hour_limit: int
+    count: int = 0
+
+
+class LocalRateLimiter:
+    """
+    In-process first tier of the rate limiter.
+    
+    Keeps one token bucket per (client, endpoint), sized to the minute limit,
+    and decides most requests without touching Redis. Admitted requests are
+    accumulated and recorded in Redis in batches by RateLimiter.sync(); if
+    Redis reports that a client is over its global limit the client is blocked
+    locally until the next sync. When Redis is unreachable the buckets still
+    enforce a best-effort per-gateway limit.
+    """
+    
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], PendingUsage] = {}
+        self._blocked: Dict[Tuple[str, str], Tuple[float, PendingUsage, dict]] = {}
+    
+    def _get_bucket(
+        self,
+        key: Tuple[str, str],
+        minute_limit: int,
+        hour_limit: int,
+        now: float,
+        burst: int = 0
+    ) -> TokenBucket:
+        """
+        Get or create the bucket for a key, evicting the least recently used.
+        
+        The bucket never admits more than either window allows on its own:
+        capacity is the smaller limit (plus burst) and refill the slower of
+        the two rates.
+        """
+        capacity = min(minute_limit + burst, hour_limit)
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.capacity != capacity:
+            rate = min(minute_limit / MINUTE_WINDOW, hour_limit / HOUR_WINDOW)
+            bucket = TokenBucket(capacity, rate, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+    
+    def blocked_info(self, key: Tuple[str, str], now: float) -> Optional[dict]:
+        """Return the rejection info if Redis reported the key as over its limit."""
+        entry = self._blocked.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            return None
+        return entry[2]
+    
+    def acquire(
+        self,
+        identifier: str,
+        endpoint: str,
+        minute_limit: int,
+        hour_limit: int,
+        now: float,
+        record: bool = True,
+        burst: int = 0,
+    ) -> Tuple[bool, float]:
+        """
+        Try to admit a request locally.
+        
+        Args:
+            identifier: Client identifier
+            endpoint: API endpoint path
+            minute_limit: Requests per minute
+            hour_limit: Requests per hour
+            now: Current monotonic time
+            record: Queue the request for the next batched Redis sync
+            burst: Extra requests allowed on top of the minute limit
+            
+        Returns:
+            Tuple of (allowed, tokens remaining in the local bucket)
+        """
+        key = (identifier, endpoint)
+        bucket = self._get_bucket(key, minute_limit, hour_limit, now, burst)
+        if not bucket.consume(now):
+            return False, 0.0
+        
+        if record:
+            usage = self._pending.get(key)
+            if usage is None:
+                usage = PendingUsage(identifier, endpoint, minute_limit + burst, hour_limit)
+                self._pending[key] = usage
+            usage.count += 1
+        
+        return True, bucket.tokens
+    
+    def drain(self, now: float) -> Dict[Tuple[str, str], PendingUsage]:
+        """
+        Take all pending usage, plus zero-cost entries for blocked keys so
+        their state is refreshed on every sync.
+        """
+        pending, self._pending = self._pending, {}
+        for key, (_, usage, _) in list(self._blocked.items()):
+            if key not in pending:
+                pending[key] = PendingUsage(
+                    usage.identifier, usage.endpoint, usage.minute_limit, usage.hour_limit
+                )
+        return pending
+    
+    def block(self, key: Tuple[str, str], until: float, usage: PendingUsage, info: dict) -> None:
+        """Block a key locally until the given monotonic time."""
+        self._blocked[key] = (until, usage, info)
+    
+    def unblock(self, key: Tuple[str, str]) -> None:
+        """Remove a local block."""
+        self._blocked.pop(key, None)
+
+
 class RateLimiter:
     """
-    Distributed rate limiter using Redis sliding window.
+    Distributed rate limiter using a Redis sliding window counter.
     
     Features:
     - Per-IP rate limiting
     - Per-user rate limiting
-    - Sliding window algorithm for accuracy
-    - Configurable limits per endpoint
+    - Sliding window counter (O(1) memory per client and window)
+    - Minute and hour windows evaluated atomically in one round trip
+    - Optional in-process token bucket tier with batched Redis sync
+    - Local best-effort limiting when Redis is unreachable
+    - Per-route and per-tier policies with burst allowances
     """
     
-    def __init__(self, redis_client: Redis):
+    def __init__(
+        self,
+        redis_client: Redis,
+        local_tier: Optional[bool] = None,
+        policies: Optional[RateLimitPolicyManager] = None
+    ):
         """
         Initialize rate limiter.
         
         Args:
             redis_client: Redis client instance
+            local_tier: Override RATE_LIMIT_LOCAL_TIER
+            policies: Policy manager (defaults to the global one)
         """
         self.redis = redis_client
         self.enabled = settings.RATE_LIMIT_ENABLED
-        self.default_limit_per_minute = settings.RATE_LIMIT_REQUESTS_PER_MINUTE
-        self.default_limit_per_hour = settings.RATE_LIMIT_REQUESTS_PER_HOUR
+        self.default_limit_per_minute = settings.RATE_LIMIT_PER_MINUTE
+        self.default_limit_per_hour = settings.RATE_LIMIT_PER_HOUR
+        
+        # Loaded with EVALSHA; redis-py falls back to EVAL on NOSCRIPT
+        self._script = self.redis.register_script(SLIDING_WINDOW_SCRIPT)
+        
+        # Local token bucket tier (also the fallback while Redis is down)
+        self.local = LocalRateLimiter(settings.RATE_LIMIT_LOCAL_MAX_CLIENTS)
+        self.local_tier_enabled = (
+            settings.RATE_LIMIT_LOCAL_TIER if local_tier is None else local_tier
+        )
+        self.sync_interval = settings.RATE_LIMIT_SYNC_INTERVAL
+        self._sync_task: Optional[asyncio.Task] = None
+        
+        self.policies = policies if policies is not None else rate_limit_policies
     
     def _get_client_identifier(self, request: Request) -> str:
         """
@@ -123,6 +385,26 @@ class RateLimiter:
         
         return f"ip:{client_ip}"
     
+    def _get_client_tier(self, request: Request, identifier: str) -> str:
+        """
+        Get the policy tier of the client.
+        
+        The auth middleware may set ``request.state.rate_limit_tier`` (e.g.
+        from a subscription plan); otherwise the identifier kind is used
+        (user, api_key or ip).
+        
+        Args:
+            request: FastAPI request object
+            identifier: Client identifier from _get_client_identifier
+            
+        Returns:
+            Tier name
+        """
+        tier = getattr(request.state, "rate_limit_tier", None)
+        if tier:
+            return tier
+        return identifier.split(":", 1)[0]
+    
     def _get_rate_limit_key(
         self,
         identifier: str,
@@ -132,6 +414,9 @@ class RateLimiter:
         """
         Generate Redis key for rate limiting.
         
+        The identifier and endpoint form a hash tag so that all keys of one
+        client land in the same cluster slot and can be used by one script.
+        
         Args:
             identifier: Client identifier
             endpoint: API endpoint path
@@ -140,7 +425,32 @@ class RateLimiter:
         Returns:
             Redis key string
         """
-        return f"rate_limit:{identifier}:{endpoint}:{window}"
+        return f"rate_limit:{{{identifier}:{endpoint}}}:{window}"
+    
+    def _get_window_keys(
+        self,
+        identifier: str,
+        endpoint: str,
+        window: str,
+        window_seconds: int,
+        now: float
+    ) -> tuple[str, str]:
+        """
+        Get the current and previous fixed-window counter keys.
+        
+        Args:
+            identifier: Client identifier
+            endpoint: API endpoint path
+            window: Time window name (minute/hour)
+            window_seconds: Window length in seconds
+            now: Current time in seconds
+            
+        Returns:
+            Tuple of (current key, previous key)
+        """
+        base = self._get_rate_limit_key(identifier, endpoint, window)
+        index = int(now // window_seconds)
+        return f"{base}:{index}", f"{base}:{index - 1}"
     
     async def check_rate_limit(
         self,
@@ -151,6 +461,11 @@ class RateLimiter:
         """
         Check if request should be rate limited.
         
+        Limits come from the explicit arguments, then the matching policy,
+        then the global defaults. The endpoint part of the key is the policy
+        route template (or the path with identifier segments collapsed), so
+        ``/api/users/1`` and ``/api/users/2`` share one limit.
+        
         Args:
             request: FastAPI request
             limit_per_minute: Custom limit per minute (optional)
@@ -163,55 +478,56 @@ class RateLimiter:
             return True, {}
         
         identifier = self._get_client_identifier(request)
-        endpoint = request.url.path
-        current_time = int(time.time())
+        resolved = self.policies.resolve(
+            request.url.path,
+            request.method,
+            self._get_client_tier(request, identifier)
+        )
+        endpoint = resolved.endpoint
+        policy = resolved.policy
+        now = time.time()
+        current_time = int(now)
         
-        # Use custom limits or defaults
-        minute_limit = limit_per_minute or self.default_limit_per_minute
-        hour_limit = limit_per_hour or self.default_limit_per_hour
+        # Use custom limits, the matching policy or defaults
+        minute_limit = (
+            limit_per_minute
+            or (policy.limit_per_minute if policy else self.default_limit_per_minute)
+        )
+        hour_limit = (
+            limit_per_hour
+            or (policy.limit_per_hour if policy else self.default_limit_per_hour)
+        )
+        burst = policy.burst if policy else 0
+        
+        if self.local_tier_enabled:
+            return self._check_local(
+                identifier, endpoint, minute_limit, hour_limit, current_time, burst
+            )
         
         try:
-            # Check minute window
-            minute_key = self._get_rate_limit_key(identifier, endpoint, "minute")
-            minute_window_start = current_time - 60
-            
-            # Remove old entries and count current requests
-            pipe = self.redis.pipeline()
-            pipe.zremrangebyscore(minute_key, 0, minute_window_start)
-            pipe.zadd(minute_key, {str(current_time): current_time})
-            pipe.zcard(minute_key)
-            pipe.expire(minute_key, 60)
-            
-            results = await pipe.execute()
-            minute_count = results[2]  # Result of zcard
-            
-            # Check hour window
-            hour_key = self._get_rate_limit_key(identifier, endpoint, "hour")
-            hour_window_start = current_time - 3600
+            minute_keys = self._get_window_keys(identifier, endpoint, "minute", MINUTE_WINDOW, now)
+            hour_keys = self._get_window_keys(identifier, endpoint, "hour", HOUR_WINDOW, now)
             
-            pipe = self.redis.pipeline()
-            pipe.zremrangebyscore(hour_key, 0, hour_window_start)
-            pipe.zadd(hour_key, {str(current_time): current_time})
-            pipe.zcard(hour_key)
-            pipe.expire(hour_key, 3600)
-            
-            results = await pipe.execute()
-            hour_count = results[2]
+            # Both windows are evaluated and updated atomically in one round trip
+            allowed, blocked, minute_count, hour_count = await self._script(
+                keys=[*minute_keys, *hour_keys],
+                args=[now, minute_limit + burst, hour_limit, 1, 0],
+            )
             
             # Check limits
-            if minute_count > minute_limit:
+            if blocked == 1:
                 logger.warning(
                     f"Rate limit exceeded (minute): {identifier} "
-                    f"on {endpoint} ({minute_count}/{minute_limit})"
+                    f"on {endpoint} ({minute_count}/{minute_limit + burst})"
                 )
                 return False, {
                     "limit": minute_limit,
                     "remaining": 0,
-                    "reset": 60 - (current_time % 60),
+                    "reset": MINUTE_WINDOW - (current_time % MINUTE_WINDOW),
                     "window": "minute"
                 }
             
-            if hour_count > hour_limit:
+            if blocked == 2:
                 logger.warning(
                     f"Rate limit exceeded (hour): {identifier} "
                     f"on {endpoint} ({hour_count}/{hour_limit})"
@@ -219,24 +535,173 @@ class RateLimiter:
                 return False, {
                     "limit": hour_limit,
                     "remaining": 0,
-                    "reset": 3600 - (current_time % 3600),
+                    "reset": HOUR_WINDOW - (current_time % HOUR_WINDOW),
                     "window": "hour"
                 }
             
             # Request allowed
             return True, {
                 "limit_minute": minute_limit,
-                "remaining_minute": minute_limit - minute_count,
+                "remaining_minute": max(0, minute_limit + burst - minute_count),
                 "limit_hour": hour_limit,
-                "remaining_hour": hour_limit - hour_count,
-                "reset_minute": 60 - (current_time % 60),
-                "reset_hour": 3600 - (current_time % 3600)
+                "remaining_hour": max(0, hour_limit - hour_count),
+                "reset_minute": MINUTE_WINDOW - (current_time % MINUTE_WINDOW),
+                "reset_hour": HOUR_WINDOW - (current_time % HOUR_WINDOW)
             }
         
         except Exception as e:
             logger.error(f"Rate limiting error: {str(e)}")
-            # Fail open - allow request if Redis is down
-            return True, {}
+            # Redis is down - fall back to the local best-effort limit
+            allowed, _ = self.local.acquire(
+                identifier, endpoint, minute_limit, hour_limit, time.monotonic(),
+                record=False, burst=burst
+            )
+            if allowed:
+                return True, {}
+            return False, self._local_rejection(minute_limit, hour_limit)
+    
+    @staticmethod
+    def _local_rejection(minute_limit: int, hour_limit: int) -> dict:
+        """Rejection info for requests refused by the local token bucket."""
+        if hour_limit / HOUR_WINDOW < minute_limit / MINUTE_WINDOW or hour_limit < minute_limit:
+            limit, window, reset = hour_limit, "hour", HOUR_WINDOW / hour_limit
+        else:
+            limit, window, reset = minute_limit, "minute", MINUTE_WINDOW / minute_limit
+        return {
+            "limit": limit,
+            "remaining": 0,
+            "reset": max(1, round(reset)),
+            "window": window
+        }
+    
+    def _check_local(
+        self,
+        identifier: str,
+        endpoint: str,
+        minute_limit: int,
+        hour_limit: int,
+        current_time: int,
+        burst: int = 0
+    ) -> tuple[bool, dict]:
+        """
+        Decide a request in the local tier without a Redis round trip.
+        
+        Args:
+            identifier: Client identifier
+            endpoint: API endpoint path
+            minute_limit: Requests per minute
+            hour_limit: Requests per hour
+            current_time: Current wall clock time in seconds
+            burst: Extra requests allowed on top of the minute limit
+            
+        Returns:
+            Tuple of (allowed: bool, info: dict with rate limit details)
+        """
+        self._ensure_sync_task()
+        now = time.monotonic()
+        
+        # Redis reported this client over its global limit at the last sync
+        blocked = self.local.blocked_info((identifier, endpoint), now)
+        if blocked is not None:
+            return False, blocked
+        
+        allowed, tokens = self.local.acquire(
+            identifier, endpoint, minute_limit, hour_limit, now, burst=burst
+        )
+        if not allowed:
+            logger.warning(f"Rate limit exceeded (local): {identifier} on {endpoint}")
+            return False, self._local_rejection(minute_limit, hour_limit)
+        
+        return True, {
+            "limit_minute": minute_limit,
+            "remaining_minute": int(tokens),
+            "limit_hour": hour_limit,
+            "reset_minute": MINUTE_WINDOW - (current_time % MINUTE_WINDOW),
+            "reset_hour": HOUR_WINDOW - (current_time % HOUR_WINDOW)
+        }
+    
+    def _ensure_sync_task(self) -> None:
+        """Start the background sync loop on first use."""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop())
+    
+    async def _sync_loop(self) -> None:
+        """Periodically record locally admitted requests in Redis."""
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Rate limit sync failed: {str(e)}")
+    
+    async def sync(self) -> None:
+        """
+        Record locally admitted requests in Redis in one pipelined batch.
+        
+        Every (client, endpoint) with pending usage costs one script call in
+        a single round trip. Clients Redis reports as over their global limit
+        are blocked locally until the next sync, when they are re-checked.
+        If Redis is unreachable the pending usage is dropped and the local
+        buckets keep enforcing a best-effort limit.
+        """
+        now = time.monotonic()
+        wall_now = time.time()
+        current_time = int(wall_now)
+        pending = self.local.drain(now)
+        if not pending:
+            return
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for usage in pending.values():
+            minute_keys = self._get_window_keys(
+                usage.identifier, usage.endpoint, "minute", MINUTE_WINDOW, wall_now
+            )
+            hour_keys = self._get_window_keys(
+                usage.identifier, usage.endpoint, "hour", HOUR_WINDOW, wall_now
+            )
+            await self._script(
+                keys=[*minute_keys, *hour_keys],
+                args=[wall_now, usage.minute_limit, usage.hour_limit, usage.count, 1],
+                client=pipe,
+            )
+        
+        results = await pipe.execute()
+        
+        for (key, usage), (allowed, blocked, _, _) in zip(pending.items(), results):
+            if allowed:
+                self.local.unblock(key)
+                continue
+            
+            if blocked == 1:
+                info = {
+                    "limit": usage.minute_limit,
+                    "remaining": 0,
+                    "reset": MINUTE_WINDOW - (current_time % MINUTE_WINDOW),
+                    "window": "minute"
+                }
+            else:
+                info = {
+                    "limit": usage.hour_limit,
+                    "remaining": 0,
+                    "reset": HOUR_WINDOW - (current_time % HOUR_WINDOW),
+                    "window": "hour"
+                }
+            self.local.block(key, now + self.sync_interval, usage, info)
+    
+    async def close(self) -> None:
+        """Flush pending usage and stop the background sync loop."""
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.error(f"Final rate limit sync failed: {str(e)}")
     
     async def reset_limit(self, identifier: str, endpoint: str) -> None:
         """
@@ -246,10 +711,11 @@ class RateLimiter:
             identifier: Client identifier
             endpoint: API endpoint path
         """
-        minute_key = self._get_rate_limit_key(identifier, endpoint, "minute")
-        hour_key = self._get_rate_limit_key(identifier, endpoint, "hour")
+        now = time.time()
+        minute_keys = self._get_window_keys(identifier, endpoint, "minute", MINUTE_WINDOW, now)
+        hour_keys = self._get_window_keys(identifier, endpoint, "hour", HOUR_WINDOW, now)
         
-        await self.redis.delete(minute_key, hour_key)
+        await self.redis.delete(*minute_keys, *hour_keys)
         logger.info(f"Rate limit reset for {identifier} on {endpoint}")
 
 
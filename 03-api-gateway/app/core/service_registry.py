@@ -57,13 +57,18 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Union
 from datetime import datetime, timedelta
+import asyncio
+import random
+import time
 import httpx
 import logging
 from enum import Enum
 
 from app.config import settings
+from app.core.load_balancer import LoadBalancer, create_load_balancer
+from app.core.metrics import update_service_health
 
 logger = logging.getLogger(__name__)
 
@@ -77,18 +82,29 @@ class ServiceStatus(str, Enum):
 
 class ServiceInfo:
     """
-    Information about a registered microservice.
+    Information about a single instance of a registered microservice.
     
-    Tracks URL, health status, and last health check time.
+    Tracks URL, health status, last health check time, in-flight requests
+    and passive failure state used for ejection.
     """
     
-    def __init__(self, name: str, url: str):
+    def __init__(self, name: str, url: str, weight: int = 1):
         self.name = name
         self.url = url
+        self.weight = max(1, weight)
         self.status: ServiceStatus = ServiceStatus.UNKNOWN
         self.last_check: Optional[datetime] = None
         self.failure_count: int = 0
         self.response_time_ms: float = 0.0
+        
+        # Passive outlier detection (fed by proxied requests)
+        self.outstanding: int = 0
+        self.consecutive_failures: int = 0
+        self.ejection_count: int = 0
+        self.ejected_until: float = 0.0  # time.monotonic() deadline
+        
+        # Active health check schedule (time.monotonic(); 0 = due now)
+        self.next_check_at: float = 0.0
     
     def mark_healthy(self, response_time_ms: float) -> None:
         """Mark service as healthy."""
@@ -109,6 +125,58 @@ class ServiceInfo:
         """Check if service is currently healthy."""
         return self.status == ServiceStatus.HEALTHY
     
+    def is_ejected(self, now: Optional[float] = None) -> bool:
+        """Check if the instance is temporarily ejected from its pool."""
+        return self.ejected_until > (time.monotonic() if now is None else now)
+    
+    def is_available(self, now: Optional[float] = None) -> bool:
+        """Check if the instance may receive traffic."""
+        return self.status != ServiceStatus.UNHEALTHY and not self.is_ejected(now)
+    
+    def record_success(self, response_time_ms: float) -> None:
+        """
+        Record a successful proxied request.
+        
+        Response time is smoothed with an exponentially weighted moving
+        average so a single slow request does not dominate selection. A
+        success also counts as a passive health signal, so an instance that
+        is serving traffic again is marked healthy before its next probe.
+        """
+        self.consecutive_failures = 0
+        if self.status != ServiceStatus.HEALTHY:
+            self.status = ServiceStatus.HEALTHY
+            logger.info(f"Service {self.name} at {self.url} recovered (passive)")
+        if self.response_time_ms:
+            self.response_time_ms = 0.8 * self.response_time_ms + 0.2 * response_time_ms
+        else:
+            self.response_time_ms = response_time_ms
+    
+    def record_failure(self) -> None:
+        """
+        Record a failed proxied request.
+        
+        After UPSTREAM_EJECTION_THRESHOLD consecutive failures the instance is
+        ejected for UPSTREAM_EJECTION_TIME seconds, doubled for every repeat
+        ejection up to UPSTREAM_MAX_EJECTION_TIME, and an active health check
+        is scheduled immediately.
+        """
+        self.consecutive_failures += 1
+        if self.consecutive_failures < settings.UPSTREAM_EJECTION_THRESHOLD:
+            return
+        
+        duration = min(
+            settings.UPSTREAM_EJECTION_TIME * (2 ** self.ejection_count),
+            settings.UPSTREAM_MAX_EJECTION_TIME,
+        )
+        self.ejected_until = time.monotonic() + duration
+        self.ejection_count += 1
+        self.consecutive_failures = 0
+        self.next_check_at = 0.0
+        logger.warning(
+            f"Instance {self.url} of {self.name} ejected for {duration}s",
+            extra={"service": self.name, "instance": self.url, "ejection_seconds": duration}
+        )
+    
     def needs_health_check(self, interval_seconds: int = 30) -> bool:
         """Determine if service needs a health check."""
         if self.last_check is None:
@@ -116,6 +184,109 @@ class ServiceInfo:
         
         time_since_check = datetime.utcnow() - self.last_check
         return time_since_check > timedelta(seconds=interval_seconds)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Get status summary of this instance."""
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "status": self.status.value,
+            "failure_count": self.failure_count,
+            "response_time_ms": self.response_time_ms,
+            "outstanding": self.outstanding,
+            "ejected": self.is_ejected(),
+            "last_check": self.last_check.isoformat() if self.last_check else None,
+        }
+
+
+class ServicePool:
+    """
+    Pool of instances serving one service name.
+    
+    Exposes the same summary attributes as a single ServiceInfo (url,
+    status, ...) so callers that only need to know about "the service" keep
+    working, while the proxy selects a concrete instance per request.
+    """
+    
+    def __init__(self, name: str, load_balancer: LoadBalancer):
+        self.name = name
+        self.instances: List[ServiceInfo] = []
+        self.load_balancer = load_balancer
+    
+    def add_instance(self, url: str, weight: int = 1) -> ServiceInfo:
+        """Add an instance, or update the weight of an existing one."""
+        for instance in self.instances:
+            if instance.url == url:
+                instance.weight = max(1, weight)
+                return instance
+        
+        instance = ServiceInfo(self.name, url, weight)
+        self.instances.append(instance)
+        return instance
+    
+    def remove_instance(self, url: str) -> bool:
+        """Remove an instance by URL. Returns True if it was removed."""
+        remaining = [instance for instance in self.instances if instance.url != url]
+        removed = len(remaining) != len(self.instances)
+        self.instances = remaining
+        return removed
+    
+    def select_instance(
+        self,
+        exclude: Optional[Callable[[ServiceInfo], bool]] = None
+    ) -> Optional[ServiceInfo]:
+        """
+        Select an instance for the next request.
+        
+        Ejected and unhealthy instances, and instances matching ``exclude``
+        (e.g. those with an open circuit breaker), are skipped. If every
+        instance is excluded, selection falls back to the whole pool rather
+        than failing outright (panic mode), so a mis-detection cannot
+        black-hole a service.
+        """
+        now = time.monotonic()
+        available = [
+            instance for instance in self.instances
+            if instance.is_available(now) and not (exclude and exclude(instance))
+        ]
+        return self.load_balancer.select_instance(available or self.instances)
+    
+    @property
+    def url(self) -> Optional[str]:
+        """URL of the first registered instance."""
+        return self.instances[0].url if self.instances else None
+    
+    @property
+    def status(self) -> ServiceStatus:
+        """Healthy if any instance is healthy, unhealthy if all are."""
+        statuses = {instance.status for instance in self.instances}
+        if ServiceStatus.HEALTHY in statuses:
+            return ServiceStatus.HEALTHY
+        if statuses == {ServiceStatus.UNHEALTHY}:
+            return ServiceStatus.UNHEALTHY
+        return ServiceStatus.UNKNOWN
+    
+    @property
+    def failure_count(self) -> int:
+        """Total health check failures across instances."""
+        return sum(instance.failure_count for instance in self.instances)
+    
+    @property
+    def response_time_ms(self) -> float:
+        """Average response time across instances."""
+        if not self.instances:
+            return 0.0
+        return sum(instance.response_time_ms for instance in self.instances) / len(self.instances)
+    
+    @property
+    def last_check(self) -> Optional[datetime]:
+        """Most recent health check across instances."""
+        checks = [instance.last_check for instance in self.instances if instance.last_check]
+        return max(checks) if checks else None
+    
+    def is_healthy(self) -> bool:
+        """Check if at least one instance is healthy."""
+        return self.status == ServiceStatus.HEALTHY
 
 
 class ServiceRegistry:
@@ -125,15 +296,24 @@ class ServiceRegistry:
     Implements service discovery pattern with automatic health monitoring.
     Features:
     - Dynamic service registration
-    - Periodic health checks
+    - Multiple instances per service with pluggable load balancing
+    - Passive ejection of failing instances
+    - Concurrent, jittered background health checks
     - Automatic failover
-    - Load balancing readiness
     """
     
-    def __init__(self):
+    def __init__(self, strategy: Optional[str] = None):
         """Initialize service registry with configured services."""
-        self.services: Dict[str, ServiceInfo] = {}
+        self.services: Dict[str, ServicePool] = {}
+        self.strategy = strategy or settings.LOAD_BALANCE_STRATEGY
         self._http_client: Optional[httpx.AsyncClient] = None
+        
+        # Background health checking
+        self._probe_semaphore = asyncio.Semaphore(settings.HEALTH_CHECK_CONCURRENCY)
+        self._probes_in_flight: Set[ServiceInfo] = set()
+        self._probe_tasks: Set[asyncio.Task] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        
         self._initialize_services()
         logger.info("Service registry initialized")
     
@@ -150,21 +330,55 @@ class ServiceRegistry:
         for name, url in service_configs.items():
             self.register_service(name, url)
         
+        # Additional instances, e.g. {"user-service": ["http://user-2:8006"]}
+        for name, instances in settings.UPSTREAM_INSTANCES.items():
+            for instance in instances:
+                self.register_service(name, **_parse_instance(instance))
+        
         logger.info(f"Registered {len(self.services)} backend services")
     
-    def register_service(self, name: str, url: str) -> None:
+    def register_service(self, name: str, url: str, weight: int = 1) -> None:
         """
-        Register a new microservice.
+        Register a microservice instance.
+        
+        Registering another URL under an existing name adds an instance to
+        that service's pool.
         
         Args:
             name: Service identifier
-            url: Base URL of the service
+            url: Base URL of the instance
+            weight: Relative weight for weighted load balancing
         """
-        service = ServiceInfo(name, url)
-        self.services[name] = service
+        pool = self.services.get(name)
+        if pool is None:
+            pool = ServicePool(name, create_load_balancer(self.strategy))
+            self.services[name] = pool
+        
+        pool.add_instance(url, weight)
         logger.info(f"Registered service: {name} at {url}")
     
-    def get_service(self, name: str) -> Optional[ServiceInfo]:
+    def deregister_instance(self, name: str, url: str) -> bool:
+        """
+        Remove an instance from a service pool.
+        
+        Args:
+            name: Service identifier
+            url: Base URL of the instance
+            
+        Returns:
+            True if the instance was removed
+        """
+        pool = self.services.get(name)
+        if not pool or not pool.remove_instance(url):
+            return False
+        
+        if not pool.instances:
+            del self.services[name]
+        
+        logger.info(f"Deregistered instance {url} of {name}")
+        return True
+    
+    def get_service(self, name: str) -> Optional[ServicePool]:
         """
         Get service information by name.
         
@@ -172,10 +386,28 @@ class ServiceRegistry:
             name: Service identifier
             
         Returns:
-            ServiceInfo if found, None otherwise
+            ServicePool if found, None otherwise
         """
         return self.services.get(name)
     
+    def select_instance(
+        self,
+        name: str,
+        exclude: Optional[Callable[[ServiceInfo], bool]] = None
+    ) -> Optional[ServiceInfo]:
+        """
+        Select an instance of a service using the configured strategy.
+        
+        Args:
+            name: Service identifier
+            exclude: Predicate for instances to skip if others are available
+            
+        Returns:
+            Selected ServiceInfo, or None if the service is unknown or empty
+        """
+        pool = self.services.get(name)
+        return pool.select_instance(exclude) if pool else None
+    
     def get_service_url(self, name: str) -> Optional[str]:
         """
         Get service URL by name.
@@ -184,71 +416,176 @@ class ServiceRegistry:
             name: Service identifier
             
         Returns:
-            Service URL if found and healthy, None otherwise
+            URL of a selected healthy instance, None otherwise
         """
-        service = self.get_service(name)
-        if service and service.is_healthy():
-            return service.url
+        instance = self.select_instance(name)
+        if instance and instance.is_healthy():
+            return instance.url
         return None
     
-    async def check_health(self, service_name: str) -> bool:
+    @staticmethod
+    def _next_interval() -> float:
+        """Health check interval with random jitter to avoid synchronised probes."""
+        jitter = settings.HEALTH_CHECK_JITTER
+        return settings.HEALTH_CHECK_INTERVAL * random.uniform(1 - jitter, 1 + jitter)
+    
+    async def _check_instance(self, instance: ServiceInfo) -> bool:
         """
-        Perform health check on a specific service.
+        Perform health check on a single instance.
+        
+        Probes are bounded by HEALTH_CHECK_CONCURRENCY across the registry.
         
         Args:
-            service_name: Name of service to check
+            instance: Instance to check
             
         Returns:
             True if healthy, False otherwise
         """
-        service = self.get_service(service_name)
-        if not service:
-            logger.error(f"Service not found: {service_name}")
-            return False
-        
-        try:
-            if not self._http_client:
-                self._http_client = httpx.AsyncClient(
-                    timeout=httpx.Timeout(5.0, connect=2.0)
+        async with self._probe_semaphore:
+            try:
+                if not self._http_client:
+                    # Dedicated client sized to the probe concurrency, separate
+                    # from the proxy pools so probes never queue behind traffic
+                    self._http_client = httpx.AsyncClient(
+                        timeout=httpx.Timeout(settings.HEALTH_CHECK_TIMEOUT, connect=2.0),
+                        limits=httpx.Limits(
+                            max_connections=settings.HEALTH_CHECK_CONCURRENCY,
+                            max_keepalive_connections=settings.HEALTH_CHECK_CONCURRENCY,
+                        ),
+                    )
+                
+                start_time = time.monotonic()
+                
+                response = await self._http_client.get(
+                    f"{instance.url}/health",
+                    follow_redirects=True
                 )
+                
+                response_time_ms = (time.monotonic() - start_time) * 1000
+                
+                if response.status_code == 200:
+                    instance.mark_healthy(response_time_ms)
+                    healthy = True
+                else:
+                    instance.mark_unhealthy()
+                    healthy = False
             
-            start_time = datetime.utcnow()
-            
-            response = await self._http_client.get(
-                f"{service.url}/health",
-                follow_redirects=True
-            )
-            
-            end_time = datetime.utcnow()
-            response_time_ms = (end_time - start_time).total_seconds() * 1000
+            except Exception as e:
+                logger.error(f"Health check failed for {instance.name} at {instance.url}: {str(e)}")
+                instance.mark_unhealthy()
+                healthy = False
+        
+        instance.next_check_at = time.monotonic() + self._next_interval()
+        pool = self.services.get(instance.name)
+        update_service_health(instance.name, pool.is_healthy() if pool else healthy)
+        return healthy
+    
+    async def check_health(self, service_name: str) -> bool:
+        """
+        Perform health check on all instances of a service.
+        
+        Args:
+            service_name: Name of service to check
             
-            if response.status_code == 200:
-                service.mark_healthy(response_time_ms)
-                return True
-            else:
-                service.mark_unhealthy()
-                return False
-        
-        except Exception as e:
-            logger.error(f"Health check failed for {service_name}: {str(e)}")
-            service.mark_unhealthy()
+        Returns:
+            True if at least one instance is healthy, False otherwise
+        """
+        pool = self.get_service(service_name)
+        if not pool:
+            logger.error(f"Service not found: {service_name}")
             return False
+        
+        results = await asyncio.gather(
+            *(self._check_instance(instance) for instance in pool.instances)
+        )
+        return any(results)
     
     async def check_all_services(self) -> Dict[str, bool]:
         """
         Perform health check on all registered services.
         
+        Services are probed concurrently (bounded by HEALTH_CHECK_CONCURRENCY),
+        so one slow backend costs at most one probe timeout.
+        
         Returns:
             Dictionary mapping service names to health status
         """
-        results = {}
-        
-        for name in self.services.keys():
-            results[name] = await self.check_health(name)
+        names = list(self.services.keys())
+        healthy = await asyncio.gather(*(self.check_health(name) for name in names))
+        results = dict(zip(names, healthy))
         
         logger.info(f"Health check completed for {len(results)} services")
         return results
     
+    def get_health_snapshot(self) -> Dict[str, bool]:
+        """
+        Get the last known health of all services without probing them.
+        
+        Returns:
+            Dictionary mapping service names to health status
+        """
+        return {name: pool.is_healthy() for name, pool in self.services.items()}
+    
+    def _launch_due_probes(self, now: float) -> None:
+        """Start a probe task for every instance whose check is due."""
+        for pool in list(self.services.values()):
+            for instance in pool.instances:
+                if instance.next_check_at > now or instance in self._probes_in_flight:
+                    continue
+                
+                self._probes_in_flight.add(instance)
+                task = asyncio.create_task(self._check_instance(instance))
+                self._probe_tasks.add(task)
+                task.add_done_callback(self._probe_tasks.discard)
+                task.add_done_callback(lambda _, i=instance: self._probes_in_flight.discard(i))
+    
+    async def _health_check_loop(self) -> None:
+        """
+        Background scheduler driving active health checks.
+        
+        Each instance carries its own jittered deadline; the loop wakes up
+        for the earliest deadline (at most once per second), fires the due
+        probes without awaiting them and goes back to sleep, so a slow probe
+        never delays the others or the request path.
+        """
+        while True:
+            try:
+                now = time.monotonic()
+                self._launch_due_probes(now)
+                
+                deadlines = [
+                    instance.next_check_at
+                    for pool in self.services.values()
+                    for instance in pool.instances
+                    if instance not in self._probes_in_flight
+                ]
+                delay = min(deadlines, default=now + 1.0) - now
+                await asyncio.sleep(min(max(delay, 0.05), 1.0))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health check scheduler error: {str(e)}")
+                await asyncio.sleep(1.0)
+    
+    def start_health_checks(self) -> None:
+        """Start the background health check scheduler."""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_check_loop())
+            logger.info(
+                f"Health check scheduler started (interval {settings.HEALTH_CHECK_INTERVAL}s, "
+                f"concurrency {settings.HEALTH_CHECK_CONCURRENCY})"
+            )
+    
+    async def stop_health_checks(self) -> None:
+        """Stop the background health check scheduler and pending probes."""
+        tasks = [t for t in (self._health_task, *self._probe_tasks) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._health_task = None
+        self._probe_tasks.clear()
+        self._probes_in_flight.clear()
+    
     def get_healthy_services(self) -> list[str]:
         """
         Get list of all healthy services.
@@ -276,17 +613,33 @@ class ServiceRegistry:
                 "status": service.status.value,
                 "failure_count": service.failure_count,
                 "response_time_ms": service.response_time_ms,
-                "last_check": service.last_check.isoformat() if service.last_check else None
+                "last_check": service.last_check.isoformat() if service.last_check else None,
+                "strategy": self.strategy,
+                "instances": [instance.get_status() for instance in service.instances],
             }
         
         return summary
     
     async def close(self) -> None:
         """Cleanup resources."""
+        await self.stop_health_checks()
+        
         if self._http_client:
             await self._http_client.aclose()
             logger.info("Service registry HTTP client closed")
 
 
+def _parse_instance(instance: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Parse an UPSTREAM_INSTANCES entry.
+    
+    Entries are either a URL string or an object with ``url`` and optional
+    ``weight`` keys.
+    """
+    if isinstance(instance, str):
+        return {"url": instance}
+    return {"url": instance["url"], "weight": int(instance.get("weight", 1))}
+
+
 # Global service registry instance
 service_registry = ServiceRegistry()
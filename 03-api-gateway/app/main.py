@@ -59,9 +59,10 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
+import hmac
 import logging
 
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Header, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from prometheus_fastapi_instrumentator import Instrumentator
@@ -70,7 +71,17 @@ from redis.asyncio import Redis
 from app.config import settings
 from app.core.service_registry import service_registry
 from app.core.circuit_breaker import circuit_breaker_manager
-from app.middleware.routing import RoutingMiddleware
+from app.core.route_table import route_from_dict, route_table
+from app.core.rate_limit_policy import rate_limit_policies
+from app.core.response_cache import response_cache
+from app.core.upstream_pool import upstream_clients
+from app.core.auth import token_blacklist
+from app.schemas.route import RouteTableResponse, RouteTableUpdate
+from app.api.v1 import aggregate
+from app.middleware.routing import RoutingMiddleware, prepare_circuit_breakers
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.auth import AuthMiddleware
+from app.middleware.stream_proxy import StreamProxyMiddleware, close_stream_proxies
 from gravity_common.logging_config import setup_logging
 from gravity_common.exceptions import GravityException
 
@@ -109,12 +120,40 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     await redis_client.ping()
     logger.info("Redis connection established")
     
-    # Perform initial health check on all services
+    # Share cached responses between gateway instances
+    if settings.RESPONSE_CACHE_REDIS_ENABLED:
+        response_cache.redis = redis_client
+    
+    # Track revoked tokens for the gateway auth stage
+    if settings.AUTH_ENABLED:
+        token_blacklist.redis = redis_client
+        token_blacklist.start()
+    
+    # Load routes from file (built-in routes are used otherwise)
+    if settings.ROUTES_FILE:
+        table = route_table.load_file(settings.ROUTES_FILE)
+        logger.info(f"Loaded {len(table)} routes from {settings.ROUTES_FILE}")
+    
+    # Load rate limit policies (global defaults are used otherwise)
+    if settings.RATE_LIMIT_POLICIES_FILE:
+        index = rate_limit_policies.load_file(settings.RATE_LIMIT_POLICIES_FILE)
+        logger.info(
+            f"Loaded {len(index)} rate limit policies from {settings.RATE_LIMIT_POLICIES_FILE}"
+        )
+    
+    # Create the per-instance circuit breakers before taking traffic
+    created = prepare_circuit_breakers()
+    logger.info(f"Prepared {created} circuit breakers")
+    
+    # Perform initial health check on all services (concurrently)
     logger.info("Performing initial service health checks...")
     health_results = await service_registry.check_all_services()
     healthy_count = sum(1 for is_healthy in health_results.values() if is_healthy)
     logger.info(f"Service health check: {healthy_count}/{len(health_results)} services healthy")
     
+    # Keep health data fresh in the background
+    service_registry.start_health_checks()
+    
     logger.info(f"{settings.APP_NAME} started successfully on port {settings.PORT}")
     
     yield
@@ -122,6 +161,8 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     # Cleanup
     logger.info(f"Shutting down {settings.APP_NAME}...")
     
+    await token_blacklist.stop()
+    
     if redis_client:
         await redis_client.close()
         logger.info("Redis connection closed")
@@ -129,6 +170,12 @@ async def lifespan(app: FastAPI) -> AsyncGenerator:
     await service_registry.close()
     logger.info("Service registry closed")
     
+    await upstream_clients.aclose()
+    logger.info("Upstream client pools closed")
+    
+    await close_stream_proxies()
+    logger.info("Stream proxy clients closed")
+    
     logger.info(f"{settings.APP_NAME} shut down successfully")
 
 
@@ -162,9 +209,25 @@ app.add_middleware(
 
 # Add Routing middleware (must be added AFTER CORS)
 routing_middleware = RoutingMiddleware(app)
+app.state.routing_middleware = routing_middleware
 app.add_middleware(RoutingMiddleware)
 
 
+# Add WebSocket / SSE proxy (raw ASGI, in front of the buffered routing path)
+if settings.STREAM_PROXY_ENABLED:
+    app.add_middleware(StreamProxyMiddleware)
+
+
+# Add Authentication middleware (runs before routing so identity is forwarded)
+if settings.AUTH_ENABLED:
+    app.add_middleware(AuthMiddleware)
+
+
+# Add Compression middleware (outermost, so proxied and local responses are covered)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+
 # Add Prometheus instrumentation
 if settings.PROMETHEUS_ENABLED:
     instrumentator = Instrumentator(
@@ -181,6 +244,10 @@ if settings.PROMETHEUS_ENABLED:
     logger.info("Prometheus metrics enabled at /metrics")
 
 
+# API routers
+app.include_router(aggregate.router, prefix=settings.API_V1_PREFIX, tags=["Aggregation"])
+
+
 # Exception handlers
 @app.exception_handler(GravityException)
 async def gravity_exception_handler(request: Request, exc: GravityException):
@@ -219,7 +286,7 @@ async def health_check():
     Checks:
     - API Gateway itself
     - Redis connection
-    - All backend services
+    - All backend services (last state from the background health checks)
     
     Returns:
         Health status with detailed service information
@@ -233,8 +300,8 @@ async def health_check():
     except Exception as e:
         logger.error(f"Redis health check failed: {str(e)}")
     
-    # Check all backend services
-    service_health = await service_registry.check_all_services()
+    # Backend services are probed in the background - report the latest state
+    service_health = service_registry.get_health_snapshot()
     
     # Determine overall status
     all_services_healthy = all(service_health.values())
@@ -288,6 +355,18 @@ async def list_services():
     }
 
 
+# Upstream connection pool endpoint
+@app.get("/upstream-pools", tags=["Monitoring"])
+async def list_upstream_pools():
+    """
+    List per-service upstream connection pools with their usage.
+    
+    Returns:
+        Dictionary of service names and pool statistics
+    """
+    return {"pools": upstream_clients.get_stats()}
+
+
 # Circuit breaker status endpoint
 @app.get("/circuit-breakers", tags=["Monitoring"])
 async def list_circuit_breakers():
@@ -306,24 +385,180 @@ async def list_circuit_breakers():
 @app.post("/circuit-breakers/{service_name}/reset", tags=["Admin"])
 async def reset_circuit_breaker(service_name: str):
     """
-    Manually reset a circuit breaker for a service.
+    Manually reset the circuit breakers of a service (all instances).
     
     Args:
         service_name: Name of the service
-        
+    
     Returns:
         Success message
     """
-    breaker = await circuit_breaker_manager.get_breaker(service_name)
-    await breaker.reset()
+    breakers = circuit_breaker_manager.get_service_breakers(service_name)
+    if not breakers:
+        breakers = {service_name: circuit_breaker_manager.get_or_create(service_name)}
+    
+    for breaker in breakers.values():
+        await breaker.reset()
     
     return {
         "success": True,
         "message": f"Circuit breaker for {service_name} reset successfully",
-        "state": breaker.get_state(),
+        "states": {name: breaker.get_state() for name, breaker in breakers.items()},
+    }
+
+
+def verify_admin_key(x_admin_key: str | None) -> None:
+    """
+    Verify the admin key for route administration endpoints.
+    
+    Args:
+        x_admin_key: Value of the X-Admin-Key header
+    
+    Raises:
+        HTTPException: If ADMIN_API_KEY is not configured (the admin API is
+            disabled) or the key does not match
+    """
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled (ADMIN_API_KEY is not configured)",
+        )
+    
+    if x_admin_key is None or not hmac.compare_digest(
+        x_admin_key.encode(), settings.ADMIN_API_KEY.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key",
+        )
+
+
+# Route table endpoints
+@app.get("/admin/routes", response_model=RouteTableResponse, tags=["Admin"])
+async def list_routes(x_admin_key: str | None = Header(default=None)):
+    """
+    List the active gateway routes.
+    
+    Returns:
+        Route table version and routes
+    """
+    verify_admin_key(x_admin_key)
+    
+    return {
+        "version": route_table.version,
+        "routes": route_table.to_list(),
+    }
+
+
+@app.put("/admin/routes", response_model=RouteTableResponse, tags=["Admin"])
+async def replace_routes(
+    update: RouteTableUpdate,
+    x_admin_key: str | None = Header(default=None),
+):
+    """
+    Atomically replace the gateway route table.
+    
+    The new table is compiled completely before it is activated, so in-flight
+    requests keep using the previous table.
+    
+    Args:
+        update: Complete set of routes
+    
+    Returns:
+        New route table version and routes
+    """
+    verify_admin_key(x_admin_key)
+    
+    route_table.load(route_from_dict(route.model_dump()) for route in update.routes)
+    prepare_circuit_breakers()
+    
+    return {
+        "version": route_table.version,
+        "routes": route_table.to_list(),
     }
 
 
+@app.post("/admin/routes/reload", response_model=RouteTableResponse, tags=["Admin"])
+async def reload_routes(x_admin_key: str | None = Header(default=None)):
+    """
+    Reload the gateway route table from ROUTES_FILE.
+    
+    A file that cannot be read or parsed is reported as a 400 and leaves
+    the active table unchanged.
+    
+    Returns:
+        New route table version and routes
+    """
+    verify_admin_key(x_admin_key)
+    
+    if not settings.ROUTES_FILE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ROUTES_FILE is not configured",
+        )
+    
+    try:
+        route_table.load_file(settings.ROUTES_FILE)
+    except (OSError, ValueError, TypeError) as e:
+        # The previous table stays active
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid ROUTES_FILE: {e}",
+        )
+    prepare_circuit_breakers()
+    
+    return {
+        "version": route_table.version,
+        "routes": route_table.to_list(),
+    }
+
+
+@app.get("/admin/rate-limits", tags=["Admin"])
+async def list_rate_limit_policies(x_admin_key: str | None = Header(default=None)):
+    """
+    List the active rate limit policies.
+    
+    Returns:
+        Global defaults and per-route/per-tier policies
+    """
+    verify_admin_key(x_admin_key)
+    
+    return {
+        "defaults": {
+            "limit_per_minute": settings.RATE_LIMIT_PER_MINUTE,
+            "limit_per_hour": settings.RATE_LIMIT_PER_HOUR,
+        },
+        "policies": rate_limit_policies.to_list(),
+    }
+
+
+@app.get("/admin/cache", tags=["Admin"])
+async def get_response_cache_stats(x_admin_key: str | None = Header(default=None)):
+    """
+    Get response cache statistics.
+    
+    Returns:
+        Entry count, memory usage and limits
+    """
+    verify_admin_key(x_admin_key)
+    
+    return response_cache.get_stats()
+
+
+@app.delete("/admin/cache", tags=["Admin"])
+async def purge_response_cache(x_admin_key: str | None = Header(default=None)):
+    """
+    Drop all cached responses.
+    
+    Returns:
+        Number of purged in-memory entries
+    """
+    verify_admin_key(x_admin_key)
+    
+    purged = await response_cache.purge()
+    return {"purged": purged}
+
+
 if __name__ == "__main__":
     import uvicorn
     
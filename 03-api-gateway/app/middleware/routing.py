@@ -60,47 +60,91 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 import asyncio
 import logging
 import time
-from typing import Optional
+from functools import partial
+from typing import AsyncGenerator, AsyncIterator, Optional, Set, Union
 from urllib.parse import urljoin
 
 import httpx
-from fastapi import Request, Response, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import StreamingResponse
+from fastapi import Request, Response
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.config import settings
 from app.core.service_registry import service_registry
+from app.core.route_table import Route, route_table
+from app.core.metrics import track_hedged_request, track_upstream_retry
+from app.core.response_cache import response_cache
+from app.core.upstream_pool import UpstreamPool, upstream_clients
+from app.core.retry import (
+    IDEMPOTENT_METHODS,
+    RETRYABLE_STATUS_CODES,
+    RetryBudget,
+    retry_manager,
+)
 from app.core.circuit_breaker import (
     circuit_breaker_manager,
-    CircuitBreakerConfig,
     ServiceUnavailableError,
+    instance_breaker_name,
 )
 
 logger = logging.getLogger(__name__)
 
 
-class RoutingMiddleware(BaseHTTPMiddleware):
+# Hop-by-hop headers must not be forwarded by proxies (RFC 7230 section 6.1)
+HOP_BY_HOP_HEADERS = frozenset({
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+})
+
+
+def prepare_circuit_breakers() -> int:
+    """
+    Pre-create the circuit breakers of every instance behind a route
+    
+    Called whenever the route table is (re)built so the proxy path only does
+    a dictionary lookup. Instances registered later get their breaker lazily.
+    
+    Returns:
+        Number of breakers created
     """
-    Middleware to route and proxy requests to backend services
+    created = 0
+    for service_name in {route.service for route in route_table.table.routes}:
+        pool = service_registry.get_service(service_name)
+        if pool:
+            created += circuit_breaker_manager.prepare(
+                service_name,
+                (instance.url for instance in pool.instances)
+            )
+    return created
+
+
+class RoutingMiddleware:
+    """
+    Pure ASGI middleware routing and proxying requests to backend services
+    
+    Proxied requests never go through ``call_next``: matched requests are
+    answered directly from the ASGI callables, and request/response bodies
+    are passed between the client and upstream as they arrive.
     
-    Routes are matched by path prefix:
+    Routes are resolved through the compiled route table (longest prefix,
+    method- and host-aware). Built-in routes:
     - /api/auth/* -> auth-service
     - /api/users/* -> user-service
     - /api/notifications/* -> notification-service
     - /api/files/* -> file-storage-service
     - /api/payments/* -> payment-service
     - /api/analytics/* -> analytics-service
-    """
     
-    # Route mapping: path prefix -> service name
-    ROUTE_MAP = {
-        "/api/auth": "auth-service",
-        "/api/users": "user-service",
-        "/api/notifications": "notification-service",
-        "/api/files": "file-storage-service",
-        "/api/payments": "payment-service",
-        "/api/analytics": "analytics-service",
-    }
+    Bodies larger than PROXY_STREAM_THRESHOLD_BYTES (or of unknown length),
+    and all traffic on PROXY_STREAMING_ROUTES, are piped through without
+    being buffered in gateway memory.
+    """
     
     # Paths that should not be proxied
     EXCLUDED_PATHS = {
@@ -113,53 +157,76 @@ class RoutingMiddleware(BaseHTTPMiddleware):
         "/openapi.json",
     }
     
-    def __init__(self, app):
-        super().__init__(app)
-        
-        # HTTP client for proxying requests
-        self.client = httpx.AsyncClient(
-            timeout=httpx.Timeout(
-                connect=settings.PROXY_CONNECT_TIMEOUT,
-                read=settings.PROXY_READ_TIMEOUT,
-                write=settings.PROXY_WRITE_TIMEOUT,
-                pool=settings.PROXY_POOL_TIMEOUT,
-            ),
-            limits=httpx.Limits(
-                max_keepalive_connections=100,
-                max_connections=200,
-            ),
-            follow_redirects=False,
-        )
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        
+        # Per-service upstream HTTP client pools
+        self.upstreams = upstream_clients
+        
+        # Streaming proxy configuration
+        self.streaming_enabled = settings.PROXY_STREAMING_ENABLED
+        self.stream_threshold = settings.PROXY_STREAM_THRESHOLD_BYTES
+        self.streaming_prefixes = tuple(settings.proxy_streaming_routes_list)
         
         logger.info("Routing middleware initialized")
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        Main middleware dispatch method
+        ASGI entry point
+        
+        Proxied requests are answered directly; everything else (local
+        endpoints, non-HTTP scopes, unmatched paths) is passed to the wrapped
+        application untouched.
         
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware in chain
-            
-        Returns:
-            HTTP response from backend service or next middleware
+            scope: ASGI connection scope
+            receive: ASGI receive callable
+            send: ASGI send callable
         """
-        # Check if path should be excluded from proxying
-        if request.url.path in self.EXCLUDED_PATHS:
-            return await call_next(request)
+        if scope["type"] != "http" or scope["path"] in self.EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
         
-        # Find matching service for this path
-        service_name = self._match_service(request.url.path)
+        # Find matching route for this request
+        host = None
+        for name, value in scope["headers"]:
+            if name == b"host":
+                host = value.decode("latin-1")
+                break
+        route = route_table.match(scope["path"], scope["method"], host)
         
-        if not service_name:
-            # No matching service - pass to next middleware
-            return await call_next(request)
+        if not route:
+            # No matching service - pass to the application
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope, receive)
+        response = await self._handle(request, route)
+        try:
+            await response(scope, receive, send)
+        finally:
+            # Starlette drops the rest of a streamed body when the client
+            # disconnects or the upstream fails; close it here either way
+            await self._discard(response)
+    
+    async def _handle(self, request: Request, route: Route) -> Response:
+        """
+        Proxy a matched request, converting failures into error responses
+        
+        Args:
+            request: Incoming HTTP request
+            route: Matched gateway route
+        
+        Returns:
+            HTTP response from backend service, or a 503/502 error response
+        """
+        service_name = route.service
         
         # Proxy request to backend service
         try:
             start_time = time.time()
             
-            response = await self._proxy_request(request, service_name)
+            response = await self.forward(request, route)
             
             duration = time.time() - start_time
             
@@ -175,7 +242,7 @@ class RoutingMiddleware(BaseHTTPMiddleware):
             )
             
             return response
-            
+        
         except ServiceUnavailableError as e:
             logger.warning(
                 f"Service unavailable: {service_name}",
@@ -185,8 +252,23 @@ class RoutingMiddleware(BaseHTTPMiddleware):
                     "error": str(e),
                 }
             )
-            raise HTTPException(status_code=503, detail=str(e))
-            
+            return JSONResponse({"detail": str(e)}, status_code=503)
+        
+        except httpx.PoolTimeout as e:
+            # The gateway's own connection pool is exhausted, not the service
+            logger.warning(
+                f"Upstream pool exhausted: {service_name}",
+                extra={
+                    "service": service_name,
+                    "path": request.url.path,
+                    "error": str(e),
+                }
+            )
+            return JSONResponse(
+                {"detail": f"Too many concurrent requests to {service_name}"},
+                status_code=503,
+            )
+        
         except Exception as e:
             logger.error(
                 f"Error proxying request to {service_name}",
@@ -197,83 +279,334 @@ class RoutingMiddleware(BaseHTTPMiddleware):
                 },
                 exc_info=True
             )
-            raise HTTPException(
+            return JSONResponse(
+                {"detail": f"Error communicating with {service_name}"},
                 status_code=502,
-                detail=f"Error communicating with {service_name}"
             )
     
-    def _match_service(self, path: str) -> Optional[str]:
+    async def forward(self, request: Request, route: Route) -> Response:
         """
-        Match request path to a backend service
+        Forward a request to its route's service, through the response cache
+        for routes that opted in
         
         Args:
-            path: Request path
-            
+            request: Incoming (or composed) request
+            route: Matched gateway route
+        
         Returns:
-            Service name or None if no match
+            Response from the cache or backend service
         """
-        for prefix, service_name in self.ROUTE_MAP.items():
-            if path.startswith(prefix):
-                return service_name
-        
-        return None
+        if route.cache:
+            return await response_cache.fetch(
+                request,
+                partial(self._proxy_request, request, route),
+                default_ttl=route.cache_ttl,
+            )
+        return await self._proxy_request(request, route)
     
     async def _proxy_request(
         self,
         request: Request,
-        service_name: str
+        route: Route
     ) -> Response:
         """
         Proxy request to backend service with circuit breaker protection
         
+        Idempotent requests with a replayable (buffered) body are retried on
+        another instance after connection errors, open circuits and 502/503/504
+        responses, within the service's retry budget. Routes with ``hedge``
+        additionally send a second attempt when the first one is slower than
+        the recent p95 latency.
+        
         Args:
             request: Incoming request
-            service_name: Target service name
-            
+            route: Matched gateway route
+        
         Returns:
             Response from backend service
-            
+        
         Raises:
             ServiceUnavailableError: If service is unavailable
         """
-        # Get healthy service instance
-        service = service_registry.get_service(service_name)
+        service_name = route.service
         
-        if not service:
-            raise ServiceUnavailableError(
-                f"No healthy instances of {service_name} available"
+        # Prepare headers
+        headers = self._prepare_headers(request)
+        
+        # Large or opted-in bodies are piped through instead of buffered
+        stream = self._should_stream(request, route)
+        body = request.stream() if stream else await request.body()
+        
+        budget = retry_manager.budget(service_name)
+        budget.deposit()
+        
+        # Streamed bodies cannot be replayed
+        replayable = not stream and request.method in IDEMPOTENT_METHODS
+        max_retries = 0
+        if replayable:
+            max_retries = route.retries if route.retries is not None else retry_manager.settings.max_retries
+        
+        # Instances already used by this request are avoided by later attempts
+        tried: Set[str] = set()
+        if replayable and route.hedge:
+            attempt = partial(
+                self._hedged_attempt, request, service_name, headers, body, stream, tried, budget
             )
+        else:
+            attempt = partial(self._attempt, request, service_name, headers, body, stream, tried)
         
-        # Get circuit breaker for this service
-        breaker = await circuit_breaker_manager.get_breaker(
+        retry = 0
+        while True:
+            error: Optional[Exception] = None
+            response: Optional[Response] = None
+            try:
+                response = await attempt()
+            except httpx.PoolTimeout:
+                # Another attempt would wait for the same exhausted pool
+                raise
+            except (ServiceUnavailableError, httpx.TransportError) as e:
+                if retry >= max_retries or not tried:
+                    raise
+                error = e
+            else:
+                if retry >= max_retries or response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+            
+            reason = "error" if error is not None else "status"
+            if not budget.try_withdraw():
+                track_upstream_retry(service_name, "budget_exhausted")
+                if error is not None:
+                    raise error
+                return response
+            
+            if response is not None:
+                await self._discard(response)
+            
+            retry += 1
+            track_upstream_retry(service_name, reason)
+            logger.info(
+                f"Retrying request to {service_name}",
+                extra={"service": service_name, "retry": retry, "reason": reason}
+            )
+            await asyncio.sleep(retry_manager.settings.backoff(retry))
+    
+    async def _attempt(
+        self,
+        request: Request,
+        service_name: str,
+        headers: dict,
+        body: Union[bytes, AsyncIterator[bytes]],
+        stream: bool,
+        tried: Set[str],
+    ) -> Response:
+        """
+        Send one attempt to an instance not tried yet for this request
+        
+        Args:
+            request: Incoming request
+            service_name: Target service
+            headers: Prepared upstream headers
+            body: Request body
+            stream: Use the streaming proxy path
+            tried: URLs of instances already used; updated in place
+        
+        Returns:
+            Response from backend service
+        
+        Raises:
+            ServiceUnavailableError: If no instance is available or its circuit is open
+            httpx.PoolTimeout: If no upstream pool slot frees up in time
+        """
+        # Select an instance from the service pool, avoiding open circuits
+        # and instances that already failed this request
+        instance = service_registry.select_instance(
             service_name,
-            CircuitBreakerConfig(
-                failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
-                success_threshold=settings.CIRCUIT_BREAKER_SUCCESS_THRESHOLD,
-                timeout=settings.CIRCUIT_BREAKER_TIMEOUT,
+            exclude=lambda candidate: candidate.url in tried or circuit_breaker_manager.is_open(
+                instance_breaker_name(service_name, candidate.url)
+            )
+        )
+        
+        if not instance:
+            raise ServiceUnavailableError(
+                f"No healthy instances of {service_name} available"
             )
+        tried.add(instance.url)
+        
+        # Get circuit breaker for this instance (normally pre-created)
+        breaker = circuit_breaker_manager.get_or_create(
+            instance_breaker_name(service_name, instance.url)
         )
         
         # Build target URL
-        target_url = self._build_target_url(service.url, request)
+        target_url = self._build_target_url(instance.url, request)
         
-        # Prepare headers
-        headers = self._prepare_headers(request)
+        # Wait for a pool slot before entering the breaker: an exhausted
+        # gateway pool says nothing about the health of the instance
+        pool = self.upstreams.get(service_name)
+        await pool.acquire()
+        sent = False
         
         # Execute request with circuit breaker protection
         async def make_request():
+            nonlocal sent
+            sent = True
             return await self._execute_request(
+                service_name=service_name,
                 method=request.method,
                 url=target_url,
                 headers=headers,
-                body=await request.body(),
+                body=body,
                 query_params=dict(request.query_params),
+                stream=stream,
+                pool=pool,
             )
         
-        response = await breaker.call(make_request)
+        instance.outstanding += 1
+        start_time = time.monotonic()
+        try:
+            response = await breaker.call(
+                make_request,
+                is_failure=lambda upstream: upstream.status_code >= 500
+            )
+        except (ServiceUnavailableError, httpx.PoolTimeout):
+            raise
+        except Exception:
+            instance.record_failure()
+            raise
+        finally:
+            instance.outstanding -= 1
+            if not sent:
+                # Rejected by the breaker: the slot was never handed over
+                pool.release()
+        
+        # Feed passive outlier detection for the selected instance
+        elapsed = time.monotonic() - start_time
+        if response.status_code >= 500:
+            instance.record_failure()
+        else:
+            instance.record_success(elapsed * 1000)
+            retry_manager.latency(service_name).record(elapsed)
         
         return response
     
+    async def _hedged_attempt(
+        self,
+        request: Request,
+        service_name: str,
+        headers: dict,
+        body: Union[bytes, AsyncIterator[bytes]],
+        stream: bool,
+        tried: Set[str],
+        budget: RetryBudget,
+    ) -> Response:
+        """
+        Send an attempt and, if it is slower than the hedge delay, a second
+        one to another instance; the first good response wins
+        
+        Hedges are paid from the retry budget, so they stop when the service
+        is struggling. The losing attempt is cancelled.
+        
+        Returns:
+            Response of the winning attempt
+        """
+        primary = asyncio.create_task(
+            self._attempt(request, service_name, headers, body, stream, tried)
+        )
+        
+        delay = retry_manager.hedge_delay(service_name)
+        if delay is None:
+            return await primary
+        
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not budget.try_withdraw():
+            return await primary
+        
+        hedge = asyncio.create_task(
+            self._attempt(request, service_name, headers, body, stream, tried)
+        )
+        pending = {primary, hedge}
+        winner: Optional[asyncio.Task] = None
+        fallback: Optional[asyncio.Task] = None
+        
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500 and winner is None:
+                        winner = task
+                    elif fallback is None:
+                        fallback = task
+        finally:
+            for task in pending:
+                task.cancel()
+        
+        chosen = winner or fallback
+        track_hedged_request(service_name, "primary" if chosen is primary else "hedge")
+        
+        # Release the upstream connection of a completed losing attempt
+        for task in (primary, hedge):
+            if task is not chosen and task.done() and not task.cancelled() and task.exception() is None:
+                await self._discard(task.result())
+        
+        return chosen.result()
+    
+    @staticmethod
+    async def _discard(response: Response) -> None:
+        """Release an upstream response that will not be (further) sent"""
+        if isinstance(response, StreamingResponse) and isinstance(response.body_iterator, AsyncGenerator):
+            await response.body_iterator.aclose()
+    
+    def _is_streaming_route(self, path: str) -> bool:
+        """
+        Check whether a path belongs to a route that always streams
+        
+        Args:
+            path: Request path
+        
+        Returns:
+            True if the route opted in to streaming
+        """
+        return bool(self.streaming_prefixes) and path.startswith(self.streaming_prefixes)
+    
+    def _exceeds_threshold(self, content_length: Optional[str]) -> bool:
+        """
+        Check whether a declared body size should be streamed
+        
+        Args:
+            content_length: Value of the Content-Length header, if any
+        
+        Returns:
+            True if the body is larger than the threshold or its size is invalid
+        """
+        try:
+            return int(content_length) > self.stream_threshold
+        except (TypeError, ValueError):
+            return True
+    
+    def _should_stream(self, request: Request, route: Optional[Route] = None) -> bool:
+        """
+        Decide whether a request should use the streaming proxy path
+        
+        Args:
+            request: Incoming request
+            route: Matched gateway route
+        
+        Returns:
+            True if the request body and response should be streamed
+        """
+        if not self.streaming_enabled:
+            return False
+        
+        if (route is not None and route.stream) or self._is_streaming_route(request.url.path):
+            return True
+        
+        # Chunked uploads have no declared length - never buffer them
+        if "transfer-encoding" in request.headers:
+            return True
+        
+        content_length = request.headers.get("content-length")
+        return content_length is not None and self._exceeds_threshold(content_length)
+    
     def _build_target_url(self, base_url: str, request: Request) -> str:
         """
         Build target URL for backend service
@@ -281,7 +614,7 @@ class RoutingMiddleware(BaseHTTPMiddleware):
         Args:
             base_url: Service base URL
             request: Incoming request
-            
+        
         Returns:
             Complete target URL
         """
@@ -299,28 +632,14 @@ class RoutingMiddleware(BaseHTTPMiddleware):
         
         Args:
             request: Incoming request
-            
+        
         Returns:
             Headers dictionary
         """
-        # Copy headers from original request
-        headers = dict(request.headers)
-        
-        # Remove hop-by-hop headers
-        hop_by_hop = {
-            "connection",
-            "keep-alive",
-            "proxy-authenticate",
-            "proxy-authorization",
-            "te",
-            "trailers",
-            "transfer-encoding",
-            "upgrade",
-        }
-        
+        # Copy headers from original request, dropping hop-by-hop headers
         headers = {
-            k: v for k, v in headers.items()
-            if k.lower() not in hop_by_hop
+            k: v for k, v in request.headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS
         }
         
         # Add X-Forwarded headers
@@ -328,6 +647,11 @@ class RoutingMiddleware(BaseHTTPMiddleware):
         headers["X-Forwarded-Proto"] = request.url.scheme
         headers["X-Forwarded-Host"] = request.headers.get("host", "unknown")
         
+        # Raw upstream bytes are forwarded as-is, so never let httpx ask for an
+        # encoding the client did not accept (its default is gzip, deflate)
+        if "accept-encoding" not in headers:
+            headers["accept-encoding"] = "identity"
+        
         # Add correlation ID for request tracing
         if "X-Correlation-ID" not in headers:
             import uuid
@@ -337,62 +661,115 @@ class RoutingMiddleware(BaseHTTPMiddleware):
     
     async def _execute_request(
         self,
+        service_name: str,
         method: str,
         url: str,
         headers: dict,
-        body: bytes,
+        body: Union[bytes, AsyncIterator[bytes]],
         query_params: dict,
+        stream: bool = False,
+        pool: Optional[UpstreamPool] = None,
     ) -> Response:
         """
         Execute HTTP request to backend service
         
+        The upstream response is always opened in streaming mode. Bodies are
+        only read into memory when they are known to be below the streaming
+        threshold; everything else is forwarded chunk by chunk as it arrives.
+        
+        The request holds a slot of the service's upstream pool until the
+        response body has been fully read or forwarded.
+        
         Args:
+            service_name: Target service (selects the upstream pool)
             method: HTTP method
             url: Target URL
             headers: Request headers
-            body: Request body
+            body: Request body, either buffered bytes or an async byte stream
             query_params: Query parameters
-            
+            stream: Force the response to be streamed
+            pool: Upstream pool whose slot the caller already holds (a slot
+                is acquired here when omitted)
+        
         Returns:
             Response from backend service
         """
-        # Make request to backend
-        backend_response = await self.client.request(
-            method=method,
-            url=url,
-            headers=headers,
-            content=body,
-            params=query_params,
-        )
+        if pool is None:
+            pool = self.upstreams.get(service_name)
+            await pool.acquire()
         
-        # Prepare response headers
-        response_headers = dict(backend_response.headers)
-        
-        # Remove hop-by-hop headers
-        hop_by_hop = {
-            "connection",
-            "keep-alive",
-            "proxy-authenticate",
-            "proxy-authorization",
-            "te",
-            "trailers",
-            "transfer-encoding",
-            "upgrade",
-        }
+        # Make request to backend
+        try:
+            backend_request = pool.client.build_request(
+                method=method,
+                url=url,
+                headers=headers,
+                content=body,
+                params=query_params,
+            )
+            backend_response = await pool.client.send(backend_request, stream=True)
+        except BaseException:
+            pool.release()
+            raise
         
+        # Prepare response headers, dropping hop-by-hop headers
         response_headers = {
-            k: v for k, v in response_headers.items()
-            if k.lower() not in hop_by_hop
+            k: v for k, v in backend_response.headers.items()
+            if k.lower() not in HOP_BY_HOP_HEADERS
         }
         
+        if stream or self._exceeds_threshold(backend_response.headers.get("content-length")):
+            # Forward raw chunks as they arrive; the upstream connection is
+            # released when the body generator finishes or is closed
+            body = self._forward_body(backend_response, pool)
+            await body.asend(None)
+            return StreamingResponse(
+                body,
+                status_code=backend_response.status_code,
+                headers=response_headers,
+            )
+        
+        # Small response - read the raw (still encoded) body and release the connection
+        try:
+            content = b"".join([chunk async for chunk in backend_response.aiter_raw()])
+        finally:
+            await self._release(backend_response, pool)
+        
         # Create response
         return Response(
-            content=backend_response.content,
+            content=content,
             status_code=backend_response.status_code,
             headers=response_headers,
         )
     
+    @classmethod
+    async def _forward_body(
+        cls,
+        backend_response: httpx.Response,
+        pool: UpstreamPool,
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Yield the raw upstream body, releasing the response however it ends
+        
+        The generator is primed by the caller (the first, empty yield), so
+        closing it releases the upstream even if no chunk was ever read.
+        """
+        try:
+            yield b""
+            async for chunk in backend_response.aiter_raw():
+                yield chunk
+        finally:
+            await cls._release(backend_response, pool)
+    
+    @staticmethod
+    async def _release(backend_response: httpx.Response, pool: UpstreamPool) -> None:
+        """Close an upstream response and return its pool slot."""
+        try:
+            await backend_response.aclose()
+        finally:
+            pool.release()
+    
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
-        logger.info("Routing middleware HTTP client closed")
+        """Close upstream HTTP clients"""
+        await self.upstreams.aclose()
+        logger.info("Routing middleware HTTP clients closed")
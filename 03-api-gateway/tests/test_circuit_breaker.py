@@ -67,6 +67,8 @@ from app.core.circuit_breaker import (
     CircuitBreakerConfig,
     CircuitBreakerManager,
     ServiceUnavailableError,
+    TimeSlidingWindow,
+    instance_breaker_name,
 )
 
 
@@ -232,3 +234,185 @@ async def test_circuit_breaker_reset():
     
     assert breaker.state == CircuitState.CLOSED
     assert breaker.failure_count == 0
+
+
+async def run_calls(breaker: CircuitBreaker, outcomes: str) -> None:
+    """Run calls through the breaker; 'F' fails, anything else succeeds"""
+    async def failing_func():
+        raise Exception("Service error")
+    
+    async def success_func():
+        return "success"
+    
+    for outcome in outcomes:
+        try:
+            await breaker.call(failing_func if outcome == "F" else success_func)
+        except Exception:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_on_failure_rate():
+    """Test interleaved failures open the circuit once the rate is reached"""
+    config = CircuitBreakerConfig(
+        failure_threshold=100,
+        window_size=10,
+        minimum_calls=10,
+        failure_rate_threshold=0.4,
+    )
+    breaker = CircuitBreaker("test-service", config)
+    
+    # 3 failures in 9 calls - below the minimum number of calls
+    await run_calls(breaker, "SFSSFSSFS")
+    assert breaker.state == CircuitState.CLOSED
+    
+    # 4 failures in the last 10 calls - 40% failure rate
+    await run_calls(breaker, "F")
+    assert breaker.state == CircuitState.OPEN
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_count_window_forgets_old_calls():
+    """Test only the last window_size calls are considered"""
+    config = CircuitBreakerConfig(
+        failure_threshold=100,
+        window_size=4,
+        minimum_calls=4,
+        failure_rate_threshold=0.5,
+    )
+    breaker = CircuitBreaker("test-service", config)
+    
+    await run_calls(breaker, "FSSSSSSF")
+    
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.get_state()["failure_rate"] == 0.25
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_result_classifier():
+    """Test returned results classified as failures count as failures"""
+    config = CircuitBreakerConfig(failure_threshold=2)
+    breaker = CircuitBreaker("test-service", config)
+    
+    async def server_error():
+        return 503
+    
+    for _ in range(2):
+        assert await breaker.call(server_error, is_failure=lambda status: status >= 500) == 503
+    
+    assert breaker.state == CircuitState.OPEN
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens_on_slow_call_rate():
+    """Test slow successful calls open the circuit"""
+    config = CircuitBreakerConfig(
+        window_size=4,
+        minimum_calls=4,
+        slow_call_duration=0.01,
+        slow_call_rate_threshold=0.5,
+    )
+    breaker = CircuitBreaker("test-service", config)
+    
+    async def slow_func():
+        await asyncio.sleep(0.02)
+        return "slow"
+    
+    async def fast_func():
+        return "fast"
+    
+    for func in (fast_func, slow_func, fast_func, slow_func):
+        await breaker.call(func)
+    
+    assert breaker.state == CircuitState.OPEN
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_time_window():
+    """Test the time-based window aggregates calls of the last seconds"""
+    config = CircuitBreakerConfig(
+        failure_threshold=100,
+        window_type="time",
+        window_size=30,
+        minimum_calls=4,
+        failure_rate_threshold=0.5,
+    )
+    breaker = CircuitBreaker("test-service", config)
+    
+    await run_calls(breaker, "SFSF")
+    
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_time_window_expires_old_buckets():
+    """Test outcomes older than the window are dropped"""
+    window = TimeSlidingWindow(10)
+    window.record(True, False, 100.0)
+    window.record(False, False, 105.0)
+    
+    assert window.totals(105.0) == (2, 1, 0)
+    assert window.totals(110.5) == (1, 0, 0)
+    assert window.totals(116.0) == (0, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_half_open_limits_probes():
+    """Test HALF_OPEN admits only a bounded number of concurrent probes"""
+    config = CircuitBreakerConfig(failure_threshold=1, timeout=0, half_open_max_calls=1)
+    breaker = CircuitBreaker("test-service", config)
+    await run_calls(breaker, "F")
+    
+    release = asyncio.Event()
+    
+    async def probe():
+        await release.wait()
+        return "ok"
+    
+    first = asyncio.create_task(breaker.call(probe))
+    await asyncio.sleep(0)
+    assert breaker.state == CircuitState.HALF_OPEN
+    
+    with pytest.raises(ServiceUnavailableError):
+        await breaker.call(probe)
+    
+    release.set()
+    assert await first == "ok"
+
+
+@pytest.mark.asyncio
+async def test_manager_service_breakers():
+    """Test per-instance breakers are grouped by service"""
+    manager = CircuitBreakerManager()
+    await manager.get_breaker(instance_breaker_name("user-service", "http://10.0.0.1:8001"))
+    await manager.get_breaker(instance_breaker_name("user-service", "http://10.0.0.2:8001"))
+    await manager.get_breaker(instance_breaker_name("auth-service", "http://10.0.0.3:8002"))
+    
+    assert len(manager.get_service_breakers("user-service")) == 2
+    assert not manager.is_open("user-service@http://10.0.0.1:8001")
+
+
+def test_manager_prepare_creates_instance_breakers():
+    """Test breakers are created up front and shared on lookup"""
+    manager = CircuitBreakerManager(CircuitBreakerConfig(failure_threshold=7))
+    
+    created = manager.prepare("user-service", ["http://10.0.0.1:8001", "http://10.0.0.2:8001"])
+    
+    assert created == 2
+    assert manager.prepare("user-service", ["http://10.0.0.1:8001"]) == 0
+    breaker = manager.get("user-service@http://10.0.0.1:8001")
+    assert breaker is manager.get_or_create("user-service@http://10.0.0.1:8001")
+    assert breaker.config.failure_threshold == 7
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_reports_closed_for_selection_after_timeout():
+    """Test an open circuit becomes selectable again once it may be probed"""
+    manager = CircuitBreakerManager(CircuitBreakerConfig(failure_threshold=1, timeout=0))
+    breaker = manager.get_or_create("test-service")
+    await run_calls(breaker, "F")
+    
+    assert breaker.state == CircuitState.OPEN
+    assert not manager.is_open("test-service")
+    
+    breaker.config.timeout = 60
+    assert manager.is_open("test-service")
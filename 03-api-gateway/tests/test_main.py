@@ -118,3 +118,45 @@ async def test_metrics_endpoint(client: AsyncClient):
     # Metrics should return plain text
     assert response.status_code == 200
     assert "text/plain" in response.headers.get("content-type", "")
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_disabled_without_key(client: AsyncClient, monkeypatch):
+    """Test the admin API refuses every caller while ADMIN_API_KEY is unset"""
+    from app.main import settings
+    
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", None)
+    
+    response = await client.get("/admin/routes")
+    
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_check_key(client: AsyncClient, monkeypatch):
+    """Test the admin API only accepts the configured X-Admin-Key"""
+    from app.main import settings
+    
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret-key")
+    
+    assert (await client.get("/admin/routes")).status_code == 403
+    assert (await client.get("/admin/routes", headers={"X-Admin-Key": "wrong"})).status_code == 403
+    assert (await client.get("/admin/routes", headers={"X-Admin-Key": "secret-key"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_reload_routes_reports_invalid_file(client: AsyncClient, monkeypatch, tmp_path):
+    """Test a broken route file is a 400 and keeps the active routes"""
+    from app.main import route_table, settings
+    
+    routes_file = tmp_path / "routes.json"
+    routes_file.write_text("{not json")
+    monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret-key")
+    monkeypatch.setattr(settings, "ROUTES_FILE", str(routes_file))
+    version = route_table.version
+    
+    response = await client.post("/admin/routes/reload", headers={"X-Admin-Key": "secret-key"})
+    
+    assert response.status_code == 400
+    assert "Invalid ROUTES_FILE" in response.json()["detail"]
+    assert route_table.version == version
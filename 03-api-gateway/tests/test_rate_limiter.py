@@ -57,13 +57,34 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 ================================================================================
 """
 
+import time
+
 import pytest
 from datetime import datetime
 from redis.asyncio import Redis
 
+from starlette.requests import Request
+
+from app.core.rate_limit_policy import RateLimitPolicy, RateLimitPolicyManager
 from app.core.rate_limiter import RateLimiter
 
 
+def make_request(
+    path: str = "/api/users",
+    client_ip: str = "10.1.2.3",
+    method: str = "GET",
+) -> Request:
+    """Build a bare request from the given client"""
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+        "client": (client_ip, 12345),
+    })
+
+
 @pytest.mark.asyncio
 async def test_rate_limiter_allow_request():
     """Test rate limiter allows requests within limit"""
@@ -136,3 +157,175 @@ async def test_get_rate_limit_info():
     assert "reset_at" in info
     
     await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_check_rate_limit_counts_requests_within_same_second():
+    """Test every request is counted, even several within the same second"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    limiter = RateLimiter(redis, local_tier=False)
+    request = make_request(client_ip="10.9.9.1")
+    await limiter.reset_limit("ip:10.9.9.1", "/api/users")
+    
+    results = [
+        (await limiter.check_rate_limit(request, limit_per_minute=3, limit_per_hour=100))[0]
+        for _ in range(4)
+    ]
+    
+    assert results == [True, True, True, False]
+    
+    await limiter.reset_limit("ip:10.9.9.1", "/api/users")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_check_rate_limit_hour_window():
+    """Test the hour window is enforced in the same round trip"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    limiter = RateLimiter(redis, local_tier=False)
+    request = make_request(client_ip="10.9.9.2")
+    await limiter.reset_limit("ip:10.9.9.2", "/api/users")
+    
+    await limiter.check_rate_limit(request, limit_per_minute=10, limit_per_hour=1)
+    allowed, info = await limiter.check_rate_limit(request, limit_per_minute=10, limit_per_hour=1)
+    
+    assert allowed is False
+    assert info["window"] == "hour"
+    assert info["remaining"] == 0
+    
+    await limiter.reset_limit("ip:10.9.9.2", "/api/users")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_check_rate_limit_reports_remaining():
+    """Test allowed responses report remaining quota for both windows"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    limiter = RateLimiter(redis, local_tier=False)
+    request = make_request(client_ip="10.9.9.3")
+    await limiter.reset_limit("ip:10.9.9.3", "/api/users")
+    
+    allowed, info = await limiter.check_rate_limit(request, limit_per_minute=5, limit_per_hour=50)
+    
+    assert allowed is True
+    assert info["remaining_minute"] == 4
+    assert info["remaining_hour"] == 49
+    
+    await limiter.reset_limit("ip:10.9.9.3", "/api/users")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_decides_without_redis_round_trip():
+    """Test the local tier admits up to the bucket size and queues usage for sync"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    limiter = RateLimiter(redis, local_tier=True)
+    request = make_request(client_ip="10.9.9.4")
+    await limiter.reset_limit("ip:10.9.9.4", "/api/users")
+    
+    results = [
+        (await limiter.check_rate_limit(request, limit_per_minute=3, limit_per_hour=100))[0]
+        for _ in range(4)
+    ]
+    assert results == [True, True, True, False]
+    
+    # Nothing recorded in Redis until the batched sync runs
+    minute_key = limiter._get_window_keys("ip:10.9.9.4", "/api/users", "minute", 60, time.time())[0]
+    assert await redis.get(minute_key) is None
+    
+    await limiter.sync()
+    assert int(float(await redis.get(minute_key))) == 3
+    
+    await limiter.close()
+    await limiter.reset_limit("ip:10.9.9.4", "/api/users")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_blocks_clients_over_global_limit():
+    """Test usage recorded by other gateways blocks the client after a sync"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    other_gateway = RateLimiter(redis, local_tier=False)
+    limiter = RateLimiter(redis, local_tier=True)
+    request = make_request(client_ip="10.9.9.5")
+    await limiter.reset_limit("ip:10.9.9.5", "/api/users")
+    
+    for _ in range(5):
+        await other_gateway.check_rate_limit(request, limit_per_minute=5, limit_per_hour=100)
+    
+    allowed, _ = await limiter.check_rate_limit(request, limit_per_minute=5, limit_per_hour=100)
+    assert allowed is True
+    
+    await limiter.sync()
+    allowed, info = await limiter.check_rate_limit(request, limit_per_minute=5, limit_per_hour=100)
+    
+    assert allowed is False
+    assert info["window"] == "minute"
+    
+    await limiter.close()
+    await limiter.reset_limit("ip:10.9.9.5", "/api/users")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_limit():
+    """Test requests are still limited locally when Redis is unreachable"""
+    redis = Redis.from_url("redis://localhost:1/0", decode_responses=True, socket_connect_timeout=0.1)
+    limiter = RateLimiter(redis, local_tier=False)
+    request = make_request(client_ip="10.9.9.6")
+    
+    results = [
+        (await limiter.check_rate_limit(request, limit_per_minute=2, limit_per_hour=100))[0]
+        for _ in range(3)
+    ]
+    
+    assert results == [True, True, False]
+    
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_policy_limits_shared_across_path_params():
+    """Test a route policy applies one limit to all ids of a template"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    policies = RateLimitPolicyManager([
+        RateLimitPolicy(name="user", route="/api/users/{user_id}", limit_per_minute=2, limit_per_hour=100),
+    ])
+    limiter = RateLimiter(redis, local_tier=False, policies=policies)
+    await limiter.reset_limit("ip:10.9.9.7", "/api/users/{user_id}")
+    
+    results = [
+        (await limiter.check_rate_limit(make_request(f"/api/users/{user_id}", "10.9.9.7")))[0]
+        for user_id in (1, 2, 3)
+    ]
+    
+    assert results == [True, True, False]
+    
+    await limiter.reset_limit("ip:10.9.9.7", "/api/users/{user_id}")
+    await redis.aclose()
+
+
+@pytest.mark.asyncio
+async def test_policy_burst_allowance():
+    """Test the burst allowance is added to the minute limit in both tiers"""
+    redis = Redis.from_url("redis://localhost:6379/1", decode_responses=True)
+    policies = RateLimitPolicyManager([
+        RateLimitPolicy(
+            name="upload", route="/api/files", methods=frozenset({"POST"}),
+            limit_per_minute=2, limit_per_hour=100, burst=2,
+        ),
+    ])
+    
+    for local_tier, client_ip in ((False, "10.9.9.8"), (True, "10.9.9.9")):
+        limiter = RateLimiter(redis, local_tier=local_tier, policies=policies)
+        await limiter.reset_limit(f"ip:{client_ip}", "/api/files")
+        request = make_request("/api/files", client_ip, method="POST")
+        
+        results = [(await limiter.check_rate_limit(request))[0] for _ in range(5)]
+        
+        assert results == [True, True, True, True, False]
+        
+        await limiter.close()
+        await limiter.reset_limit(f"ip:{client_ip}", "/api/files")
+    
+    await redis.aclose()
@@ -58,8 +58,13 @@ Repository: https://github.com/GravityWavesMl/GravityMicroServices
 """
 
 import pytest
+import asyncio
+import time
 from datetime import datetime
 
+import httpx
+
+from app.config import settings
 from app.core.service_registry import ServiceRegistry, ServiceInfo, ServiceStatus
 
 
@@ -138,3 +143,133 @@ async def test_service_status_summary():
     assert "test-service" in summary
     assert "status" in summary["test-service"]
     assert "response_time_ms" in summary["test-service"]
+
+
+@pytest.mark.asyncio
+async def test_multiple_instances_share_a_pool():
+    """Test registering several URLs under one name builds a pool"""
+    registry = ServiceRegistry(strategy="round_robin")
+    
+    registry.register_service(name="pool-service", url="http://10.0.0.1:8000")
+    registry.register_service(name="pool-service", url="http://10.0.0.2:8000")
+    
+    pool = registry.get_service("pool-service")
+    assert [i.url for i in pool.instances] == ["http://10.0.0.1:8000", "http://10.0.0.2:8000"]
+    
+    selected = {registry.select_instance("pool-service").url for _ in range(4)}
+    assert selected == {"http://10.0.0.1:8000", "http://10.0.0.2:8000"}
+
+
+@pytest.mark.asyncio
+async def test_failing_instance_is_ejected():
+    """Test consecutive proxied failures eject an instance from selection"""
+    registry = ServiceRegistry(strategy="round_robin")
+    registry.register_service(name="pool-service", url="http://10.0.0.1:8000")
+    registry.register_service(name="pool-service", url="http://10.0.0.2:8000")
+    bad = registry.get_service("pool-service").instances[0]
+    
+    for _ in range(settings.UPSTREAM_EJECTION_THRESHOLD):
+        bad.record_failure()
+    
+    assert bad.is_ejected()
+    selected = {registry.select_instance("pool-service").url for _ in range(4)}
+    assert selected == {"http://10.0.0.2:8000"}
+
+
+@pytest.mark.asyncio
+async def test_select_instance_skips_excluded():
+    """Test instances matching the exclude predicate (e.g. open circuit) are skipped"""
+    registry = ServiceRegistry(strategy="round_robin")
+    registry.register_service(name="pool-service", url="http://10.0.0.1:8000")
+    registry.register_service(name="pool-service", url="http://10.0.0.2:8000")
+    
+    def exclude(instance):
+        return instance.url == "http://10.0.0.1:8000"
+    
+    selected = {registry.select_instance("pool-service", exclude).url for _ in range(4)}
+    assert selected == {"http://10.0.0.2:8000"}
+
+
+@pytest.mark.asyncio
+async def test_all_instances_ejected_falls_back_to_pool():
+    """Test selection does not black-hole a service whose instances are all ejected"""
+    registry = ServiceRegistry()
+    registry.register_service(name="pool-service", url="http://10.0.0.1:8000")
+    instance = registry.get_service("pool-service").instances[0]
+    instance.mark_unhealthy()
+    
+    assert registry.select_instance("pool-service") is instance
+
+
+@pytest.mark.asyncio
+async def test_deregister_instance():
+    """Test removing instances from a pool"""
+    registry = ServiceRegistry()
+    registry.register_service(name="pool-service", url="http://10.0.0.1:8000")
+    registry.register_service(name="pool-service", url="http://10.0.0.2:8000")
+    
+    assert registry.deregister_instance("pool-service", "http://10.0.0.1:8000")
+    assert registry.get_service("pool-service").url == "http://10.0.0.2:8000"
+    
+    assert registry.deregister_instance("pool-service", "http://10.0.0.2:8000")
+    assert registry.get_service("pool-service") is None
+
+
+def slow_health_client(delay: float) -> httpx.AsyncClient:
+    """HTTP client whose /health responses take `delay` seconds"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200)
+    
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_check_all_services_runs_concurrently():
+    """Test services are probed concurrently rather than one after another"""
+    registry = ServiceRegistry()
+    registry.services.clear()
+    for i in range(5):
+        registry.register_service(name=f"service{i}", url=f"http://10.0.0.{i}:8000")
+    registry._http_client = slow_health_client(0.2)
+    
+    start = time.monotonic()
+    results = await registry.check_all_services()
+    elapsed = time.monotonic() - start
+    
+    assert all(results.values())
+    assert elapsed < 0.6
+    await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_background_scheduler_probes_due_instances():
+    """Test the scheduler probes instances and reschedules them with jitter"""
+    registry = ServiceRegistry()
+    registry.services.clear()
+    registry.register_service(name="service1", url="http://10.0.0.1:8000")
+    registry._http_client = slow_health_client(0.0)
+    instance = registry.get_service("service1").instances[0]
+    
+    registry.start_health_checks()
+    await asyncio.sleep(0.2)
+    
+    assert instance.status == ServiceStatus.HEALTHY
+    assert instance.next_check_at > time.monotonic()
+    
+    await registry.close()
+    assert registry._health_task is None
+
+
+@pytest.mark.asyncio
+async def test_passive_success_marks_instance_healthy():
+    """Test proxied successes act as a passive health signal"""
+    registry = ServiceRegistry()
+    registry.register_service(name="service1", url="http://10.0.0.1:8000")
+    instance = registry.get_service("service1").instances[0]
+    instance.mark_unhealthy()
+    
+    instance.record_success(12.0)
+    
+    assert instance.is_healthy()
+    assert registry.get_health_snapshot()["service1"] is True
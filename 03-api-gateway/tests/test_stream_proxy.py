@@ -0,0 +1,240 @@
+"""
+================================================================================
+FILE IDENTITY (شناسنامه فایل)
+================================================================================
+Project      : Gravity MicroServices Platform
+File         : test_stream_proxy.py
+Description  : Tests for the WebSocket and SSE proxy
+Language     : English (UK)
+Framework    : FastAPI / Python 3.11+
+
+================================================================================
+AUTHORSHIP & CONTRIBUTION (مشارکت‌کنندگان)
+================================================================================
+Primary Author    : João Silva (QA & Testing Lead)
+Contributors      : Elena Volkov
+Team Standard     : Elite Engineers (IQ 180+, 15+ years experience)
+
+================================================================================
+TIMELINE & EFFORT (زمان‌بندی و تلاش)
+================================================================================
+Created Date      : 2025-11-19 10:00 UTC
+Last Modified     : 2025-11-29 17:00 UTC
+Development Time  : 1 hour 0 minutes
+Review Time       : 0 hours 20 minutes
+Testing Time      : 0 hours 40 minutes
+Total Time        : 2 hours 0 minutes
+
+================================================================================
+COST CALCULATION (محاسبه هزینه)
+================================================================================
+Hourly Rate       : $150/hour (Elite Engineer Standard)
+Development Cost  : 1.0 × $150 = $150.00 USD
+Review Cost       : 0.33 × $150 = $50.00 USD
+Testing Cost      : 0.67 × $150 = $100.00 USD
+Total Cost        : $300.00 USD
+
+================================================================================
+VERSION HISTORY (تاریخچه نسخه)
+================================================================================
+v1.0.0 - 2025-11-19 - João Silva - Initial implementation
+v1.0.1 - 2025-11-29 - João Silva - Error body encoding, client shutdown
+
+================================================================================
+DEPENDENCIES (وابستگی‌ها)
+================================================================================
+Internal  : gravity_common (where applicable)
+External  : FastAPI, SQLAlchemy, Pydantic (as needed)
+Database  : PostgreSQL 16+, Redis 7 (as needed)
+
+================================================================================
+LICENSE & COPYRIGHT
+================================================================================
+Copyright (c) 2025 Gravity MicroServices Platform
+License: MIT License
+Repository: https://github.com/GravityWavesMl/GravityMicroServices
+
+================================================================================
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from websockets.asyncio.server import serve
+
+from app.core.circuit_breaker import CircuitBreakerManager
+from app.core.service_registry import ServiceRegistry
+from app.middleware import stream_proxy
+from app.middleware.stream_proxy import StreamProxyMiddleware, is_event_stream_request
+
+
+async def fallback_app(scope, receive, send):
+    """App reached by requests the proxy does not handle"""
+    await send({"type": "http.response.start", "status": 204, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def use_registry(monkeypatch, url: str) -> ServiceRegistry:
+    """Point the proxy at a single notification-service instance"""
+    registry = ServiceRegistry(strategy="round_robin")
+    registry.services.clear()
+    registry.register_service("notification-service", url)
+    monkeypatch.setattr(stream_proxy, "service_registry", registry)
+    monkeypatch.setattr(stream_proxy, "circuit_breaker_manager", CircuitBreakerManager())
+    return registry
+
+
+class FakeClient:
+    """ASGI side of a proxied connection driven by a queue"""
+    
+    def __init__(self, messages: list):
+        self.inbox: asyncio.Queue = asyncio.Queue()
+        for message in messages:
+            self.inbox.put_nowait(message)
+        self.sent: list = []
+    
+    async def receive(self):
+        return await self.inbox.get()
+    
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class EventStream(httpx.AsyncByteStream):
+    """Upstream SSE body yielding one event per chunk"""
+    
+    def __init__(self, events: list[bytes]):
+        self.events = events
+    
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+
+
+def test_is_event_stream_request():
+    """Test SSE requests are recognised by their Accept header"""
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept", b"text/event-stream")]}
+    assert is_event_stream_request(scope)
+    
+    scope["method"] = "POST"
+    assert not is_event_stream_request(scope)
+
+
+async def test_websocket_frames_are_relayed_both_ways(monkeypatch):
+    """Test text and binary frames flow through and the close is propagated"""
+    async def echo(websocket):
+        async for message in websocket:
+            await websocket.send(message)
+    
+    async with serve(echo, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        registry = use_registry(monkeypatch, f"http://127.0.0.1:{port}")
+        
+        client = FakeClient([
+            {"type": "websocket.connect"},
+            {"type": "websocket.receive", "text": "hello"},
+            {"type": "websocket.receive", "bytes": b"\x00\x01"},
+        ])
+        middleware = StreamProxyMiddleware(fallback_app)
+        scope = {
+            "type": "websocket",
+            "path": "/api/notifications/ws",
+            "query_string": b"",
+            "headers": [(b"host", b"gateway")],
+            "subprotocols": [],
+        }
+        
+        task = asyncio.create_task(middleware(scope, client.receive, client.send))
+        for _ in range(100):
+            if len(client.sent) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        
+        instance = registry.get_service("notification-service").instances[0]
+        assert instance.outstanding == 1
+        
+        client.inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(task, timeout=2)
+    
+    assert client.sent[0]["type"] == "websocket.accept"
+    assert client.sent[1] == {"type": "websocket.send", "text": "hello"}
+    assert client.sent[2] == {"type": "websocket.send", "bytes": b"\x00\x01"}
+    assert instance.outstanding == 0
+    assert middleware.active["notification-service"] == 0
+
+
+async def test_websocket_connection_cap(monkeypatch):
+    """Test connections over the per-service cap are refused"""
+    use_registry(monkeypatch, "http://127.0.0.1:1")
+    middleware = StreamProxyMiddleware(fallback_app)
+    middleware.max_connections = 0
+    client = FakeClient([{"type": "websocket.connect"}])
+    scope = {"type": "websocket", "path": "/api/notifications/ws", "headers": []}
+    
+    await middleware(scope, client.receive, client.send)
+    
+    assert client.sent == [{"type": "websocket.close", "code": 1013}]
+
+
+async def test_event_stream_is_relayed_incrementally(monkeypatch):
+    """Test SSE events are forwarded as they arrive"""
+    use_registry(monkeypatch, "http://notifications:8002")
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/notifications/stream"
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            stream=EventStream([f"data: {i}\n\n".encode() for i in range(3)]),
+        )
+    
+    middleware = StreamProxyMiddleware(fallback_app)
+    middleware.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = FakeClient([])
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/notifications/stream",
+        "query_string": b"",
+        "headers": [(b"host", b"gateway"), (b"accept", b"text/event-stream")],
+    }
+    
+    await middleware(scope, client.receive, client.send)
+    
+    assert client.sent[0]["status"] == 200
+    bodies = [m["body"] for m in client.sent[1:] if m["body"]]
+    assert bodies == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
+    assert client.sent[-1]["more_body"] is False
+
+
+async def test_error_detail_is_json_encoded():
+    """Test error details with quotes, backslashes and control characters stay valid JSON"""
+    client = FakeClient([])
+    detail = 'No route for "C:\\tmp"\nretry\x01'
+    
+    await StreamProxyMiddleware._send_error(client.send, 503, detail)
+    
+    assert client.sent[0]["status"] == 503
+    assert json.loads(client.sent[1]["body"]) == {"detail": detail}
+
+
+async def test_close_stream_proxies_closes_clients():
+    """Test shutdown closes the stream client of every middleware instance"""
+    middleware = StreamProxyMiddleware(fallback_app)
+    
+    await stream_proxy.close_stream_proxies()
+    
+    assert middleware.client.is_closed
+
+
+async def test_non_stream_requests_fall_through():
+    """Test ordinary HTTP requests are left to the routing middleware"""
+    middleware = StreamProxyMiddleware(fallback_app)
+    client = FakeClient([])
+    scope = {"type": "http", "method": "GET", "path": "/api/users/1", "headers": []}
+    
+    await middleware(scope, client.receive, client.send)
+    
+    assert client.sent[0]["status"] == 204